@@ -0,0 +1,81 @@
+"""
+Measures the memory held per parsed public key.
+
+    python -m benchmarks.key_memory [count]
+
+Parses `count` distinct Ed25519 public keys, keeps them alive, and reports the
+bytes allocated per key, including its fingerprint and string form.
+
+For comparison it also measures a baseline layout: the same values held the
+way the key classes held them before they declared `__slots__`, with instance
+dicts and the key fields in a list.
+"""
+
+import os
+import sys
+import tracemalloc
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from ssh_envelope.ssh_public_key import SSHPublicKey
+
+class _BaselineKeyData:
+    def __init__(self, key: SSHPublicKey):
+        self.type = key.key_data.type
+        self._hash_image = key.key_data._hash_image
+        self.data = list(key.key_data.data)
+
+class _BaselineKey:
+    def __init__(self, key: SSHPublicKey):
+        self._key_data = _BaselineKeyData(key)
+        self._comment = key._comment
+        self._base64_string = key._base64_string
+        self._fingerprint = key._fingerprint
+        self._key_size = key._key_size
+        self._string = key._string
+
+def key_strings(count: int) -> list[str]:
+    # Vary a generated key's bytes instead of generating `count` keys.
+    key = ed25519.Ed25519PrivateKey.generate().public_key()
+    template = key.public_bytes(serialization.Encoding.OpenSSH, serialization.PublicFormat.OpenSSH).decode()
+    prefix, base64_data = template.split(" ")
+    head = base64_data[:-7]
+    return [f"{prefix} {head}{i:07x} host{i}" for i in range(count)]
+
+def parse_key(string: str) -> SSHPublicKey:
+    key = SSHPublicKey.from_string(string)
+    key.fingerprint
+    key.string
+    return key
+
+def bytes_per_key(count: int, baseline: bool = False) -> float:
+    """
+    :param baseline: Measure the baseline layout instead. Each key is parsed
+        as usual and its values, allocated the same way, are moved into
+        baseline objects; only what those keep alive is counted.
+    """
+    strings = key_strings(count)
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    if baseline:
+        keys = [_BaselineKey(parse_key(string)) for string in strings]
+    else:
+        keys = [parse_key(string) for string in strings]
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (end - start) / len(keys)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    baseline = bytes_per_key(count, baseline=True)
+    current = bytes_per_key(count)
+    print(f"{count} Ed25519 public keys")
+    print(f"  baseline: {baseline:.0f} bytes per key")
+    print(f"  current:  {current:.0f} bytes per key")
+
+if __name__ == "__main__":
+    main()
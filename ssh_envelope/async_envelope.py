@@ -0,0 +1,250 @@
+import asyncio
+import os
+from enum import Enum
+from typing import Awaitable, Callable, TypeVar
+
+from ssh_envelope import sshsig
+from ssh_envelope.envelope import Envelope, EnvelopeBuilder
+from ssh_envelope.keyring import Keyring
+from ssh_envelope.ssh_keygen_utils import sign_message_async, verify_message_async
+from ssh_envelope.ssh_private_key import SSHPrivateKey
+from ssh_envelope.ssh_public_key import SSHPublicKey
+from ssh_envelope.ssh_signature import SSHSignature
+
+T = TypeVar('T')
+
+class Backend(Enum):
+    """
+    How signatures are made and checked.
+
+    `IN_PROCESS`, the default, uses the in-process SSHSIG implementation on a
+    worker thread. `SSH_KEYGEN` spawns `ssh-keygen` with
+    `asyncio.create_subprocess_exec`, writing and deleting its key files on a
+    worker thread.
+    """
+    SSH_KEYGEN = "ssh-keygen"
+    IN_PROCESS = "in-process"
+
+    def __str__(self):
+        return self.value
+
+class ConcurrencyLimiter:
+    """
+    Bounds the number of signing and verification operations in flight.
+
+    Operations beyond the limit wait for a free slot, so a caller that submits
+    work faster than it completes is slowed down rather than spawning an
+    unbounded number of processes. Share one limiter between everything that
+    should count against the same budget.
+    """
+    def __init__(self, max_concurrency: int | None = None):
+        """
+        :param max_concurrency: The maximum number of operations in flight.
+            Defaults to the number of CPUs.
+        :raises ValueError: If the limit is less than 1.
+        """
+        if max_concurrency is None:
+            max_concurrency = os.cpu_count() or 1
+        if max_concurrency < 1:
+            raise ValueError("Concurrency limit must be at least 1")
+        self._max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+        self._waiting = 0
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max_concurrency
+
+    @property
+    def in_flight(self) -> int:
+        """
+        The number of operations currently running.
+        """
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        """
+        The number of operations waiting for a free slot. Callers can use this
+        to shed load before submitting more work.
+        """
+        return self._waiting
+
+    async def run(self, operation: Callable[[], Awaitable[T]]) -> T:
+        """
+        Waits for a free slot, then runs the operation.
+        """
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        try:
+            return await operation()
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+async def _limited(limiter: ConcurrencyLimiter | None, operation: Callable[[], Awaitable[T]]) -> T:
+    if limiter is None:
+        return await operation()
+    return await limiter.run(operation)
+
+async def sign_message(message: bytes,
+                       private_key: SSHPrivateKey,
+                       namespace: str,
+                       limiter: ConcurrencyLimiter | None = None,
+                       backend: Backend = Backend.IN_PROCESS,
+                       ) -> SSHSignature:
+    """
+    Signs the message with the private key without blocking the event loop.
+
+    :param limiter: Bounds the number of concurrent operations. If None, the
+        operation runs immediately.
+    :param backend: How the signature is made.
+    """
+    if backend == Backend.IN_PROCESS:
+        return await _limited(limiter, lambda: asyncio.to_thread(sshsig.sign_message, message, private_key, namespace))
+    return await _limited(limiter, lambda: sign_message_async(message, private_key, namespace))
+
+async def verify_message(message: bytes,
+                         signature: SSHSignature,
+                         public_key: SSHPublicKey,
+                         limiter: ConcurrencyLimiter | None = None,
+                         backend: Backend = Backend.IN_PROCESS,
+                         ) -> bool:
+    """
+    Verifies an SSHSIG signature over the message without blocking the event
+    loop.
+
+    :param limiter: Bounds the number of concurrent operations. If None, the
+        operation runs immediately.
+    :param backend: How the signature is checked.
+    """
+    if backend == Backend.IN_PROCESS:
+        return await _limited(limiter, lambda: asyncio.to_thread(sshsig.verify_message, message, signature, public_key))
+    return await _limited(limiter, lambda: verify_message_async(message, signature, public_key))
+
+class AsyncEnvelope:
+    """
+    An asyncio front end to `Envelope` for signing and verification.
+
+    Building and decoding envelopes is cheap and stays synchronous on the
+    wrapped `Envelope`; only the signature operations are awaited, so one
+    event loop can keep many of them in flight at once.
+    """
+    def __init__(self, envelope: Envelope, limiter: ConcurrencyLimiter | None = None, backend: Backend = Backend.IN_PROCESS):
+        """
+        :param envelope: The envelope to operate on.
+        :param limiter: Bounds the number of concurrent operations. Envelopes
+            derived from this one share it.
+        :param backend: How signatures are made and checked.
+        """
+        self._envelope = envelope
+        self._limiter = limiter
+        self._backend = backend
+
+    @classmethod
+    def from_ur(cls, ur: str, limiter: ConcurrencyLimiter | None = None, backend: Backend = Backend.IN_PROCESS) -> 'AsyncEnvelope':
+        return cls(Envelope(ur), limiter, backend)
+
+    @property
+    def envelope(self) -> Envelope:
+        return self._envelope
+
+    @property
+    def ur(self) -> str:
+        return self._envelope.ur
+
+    @property
+    def limiter(self) -> ConcurrencyLimiter | None:
+        return self._limiter
+
+    @property
+    def backend(self) -> Backend:
+        return self._backend
+
+    def __str__(self):
+        return str(self._envelope)
+
+    def __eq__(self, other):
+        if isinstance(other, AsyncEnvelope):
+            return self._envelope == other._envelope
+        return False
+
+    def __hash__(self):
+        return hash(self._envelope)
+
+    def _derived(self, envelope: Envelope) -> 'AsyncEnvelope':
+        return AsyncEnvelope(envelope, self._limiter, self._backend)
+
+    async def add_signature(self, private_key: Envelope, namespace: str) -> 'AsyncEnvelope':
+        """
+        Sign the envelope's subject with the given private key.
+
+        :param private_key: The private key to sign the envelope with.
+        :param namespace: The namespace for the signature.
+        :return: The signed envelope.
+        """
+        return await self.add_signatures([private_key], namespace)
+
+    async def add_signatures(self, private_keys: list[Envelope], namespace: str) -> 'AsyncEnvelope':
+        """
+        Sign the envelope's subject with each of the given private keys.
+
+        The signatures are made concurrently, within the limits of the
+        limiter, and added to the envelope in a single step.
+
+        :param private_keys: The private keys to sign the envelope with.
+        :param namespace: The namespace for the signatures.
+        :return: The signed envelope.
+        """
+        digest = self._envelope.subject.digest
+        ssh_signatures = await asyncio.gather(*(
+            sign_message(digest, private_key.to_ssh_private_key(), namespace, self._limiter, self._backend)
+            for private_key in private_keys
+        ))
+        builder = EnvelopeBuilder(self._envelope)
+        for ssh_signature in ssh_signatures:
+            builder.add_known_value_assertion("verifiedBy", Envelope.from_ssh_signature(ssh_signature))
+        return self._derived(builder.build())
+
+    async def verify_signature(self, public_key: Envelope) -> bool:
+        """
+        Verify the envelope with the given public key.
+
+        :param public_key: The public key to verify the envelope with.
+        :return: True if any `verifiedBy` signature made by the key is valid,
+            False otherwise.
+        """
+        digest = self._envelope.subject.digest
+        ssh_public_key = public_key.to_ssh_public_key()
+        signatures = [signature for signature in self._envelope.find_signatures() if signature.public_key_data == ssh_public_key.key_data]
+        results = await asyncio.gather(*(
+            verify_message(digest, signature, ssh_public_key, self._limiter, self._backend)
+            for signature in signatures
+        ))
+        return any(results)
+
+    async def verified_signers(self, keyring: Keyring) -> list[SSHPublicKey]:
+        """
+        Find the keys on the keyring that have validly signed the envelope.
+
+        :param keyring: The trusted public keys.
+        :return: The distinct signers whose signatures are valid, in the order
+            their signatures appear on the envelope.
+        """
+        digest = self._envelope.subject.digest
+        pairs = [(signature, keyring.signer_of(signature)) for signature in self._envelope.find_signatures()]
+        pairs = [(signature, signer) for signature, signer in pairs if signer is not None]
+        results = await asyncio.gather(*(
+            verify_message(digest, signature, signer, self._limiter, self._backend)
+            for signature, signer in pairs
+        ))
+        signers: list[SSHPublicKey] = []
+        for (_, signer), valid in zip(pairs, results):
+            if valid and signer not in signers:
+                signers.append(signer)
+        return signers
@@ -0,0 +1,97 @@
+import json
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, TextIO
+
+# Batch mode processes many records in one invocation, so the interpreter
+# start-up and any keys are paid for once rather than per record.
+#
+# Input is newline-delimited. A line that starts with `"` is a JSON string,
+# which lets multi-line records such as PEM files share the format with
+# single-line records such as URs and public keys. Blank lines are skipped.
+#
+# Output is one JSON object per record, in input order:
+#
+#   {"index": 0, "status": "ok", "result": "ur:envelope/..."}
+#   {"index": 1, "status": "error", "error": "Not an envelope UR"}
+
+def read_records(file: TextIO) -> Iterator[str | ValueError]:
+    """
+    Yields the records in a newline-delimited batch input. A malformed JSON
+    string record yields a `ValueError` in its place, so it is reported as
+    that record's error and the rest of the batch still runs.
+    """
+    for line in file:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('"'):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield ValueError(f"Invalid JSON string record: {e}")
+                continue
+            if not isinstance(record, str):
+                yield ValueError("Invalid JSON string record")
+                continue
+            yield record
+        else:
+            yield line
+
+def format_result(index: int, result: str | None = None, error: BaseException | None = None) -> str:
+    """
+    Returns the output line for a record.
+    """
+    if error is not None:
+        return json.dumps({"index": index, "status": "error", "error": str(error)})
+    return json.dumps({"index": index, "status": "ok", "result": result})
+
+def run_batch(records: Iterable[str | BaseException],
+              process: Callable[[str], str],
+              output: TextIO,
+              jobs: int = 1,
+              ) -> int:
+    """
+    Processes each record and streams the results to the output in input order.
+
+    Up to `jobs` records are processed concurrently. Only a bounded window of
+    records is read ahead, so arbitrarily long inputs run in constant memory.
+
+    :param records: The input records. An exception in place of a record is
+        reported as that record's error.
+    :param process: Returns the result for a record, or raises to report an
+        error for that record.
+    :param output: Where the result lines are written.
+    :param jobs: The number of records to process concurrently.
+    :return: The number of records that failed.
+    :raises ValueError: If `jobs` is less than 1.
+    """
+    if jobs < 1:
+        raise ValueError("--jobs must be at least 1")
+
+    failures = 0
+
+    def write(index: int, future: Future):
+        nonlocal failures
+        error = future.exception()
+        if error is not None:
+            failures += 1
+            output.write(format_result(index, error=error) + '\n')
+        else:
+            output.write(format_result(index, future.result()) + '\n')
+        output.flush()
+
+    window: deque[tuple[int, Future]] = deque()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for index, record in enumerate(records):
+            if isinstance(record, BaseException):
+                future: Future = Future()
+                future.set_exception(record)
+            else:
+                future = executor.submit(process, record)
+            window.append((index, future))
+            if len(window) >= 2 * jobs:
+                write(*window.popleft())
+        while window:
+            write(*window.popleft())
+    return failures
@@ -0,0 +1,289 @@
+import functools
+import json
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, NamedTuple, TextIO, TypeVar
+
+from ssh_envelope.envelope import Envelope
+from ssh_envelope.ssh_key_encryption import SSHKeyEncryption, default_cipher, default_rounds
+from ssh_envelope.ssh_object_utils import SSHObjectKind, classify_ssh_object, import_ssh_object
+from ssh_envelope.ssh_private_key import SSHPrivateKey
+
+# Bulk import turns a directory tree of SSH material, such as a fleet's
+# collected `~/.ssh` directories, or a bundle of concatenated PEM blocks and
+# public key lines, into one envelope per object.
+#
+# Each file is split into objects: PEM blocks, and any other non-blank line
+# that isn't a `#` comment. Objects are imported in chunks on a process pool,
+# and results are produced in input order. Encrypted private keys, and whole
+# password rotations, are decrypted and encrypted on the same kind of pool.
+
+# The number of objects sent to a worker process at a time.
+chunk_size = 64
+# Decrypting or encrypting a key runs the bcrypt KDF, which dwarfs the cost
+# of sending it to a worker, so keys are sent in small chunks to spread them
+# evenly over the pool.
+kdf_chunk_size = 2
+
+Item = TypeVar("Item")
+Context = TypeVar("Context")
+
+class BulkObject(NamedTuple):
+    """
+    An SSH object found in a file.
+    """
+    # Where the object was found, as `path:line`.
+    source: str
+    # The name of its envelope in an output directory, without extension.
+    name: str
+    text: str
+
+class BulkImportResult(NamedTuple):
+    source: str
+    name: str
+    kind: str | None = None
+    result: str | None = None
+    error: str | None = None
+
+    @property
+    def is_ok(self) -> bool:
+        return self.error is None
+
+def split_bundle(text: str) -> Iterator[tuple[int, str]]:
+    """
+    Yields the objects in a bundle, with the line number each starts on.
+
+    :raises ValueError: If a PEM block is not terminated.
+    """
+    lines = text.splitlines()
+    index = 0
+    while index < len(lines):
+        line = lines[index].strip()
+        start = index
+        index += 1
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("-----BEGIN "):
+            footer = "-----END " + line[11:]
+            block = [line]
+            while index < len(lines) and lines[index].strip() != footer:
+                block.append(lines[index].strip())
+                index += 1
+            if index == len(lines):
+                raise ValueError(f"Unterminated PEM block on line {start + 1}")
+            block.append(footer)
+            index += 1
+            yield start + 1, "\n".join(block) + "\n"
+        else:
+            yield start + 1, line
+
+def read_bundle(text: str, source: str, name: str) -> Iterator[BulkObject | BulkImportResult]:
+    """
+    Yields the objects in a bundle, or an error result if it can't be split.
+
+    :param source: The bundle's path, used in each object's `source`.
+    :param name: The base name for the objects' envelopes. Objects get
+        numbered names if there is more than one.
+    """
+    try:
+        objects = list(split_bundle(text))
+    except ValueError as e:
+        yield BulkImportResult(source, name, error=str(e))
+        return
+    for number, (line, object_text) in enumerate(objects, 1):
+        object_name = name if len(objects) == 1 else f"{name}.{number}"
+        yield BulkObject(f"{source}:{line}", object_name, object_text)
+
+def find_objects(paths: Iterable[str]) -> Iterator[BulkObject | BulkImportResult]:
+    """
+    Yields the objects in the given files, and in every file under the given
+    directories, in sorted order. Files that can't be read yield an error
+    result.
+
+    Envelope names are relative to the directory given, or the base name of
+    a file given directly.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, directories, files in os.walk(path):
+                directories.sort()
+                for file_name in sorted(files):
+                    file_path = os.path.join(directory, file_name)
+                    yield from _read_file(file_path, os.path.relpath(file_path, path))
+        else:
+            yield from _read_file(path, os.path.basename(path))
+
+def _read_file(path: str, name: str) -> Iterator[BulkObject | BulkImportResult]:
+    try:
+        with open(path, "r") as file:
+            text = file.read()
+    except UnicodeDecodeError:
+        yield BulkImportResult(path, name, error="Not a text file")
+        return
+    except OSError as e:
+        yield BulkImportResult(path, name, error=e.strerror or str(e))
+        return
+    yield from read_bundle(text, path, name)
+
+def import_object_text(text: str, password: bytes | str | None = None) -> tuple[str, str]:
+    """
+    Imports one object without prompting, returning its kind and envelope UR.
+
+    :param password: Decrypts encrypted private keys.
+    :raises ValueError: If the object is invalid, or is an encrypted private
+        key and there is no password or it is incorrect.
+    """
+    kind = classify_ssh_object(text)
+    if kind == SSHObjectKind.ENCRYPTED_PRIVATE_KEY:
+        if password is None:
+            raise ValueError("Encrypted private keys need a password in bulk import")
+        return kind.value, Envelope.from_ssh_private_key(SSHPrivateKey.from_pem_string(text, password)).ur
+    return kind.value, Envelope.from_ssh_object(import_ssh_object(text)).ur
+
+def _import_chunk(texts: list[str], password: bytes | str | None = None) -> list[tuple[str | None, str | None, str | None]]:
+    results: list[tuple[str | None, str | None, str | None]] = []
+    for text in texts:
+        try:
+            kind, ur = import_object_text(text, password)
+            results.append((kind, ur, None))
+        except Exception as e:
+            results.append((None, None, str(e) or type(e).__name__))
+    return results
+
+def bulk_import(items: Iterable[BulkObject | BulkImportResult], jobs: int | None = None, password: bytes | str | None = None) -> Iterator[BulkImportResult]:
+    """
+    Imports the objects in parallel and yields their results in input order.
+    Error results among the items are passed through.
+
+    Only a bounded window of chunks is in flight, so arbitrarily many objects
+    import in constant memory.
+
+    :param jobs: The number of worker processes. Defaults to the number of
+        CPUs. With 1, objects are imported in this process.
+    :param password: Decrypts encrypted private keys. Without it they are
+        reported as errors.
+    :raises ValueError: If `jobs` is less than 1.
+    """
+    work = ((chunk, _texts(chunk)) for chunk in _chunks(items, chunk_size))
+    for chunk, results in _map_chunks(functools.partial(_import_chunk, password=password), work, jobs):
+        yield from _chunk_results(chunk, results)
+
+def decrypt_private_keys(pem_strings: Iterable[str], password: bytes | str, jobs: int | None = None) -> Iterator[SSHPrivateKey]:
+    """
+    Decrypts encrypted OpenSSH private keys on a process pool, since each
+    runs the CPU-bound bcrypt KDF, and yields them in input order.
+
+    :param jobs: The number of worker processes. Defaults to the number of
+        CPUs. With 1, keys are decrypted in this process.
+    :raises ValueError: If a key is invalid or the password is incorrect.
+    """
+    work = ((None, chunk) for chunk in _chunks(pem_strings, kdf_chunk_size))
+    for _, keys in _map_chunks(functools.partial(_decrypt_chunk, password=password), work, jobs):
+        yield from keys
+
+def encrypt_private_keys(keys: Iterable[SSHPrivateKey], password: bytes | str, cipher_name: str = default_cipher, rounds: int = default_rounds, jobs: int | None = None) -> Iterator[str]:
+    """
+    Encrypts private keys on a process pool, each with a fresh salt, and
+    yields their PEM strings in input order. Decrypting with
+    `decrypt_private_keys` and encrypting with a new password rotates the
+    password of many keys.
+
+    :param jobs: The number of worker processes. Defaults to the number of
+        CPUs. With 1, keys are encrypted in this process.
+    :raises ValueError: If the cipher is not supported.
+    """
+    # Fails on an unsupported cipher before any worker starts.
+    SSHKeyEncryption.generate(cipher_name, rounds)
+    encrypt = functools.partial(_encrypt_chunk, password=password, cipher_name=cipher_name, rounds=rounds)
+    work = ((None, chunk) for chunk in _chunks(keys, kdf_chunk_size))
+    for _, pem_strings in _map_chunks(encrypt, work, jobs):
+        yield from pem_strings
+
+def _decrypt_chunk(pem_strings: list[str], password: bytes | str) -> list[SSHPrivateKey]:
+    return [SSHPrivateKey.from_pem_string(pem_string, password) for pem_string in pem_strings]
+
+def _encrypt_chunk(keys: list[SSHPrivateKey], password: bytes | str, cipher_name: str, rounds: int) -> list[str]:
+    return [key.encrypted_pem(password, SSHKeyEncryption.generate(cipher_name, rounds)).pem_string for key in keys]
+
+def _map_chunks(function: Callable[[list], list], work: Iterable[tuple[Context, list]], jobs: int | None) -> Iterator[tuple[Context, list]]:
+    # Applies the function to each chunk of work, on a process pool unless
+    # `jobs` is 1, and yields each chunk's context with its results, in order.
+    if jobs is not None and jobs < 1:
+        raise ValueError("--jobs must be at least 1")
+
+    if jobs == 1:
+        for context, chunk in work:
+            yield context, function(chunk)
+        return
+
+    workers = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        window: deque[tuple[Context, Future]] = deque()
+        for context, chunk in work:
+            window.append((context, executor.submit(function, chunk)))
+            if len(window) >= 2 * workers:
+                context, future = window.popleft()
+                yield context, future.result()
+        while window:
+            context, future = window.popleft()
+            yield context, future.result()
+
+def _texts(chunk: list[BulkObject | BulkImportResult]) -> list[str]:
+    return [item.text for item in chunk if isinstance(item, BulkObject)]
+
+def _chunks(items: Iterable[Item], size: int) -> Iterator[list[Item]]:
+    chunk: list[Item] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _chunk_results(chunk: list[BulkObject | BulkImportResult], results: list[tuple[str | None, str | None, str | None]]) -> Iterator[BulkImportResult]:
+    imported = iter(results)
+    for item in chunk:
+        if isinstance(item, BulkImportResult):
+            yield item
+        else:
+            kind, ur, error = next(imported)
+            yield BulkImportResult(item.source, item.name, kind, ur, error)
+
+def write_ndjson(results: Iterable[BulkImportResult], output: TextIO, errors: TextIO | None = None) -> int:
+    """
+    Writes one JSON object per result to the output, with errors included.
+
+    :param errors: If given, errors are written to this report instead.
+    :return: The number of failed objects and files.
+    """
+    failures = 0
+    for result in results:
+        if result.is_ok:
+            output.write(json.dumps({"source": result.source, "status": "ok", "type": result.kind, "result": result.result}) + "\n")
+        else:
+            failures += 1
+            error_output = errors if errors is not None else output
+            error_output.write(json.dumps({"source": result.source, "status": "error", "error": result.error}) + "\n")
+    return failures
+
+def write_directory(results: Iterable[BulkImportResult], directory: str, errors: TextIO) -> int:
+    """
+    Writes each envelope to `<name>.ur` in the directory, mirroring the input
+    tree, and reports errors as JSON lines.
+
+    :return: The number of failed objects and files.
+    """
+    failures = 0
+    for result in results:
+        if not result.is_ok:
+            failures += 1
+            errors.write(json.dumps({"source": result.source, "status": "error", "error": result.error}) + "\n")
+            continue
+        assert result.result is not None
+        path = os.path.join(directory, result.name + ".ur")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(result.result + "\n")
+    return failures
@@ -0,0 +1,81 @@
+import zlib
+from enum import Enum
+
+words = (
+    "able acid also apex aqua arch atom aunt away axis back bald barn belt beta bias "
+    "blue body brag brew bulb buzz calm cash cats chef city claw code cola cook cost "
+    "crux curl cusp cyan dark data days deli dice diet door down draw drop drum dull "
+    "duty each easy echo edge epic even exam exit eyes fact fair fern figs film fish "
+    "fizz flap flew flux foxy free frog fuel fund gala game gear gems gift girl glow "
+    "good gray grim guru gush gyro half hang hard hawk heat help high hill holy hope "
+    "horn huts iced idea idle inch inky into iris iron item jade jazz join jolt jowl "
+    "judo jugs jump junk jury keep keno kept keys kick kiln king kite kiwi knob lamb "
+    "lava lazy leaf legs liar limp lion list logo loud love luau luck lung main many "
+    "math maze memo menu meow mild mint miss monk nail navy need news next noon note "
+    "numb obey oboe omit onyx open oval owls paid part peck play plus poem pool pose "
+    "puff puma purr quad quiz race ramp real redo rich road rock roof ruby ruin runs "
+    "rust safe saga scar sets silk skew slot soap solo song stub surf swan taco task "
+    "taxi tent tied time tiny toil tomb toys trip tuna twin ugly undo unit urge user "
+    "vast very veto vial vibe view visa void vows wall wand warm wasp wave waxy webs "
+    "what when whiz wolf work yank yawn yell yoga yurt zaps zero zest zinc zone zoom"
+).split()
+
+minimal_words = [word[0] + word[-1] for word in words]
+
+# Reverse lookup tables, built once at import.
+_word_values = {word: value for value, word in enumerate(words)}
+_minimal_word_values = {word: value for value, word in enumerate(minimal_words)}
+
+checksum_length = 4
+
+class Style(Enum):
+    STANDARD = "standard"
+    URI = "uri"
+    MINIMAL = "minimal"
+
+    @property
+    def separator(self) -> str:
+        return {
+            Style.STANDARD: " ",
+            Style.URI: "-",
+            Style.MINIMAL: "",
+        }[self]
+
+def checksum(data: bytes) -> bytes:
+    return zlib.crc32(data).to_bytes(checksum_length, byteorder="big")
+
+def encode(data: bytes, style: Style = Style.MINIMAL) -> str:
+    """
+    Encodes the data as bytewords, followed by its CRC32 checksum.
+    """
+    table = minimal_words if style == Style.MINIMAL else words
+    return style.separator.join(table[byte] for byte in data + checksum(data))
+
+def decode(string: str, style: Style = Style.MINIMAL) -> bytes:
+    """
+    Decodes bytewords and validates the trailing CRC32 checksum.
+
+    Decoding is case-insensitive.
+
+    :raises ValueError: If the string contains an invalid word or the checksum
+        does not match.
+    """
+    string = string.lower()
+    if style == Style.MINIMAL:
+        if len(string) % 2 != 0:
+            raise ValueError("Bytewords: invalid length")
+        table = _minimal_word_values
+        tokens = [string[i:i + 2] for i in range(0, len(string), 2)]
+    else:
+        table = _word_values
+        tokens = string.split(style.separator)
+    try:
+        data = bytes(table[token] for token in tokens)
+    except KeyError:
+        raise ValueError("Bytewords: invalid word")
+    if len(data) < checksum_length + 1:
+        raise ValueError("Bytewords: too short")
+    payload, expected_checksum = data[:-checksum_length], data[-checksum_length:]
+    if checksum(payload) != expected_checksum:
+        raise ValueError("Bytewords: invalid checksum")
+    return payload
@@ -6,9 +6,72 @@ ssh_public_key_tag = 40801
 ssh_signature_tag = 40802
 ssh_certificate_tag = 40803
 
+leaf_tag = 24
+envelope_tag = 200
+known_value_tag = 40000
+
 def tagged_string(tag: int, string: str) -> bytes:
     return cbor2.dumps(cbor2.CBORTag(tag, string))
 
 def extract_cbor_tag_and_value(cbor: bytes) -> tuple[int, Any]:
     c = cbor2.loads(cbor)
     return c.tag, c.value
+
+def encode_head(major_type: int, argument: int) -> bytes:
+    """
+    Encodes a CBOR item head using the shortest form for the argument.
+    """
+    initial = major_type << 5
+    if argument < 24:
+        return bytes([initial | argument])
+    elif argument < 0x100:
+        return bytes([initial | 24, argument])
+    elif argument < 0x10000:
+        return bytes([initial | 25]) + argument.to_bytes(2, byteorder="big")
+    elif argument < 0x100000000:
+        return bytes([initial | 26]) + argument.to_bytes(4, byteorder="big")
+    else:
+        return bytes([initial | 27]) + argument.to_bytes(8, byteorder="big")
+
+def read_head(data: bytes, index: int) -> tuple[int, int, int]:
+    """
+    Reads a CBOR item head at `index`.
+
+    Returns a tuple of the major type, the argument, and the index of the
+    first byte after the head. Indefinite-length items are rejected, as they
+    are not permitted in deterministic CBOR.
+    """
+    if index >= len(data):
+        raise ValueError("CBOR: unexpected end of data")
+    initial = data[index]
+    major_type = initial >> 5
+    info = initial & 0x1f
+    index += 1
+    if info < 24:
+        return major_type, info, index
+    if info > 27:
+        raise ValueError("CBOR: unsupported additional information")
+    length = 1 << (info - 24)
+    if index + length > len(data):
+        raise ValueError("CBOR: unexpected end of data")
+    argument = int.from_bytes(data[index:index + length], byteorder="big")
+    return major_type, argument, index + length
+
+def skip_item(data: bytes, index: int) -> int:
+    """
+    Returns the index of the first byte after the CBOR item at `index`.
+    """
+    major_type, argument, index = read_head(data, index)
+    if major_type in (2, 3):
+        index += argument
+        if index > len(data):
+            raise ValueError("CBOR: unexpected end of data")
+    elif major_type == 4:
+        for _ in range(argument):
+            index = skip_item(data, index)
+    elif major_type == 5:
+        for _ in range(argument * 2):
+            index = skip_item(data, index)
+    elif major_type == 6:
+        index = skip_item(data, index)
+    return index
@@ -0,0 +1,104 @@
+import socket
+import threading
+from typing import Any
+
+from ssh_envelope.envelope import Envelope
+from ssh_envelope.protocol import receive_message, send_message
+
+class EnvelopeClient:
+    """
+    A client for the `serve` daemon.
+
+    Each thread using the client gets its own connection, so one client can be
+    shared by a worker pool.
+    """
+    def __init__(self, path: str):
+        """
+        :param path: The path of the daemon's Unix domain socket.
+        """
+        self._path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sockets: list[socket.socket] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """
+        Closes every connection opened by the client.
+        """
+        with self._lock:
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            sock.close()
+        self._local = threading.local()
+
+    def _socket(self) -> socket.socket:
+        sock = getattr(self._local, "socket", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self._path)
+            self._local.socket = sock
+            with self._lock:
+                self._sockets.append(sock)
+        return sock
+
+    def request(self, request: dict[str, Any]) -> dict[str, Any]:
+        """
+        Sends a request and returns the response.
+
+        :raises ValueError: If the daemon reports an error.
+        """
+        sock = self._socket()
+        send_message(sock, request)
+        response = receive_message(sock)
+        if response is None:
+            raise ValueError("Connection closed by server")
+        if response.get("status") != "ok":
+            raise ValueError(response.get("error", "Request failed"))
+        return response
+
+    def fingerprints(self) -> list[str]:
+        """
+        Returns the fingerprints of the daemon's signing keys.
+        """
+        return self.request({"op": "keys"})["fingerprints"]
+
+    def add_signature(self, envelope: Envelope, namespace: str = "envelope", fingerprints: list[str] | None = None) -> Envelope:
+        """
+        Has the daemon sign the envelope's subject.
+
+        :param envelope: The envelope to sign.
+        :param namespace: The namespace for the signatures.
+        :param fingerprints: The signing keys to use. Defaults to all of the
+            daemon's signing keys.
+        :return: The signed envelope.
+        """
+        request: dict[str, Any] = {"op": "sign", "envelope": envelope.ur, "namespace": namespace}
+        if fingerprints:
+            request["fingerprints"] = fingerprints
+        return Envelope(self.request(request)["result"])
+
+    def verify_signature(self, envelope: Envelope, public_key: Envelope | None = None, threshold: int | None = None) -> tuple[bool, list[str]]:
+        """
+        Has the daemon verify the envelope.
+
+        :param envelope: The envelope to verify.
+        :param public_key: The key to verify with. Defaults to the daemon's
+            keyring.
+        :param threshold: The number of distinct signers on the daemon's
+            keyring required.
+        :return: Whether the envelope is verified, and the fingerprints of the
+            verified signers on the keyring.
+        """
+        request: dict[str, Any] = {"op": "verify", "envelope": envelope.ur}
+        if public_key is not None:
+            request["key"] = public_key.ur
+        if threshold is not None:
+            request["threshold"] = threshold
+        response = self.request(request)
+        return response["verified"], response["signers"]
@@ -1,34 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, TypeVar
 
-from ssh_envelope.cbor_utils import extract_cbor_tag_and_value, tagged_string
-from ssh_envelope.run_command import run_command
-from ssh_envelope.ssh_keygen_utils import sign_message, verify_message
+import cbor2
+
+from ssh_envelope.cbor_utils import extract_cbor_tag_and_value, read_head, tagged_string
+from ssh_envelope.envelope_format import format_envelope
+from ssh_envelope.envelope_node import AssertionNode, EnvelopeNode, KnownValueNode, LeafNode, decode_envelope
+from ssh_envelope.keyring import Keyring
+from ssh_envelope.known_values import known_value_from_string
+from ssh_envelope.ssh_agent import SSHAgent
+from ssh_envelope.sshsig import sign_message, verify_message
+from ssh_envelope.threshold import verify_threshold
 from ssh_envelope.ssh_private_key import SSHPrivateKey
 from ssh_envelope.ssh_public_key import SSHPublicKey
 from ssh_envelope.ssh_signature import SSHSignature
+from ssh_envelope.ur import decode_ur, encode_ur
 from ssh_envelope.cbor_utils import ssh_private_key_tag, ssh_public_key_tag, ssh_signature_tag
 
 Self = TypeVar('Self', bound='Envelope')
 
+ur_type = "envelope"
+ur_prefix = f"ur:{ur_type}/"
+
+def _leaf_assertion(pred: Any, obj: Any) -> AssertionNode:
+    return AssertionNode(LeafNode(cbor2.dumps(pred)), LeafNode(cbor2.dumps(obj)))
+
 class Envelope:
     def __init__(self, ur: str):
-        if not ur.startswith("ur:envelope/"):
+        ur = ur.strip()
+        if not ur.lower().startswith(ur_prefix):
             raise ValueError("Not an envelope UR")
+        _, cbor = decode_ur(ur, ur_type)
+        self._init(ur.lower(), cbor, None)
+
+    def _init(self, ur: str | None, cbor: bytes | None, node: EnvelopeNode | None):
+        # Any of the UR, CBOR and node tree may be missing; each is derived from
+        # the others on first use and then remembered, as are the derived
+        # envelopes and the formatted text.
         self._ur = ur
+        self._cbor = cbor
+        self._node = node
+        self._subject: Envelope | None = None
+        self._predicate: Envelope | None = None
+        self._object: Envelope | None = None
+        self._format: str | None = None
 
     def __repr__(self):
-        return self._ur
+        return self.ur
 
     def __eq__(self, other):
         if isinstance(other, Envelope):
-            return self._ur == other._ur
+            return self.cbor == other.cbor
         return False
 
     def __hash__(self):
-        return hash(self._ur)
+        return hash(self.cbor)
+
+    @classmethod
+    def from_cbor(cls, cbor: bytes):
+        """
+        Creates an envelope from its untagged CBOR encoding.
+
+        The CBOR is decoded into a node tree on first use.
+        """
+        envelope = cls.__new__(cls)
+        envelope._init(None, cbor, None)
+        return envelope
+
+    @classmethod
+    def from_node(cls, node: EnvelopeNode):
+        """
+        Creates an envelope from a node tree.
+
+        The envelope shares the tree, so any digests already computed for its
+        subtrees are not computed again.
+        """
+        envelope = cls.__new__(cls)
+        envelope._init(None, None, node)
+        return envelope
+
+    @property
+    def cbor(self) -> bytes:
+        """
+        Returns the untagged CBOR encoding of the envelope.
+        """
+        if self._cbor is None:
+            assert self._node is not None
+            self._cbor = self._node.cbor
+        return self._cbor
+
+    @property
+    def node(self) -> EnvelopeNode:
+        """
+        Returns the decoded node tree of the envelope.
+        """
+        if self._node is None:
+            self._node = decode_envelope(self.cbor)
+        return self._node
 
     @property
     def ur(self):
+        if self._ur is None:
+            self._ur = encode_ur(ur_type, self.cbor)
         return self._ur
 
     @property
@@ -36,22 +109,26 @@ class Envelope:
         """
         Returns the envelope notation format of the envelope.
         """
-        return run_command(["envelope", "format", self.ur]).decode().strip()
+        if self._format is None:
+            self._format = format_envelope(self.node)
+        return self._format
 
     @property
     def digest(self):
         """
         Returns the top-level digest of the envelope.
         """
-        hex = run_command(["envelope", "digest", "--hex", self.ur]).decode()
-        return bytes.fromhex(hex)
+        return self.node.digest
 
     @property
     def subject(self):
         """
         Returns the subject of the envelope as an envelope.
         """
-        return self.__class__(run_command(["envelope", "extract", "envelope", self.ur]).decode().strip())
+        if self._subject is None:
+            subject = self.node.subject
+            self._subject = self if subject is self.node else self.from_node(subject)
+        return self._subject
 
     @property
     def predicate(self):
@@ -60,7 +137,9 @@ class Envelope:
 
         :raises ValueError: If this envelope is not an assertion.
         """
-        return self.__class__(run_command(["envelope", "extract", "predicate", self.ur]).decode().strip())
+        if self._predicate is None:
+            self._predicate = self.from_node(self._assertion_node().predicate)
+        return self._predicate
 
     @property
     def object(self):
@@ -69,36 +148,43 @@ class Envelope:
 
         :raises ValueError: If this envelope is not an assertion.
         """
-        return self.__class__(run_command(["envelope", "extract", "object", self.ur]).decode().strip())
+        if self._object is None:
+            self._object = self.from_node(self._assertion_node().object)
+        return self._object
+
+    def _assertion_node(self) -> AssertionNode:
+        subject = self.node.subject
+        if not isinstance(subject, AssertionNode):
+            raise ValueError("Envelope is not an assertion")
+        return subject
 
     @classmethod
     def from_string(cls, string: str):
         """
         Creates an envelope with a string subject.
         """
-        return cls(run_command(["envelope", "subject", "type", "string", string]).decode().strip())
+        return cls.from_node(LeafNode(cbor2.dumps(string)))
 
     @classmethod
     def from_int(cls, value: int):
         """
         Creates an envelope with an integer subject.
         """
-        return cls(run_command(["envelope", "subject", "type", "number", str(value)]).decode().strip())
+        return cls.from_node(LeafNode(cbor2.dumps(value)))
 
     @classmethod
     def from_tagged_string(cls, tag: int, string: str):
         """
         Creates an envelope with a CBOR-tagged string subject.
         """
-        hex = tagged_string(tag, string).hex()
-        return cls(run_command(["envelope", "subject", "type", "cbor", hex]).decode().strip())
+        return cls.from_node(LeafNode(tagged_string(tag, string)))
 
     @classmethod
     def from_known_value(cls, value: int | str):
         """
         Creates an envelope with a known value subject.
         """
-        return cls(run_command(["envelope", "subject", "type", "known", str(value)]).decode().strip())
+        return cls.from_node(KnownValueNode(known_value_from_string(value)))
 
     @classmethod
     def from_assertion_pred_obj(cls, pred_type: str, pred_value: int | str, obj_type: str, obj_value: int | str):
@@ -106,24 +192,44 @@ class Envelope:
         Creates an assertion envelope with the given predicate and object.
 
         See the `envelope` command-line tool for the list of valid predicate and
-        object types.
+        object types. The types supported here are `string`, `number`, `known`,
+        `cbor`, `envelope` and `wrapped`.
         """
-        return cls(run_command(["envelope", "subject", "assertion", pred_type, str(pred_value), obj_type, str(obj_value)]).decode().strip())
+        predicate = cls._typed_node(pred_type, pred_value)
+        object = cls._typed_node(obj_type, obj_value)
+        return cls.from_node(AssertionNode(predicate, object))
+
+    @classmethod
+    def _typed_node(cls, value_type: str, value: int | str) -> EnvelopeNode:
+        if value_type == "string":
+            return LeafNode(cbor2.dumps(str(value)))
+        elif value_type == "number":
+            return LeafNode(cbor2.dumps(int(value)))
+        elif value_type == "known":
+            return KnownValueNode(known_value_from_string(value))
+        elif value_type == "cbor":
+            return LeafNode(bytes.fromhex(str(value)))
+        elif value_type == "envelope":
+            return cls(str(value)).node
+        elif value_type == "wrapped":
+            return cls(str(value)).node.wrapped()
+        else:
+            raise ValueError(f"Unsupported envelope value type: {value_type}")
 
     @classmethod
     def from_ssh_private_key(cls, private_key: SSHPrivateKey):
         """
         Creates an envelope with an SSH private key subject.
         """
-        e: Envelope = cls.from_tagged_string(ssh_private_key_tag, private_key.pem_string)\
+        builder = EnvelopeBuilder(cls.from_tagged_string(ssh_private_key_tag, private_key.pem_string))\
             .add_string_int_assertion("keySize", private_key.key_size)\
             .add_string_string_assertion("fingerprint", private_key.fingerprint)\
             .add_string_string_assertion("type", private_key.type_name)
 
         if private_key.comment:
-            e = e.add_string_string_assertion("comment", private_key.comment)
+            builder.add_string_string_assertion("comment", private_key.comment)
 
-        return e
+        return builder.build()
 
     def to_ssh_private_key(self) -> SSHPrivateKey:
         """
@@ -142,15 +248,15 @@ class Envelope:
         """
         Creates an envelope with an SSH public key subject.
         """
-        e = cls.from_tagged_string(ssh_public_key_tag, public_key.string)\
+        builder = EnvelopeBuilder(cls.from_tagged_string(ssh_public_key_tag, public_key.string))\
             .add_string_int_assertion("keySize", public_key.key_size)\
             .add_string_string_assertion("fingerprint", public_key.fingerprint)\
             .add_string_string_assertion("type", public_key.type_name)
 
         if public_key.comment:
-            e = e.add_string_string_assertion("comment", public_key.comment)
+            builder.add_string_string_assertion("comment", public_key.comment)
 
-        return e
+        return builder.build()
 
     def to_ssh_public_key(self) -> SSHPublicKey:
         """
@@ -169,12 +275,11 @@ class Envelope:
         """
         Creates an envelope with an SSH signature subject.
         """
-        e = cls.from_tagged_string(ssh_signature_tag, signature.pem_string)\
+        return EnvelopeBuilder(cls.from_tagged_string(ssh_signature_tag, signature.pem_string))\
             .add_string_string_assertion("namespace", signature.namespace)\
             .add_string_string_assertion("hashAlgorithm", signature.hash_algorithm.name)\
-            .add_string_string_assertion("keyType", signature.type.name)
-
-        return e
+            .add_string_string_assertion("keyType", signature.type.name)\
+            .build()
 
     def to_ssh_signature(self) -> SSHSignature:
         """
@@ -244,7 +349,7 @@ class Envelope:
         :param obj: The object of the assertion.
         :return: The envelope with the new assertion.
         """
-        return self.__class__(run_command(["envelope", "assertion", "add", "pred-obj", "envelope", pred.ur, "envelope", obj.ur, self.ur]).decode().strip())
+        return self.from_node(self.node.add_assertion(AssertionNode(pred.node, obj.node)))
 
     def add_string_string_assertion(self: Self, pred: str, obj: str) -> Self:
         """
@@ -257,7 +362,7 @@ class Envelope:
         :param obj: The object of the assertion.
         :return: The envelope with the new assertion.
         """
-        return self.__class__(run_command(["envelope", "assertion", "add", "pred-obj", "string", pred, "string", obj, self.ur]).decode().strip())
+        return self.from_node(self.node.add_assertion(_leaf_assertion(pred, obj)))
 
     def add_string_int_assertion(self: Self, pred: str, obj: int) -> Self:
         """
@@ -270,13 +375,13 @@ class Envelope:
         :param obj: The object of the assertion.
         :return: The envelope with the new assertion.
         """
-        return self.__class__(run_command(["envelope", "assertion", "add", "pred-obj", "string", pred, "number", str(obj), self.ur]).decode().strip())
+        return self.from_node(self.node.add_assertion(_leaf_assertion(pred, obj)))
 
     def wrapped(self):
         """
         Returns the wrapped envelope.
         """
-        return self.__class__(run_command(["envelope", "subject", "type", "wrapped", self.ur]).decode().strip())
+        return self.from_node(self.node.wrapped())
 
     def extract_tagged_cbor_subject(self) -> tuple[int, Any]:
         """
@@ -286,8 +391,10 @@ class Envelope:
 
         Fails if the subject is not a CBOR-tagged value.
         """
-        hex = run_command(["envelope", "extract", "cbor", self.ur]).decode()
-        return extract_cbor_tag_and_value(bytes.fromhex(hex))
+        subject = self.node.subject
+        if not isinstance(subject, LeafNode) or read_head(subject.value, 0)[0] != 6:
+            raise ValueError("Envelope subject is not a CBOR-tagged value")
+        return extract_cbor_tag_and_value(subject.value)
 
     def add_signature(self: Self, private_key: Self, namespace: str) -> Self:
         """
@@ -311,6 +418,62 @@ class Envelope:
         # Add the signature to the envelope
         return self.add_assertion(self.from_known_value("verifiedBy"), signature)
 
+    def add_signatures(self: Self, private_keys: list[Self], namespace: str, max_workers: int | None = None) -> Self:
+        """
+        Sign the envelope's subject with each of the given private keys.
+
+        The subject digest is computed once, the signatures are made
+        concurrently, and all of the new `verifiedBy` assertions are added to
+        the envelope in a single step.
+
+        :param private_keys: The private keys to sign the envelope with.
+        :param namespace: The namespace for the signatures.
+        :param max_workers: The maximum number of concurrent signing operations.
+        :return: The signed envelope.
+        """
+        ssh_private_keys = [private_key.to_ssh_private_key() for private_key in private_keys]
+        return self.add_ssh_signatures(ssh_private_keys, namespace, max_workers)
+
+    def add_ssh_signatures(self: Self, ssh_private_keys: list[SSHPrivateKey], namespace: str, max_workers: int | None = None) -> Self:
+        """
+        Like `add_signatures`, but takes already decoded SSH private keys, so
+        callers that sign many envelopes with the same keys decode them once.
+
+        :param ssh_private_keys: The private keys to sign the envelope with.
+        :param namespace: The namespace for the signatures.
+        :param max_workers: The maximum number of concurrent signing operations.
+            With 1, or a single key, the keys are signed with on this thread.
+        :return: The signed envelope.
+        """
+        digest = self.subject.digest
+        if max_workers == 1 or len(ssh_private_keys) <= 1:
+            ssh_signatures = [sign_message(digest, key, namespace) for key in ssh_private_keys]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                ssh_signatures = list(executor.map(lambda key: sign_message(digest, key, namespace), ssh_private_keys))
+        builder = EnvelopeBuilder(self)
+        for ssh_signature in ssh_signatures:
+            builder.add_known_value_assertion("verifiedBy", Envelope.from_ssh_signature(ssh_signature))
+        return builder.build()
+
+    def add_agent_signatures(self: Self, agent: SSHAgent, public_keys: list[SSHPublicKey], namespace: str) -> Self:
+        """
+        Sign the envelope's subject with keys held by an ssh-agent.
+
+        The private keys never leave the agent.
+
+        :param agent: The agent holding the private keys.
+        :param public_keys: The public keys of the agent's keys to sign with.
+        :param namespace: The namespace for the signatures.
+        :return: The signed envelope.
+        """
+        digest = self.subject.digest
+        builder = EnvelopeBuilder(self)
+        for public_key in public_keys:
+            ssh_signature = agent.sign_message(digest, public_key.key_data, namespace)
+            builder.add_known_value_assertion("verifiedBy", Envelope.from_ssh_signature(ssh_signature))
+        return builder.build()
+
     def verify_signature(self: Self, public_key: Self) -> bool:
         """
         Verify the envelope with the given public key.
@@ -324,15 +487,58 @@ class Envelope:
         :return: True if the envelope is verified by the public key, False
             otherwise.
         """
+        return self.verify_ssh_signature(public_key.to_ssh_public_key())
+
+    def verify_ssh_signature(self, ssh_public_key: SSHPublicKey) -> bool:
+        """
+        Like `verify_signature`, but takes an already decoded SSH public key,
+        so callers that verify many envelopes with the same key decode it
+        once.
+        """
         # Get the digest of the envelope's subject
         digest = self.subject.digest
-        # Convert the public key envelope to an SSH public key
-        ssh_public_key = public_key.to_ssh_public_key()
-        # Get every SSH signature on the envelope
-        signatures = self.find_signatures()
+        # Get every SSH signature on the envelope made by this key
+        signatures = [signature for signature in self.find_signatures() if signature.public_key_data == ssh_public_key.key_data]
         # Return True if any of the signatures are valid
         return any(verify_message(digest, signature, ssh_public_key) for signature in signatures)
 
+    def verified_signers(self, keyring: Keyring) -> list[SSHPublicKey]:
+        """
+        Find the keys on the keyring that have validly signed the envelope.
+
+        Each `verifiedBy` signature is paired with its signer by the public key
+        embedded in the signature, so only matching pairs are checked.
+
+        :param keyring: The trusted public keys.
+        :return: The distinct signers whose signatures are valid, in the order
+            their signatures appear on the envelope.
+        """
+        digest = self.subject.digest
+        signers: list[SSHPublicKey] = []
+        for signature in self.find_signatures():
+            signer = keyring.signer_of(signature)
+            if signer is None or signer in signers:
+                continue
+            if verify_message(digest, signature, signer):
+                signers.append(signer)
+        return signers
+
+    def verify_threshold(self, keyring: Keyring, threshold: int, max_workers: int | None = None) -> bool:
+        """
+        Verify that at least `threshold` distinct keys on the keyring have
+        validly signed the envelope's subject.
+
+        The signatures are checked concurrently, and checking stops as soon as
+        the outcome is known.
+
+        :param keyring: The trusted public keys.
+        :param threshold: The number of distinct signers required.
+        :param max_workers: The maximum number of concurrent checks.
+        :return: True if the threshold is met, False otherwise.
+        """
+        signers = verify_threshold(self.subject.digest, self.find_signatures(), keyring, threshold, max_workers)
+        return len(signers) >= threshold
+
     def find_signatures(self) -> list[SSHSignature]:
         """
         Find all SSH signatures on the envelope.
@@ -342,10 +548,70 @@ class Envelope:
         a valid SSH signature, it will be ignored.
         """
         # Get every `verifiedBy` assertion
-        signature_assertion_lines = run_command(["envelope", "assertion", "find", "predicate", "known", "verifiedBy", self.ur]).decode()
+        verified_by = KnownValueNode(known_value_from_string("verifiedBy"))
+        signature_assertions = self.node.assertions_with_predicate(verified_by)
         # Get the object of each `verifiedBy` assertion
-        signature_objects = [self.__class__(line.strip()).object for line in signature_assertion_lines.splitlines()]
+        signature_objects = [self.from_node(assertion.object) for assertion in signature_assertions]
         # Convert each object to an SSH signature, or None if it's not a valid SSH signature
         maybe_signatures = [signature_object.to_maybe_ssh_signature() for signature_object in signature_objects]
         # Filter out the None values
         return [signature for signature in maybe_signatures if signature is not None]
+
+
+class EnvelopeBuilder:
+    """
+    Collects a subject and any number of assertions, then materializes the
+    envelope in one pass.
+
+    Adding assertions one at a time to an `Envelope` produces (and encodes) a
+    new envelope for each assertion. The builder instead creates the final
+    node once, so the envelope is encoded and its digest computed once
+    regardless of how many assertions are added.
+
+    Each `add_*` method returns the builder, so calls can be chained.
+    """
+    def __init__(self, subject: Envelope):
+        self._subject = subject
+        self._assertions: list[EnvelopeNode] = []
+
+    def add_assertion(self, pred: Envelope, obj: Envelope) -> "EnvelopeBuilder":
+        """
+        Adds an assertion with the given predicate and object envelopes.
+        """
+        self._assertions.append(AssertionNode(pred.node, obj.node))
+        return self
+
+    def add_assertion_envelope(self, assertion: Envelope) -> "EnvelopeBuilder":
+        """
+        Adds an existing assertion envelope.
+        """
+        self._assertions.append(assertion.node)
+        return self
+
+    def add_string_string_assertion(self, pred: str, obj: str) -> "EnvelopeBuilder":
+        """
+        Adds an assertion with string predicate and object.
+        """
+        self._assertions.append(_leaf_assertion(pred, obj))
+        return self
+
+    def add_string_int_assertion(self, pred: str, obj: int) -> "EnvelopeBuilder":
+        """
+        Adds an assertion with string predicate and integer object.
+        """
+        self._assertions.append(_leaf_assertion(pred, obj))
+        return self
+
+    def add_known_value_assertion(self, pred: int | str, obj: Envelope) -> "EnvelopeBuilder":
+        """
+        Adds an assertion with a known value predicate and the given object
+        envelope.
+        """
+        self._assertions.append(AssertionNode(KnownValueNode(known_value_from_string(pred)), obj.node))
+        return self
+
+    def build(self) -> Envelope:
+        """
+        Returns the envelope with all of the collected assertions added.
+        """
+        return self._subject.from_node(self._subject.node.add_assertions(self._assertions))
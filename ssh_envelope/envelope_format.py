@@ -0,0 +1,192 @@
+import math
+import struct
+
+from ssh_envelope.cbor_utils import read_head, skip_item
+from ssh_envelope.cbor_utils import ssh_certificate_tag, ssh_private_key_tag, ssh_public_key_tag, ssh_signature_tag
+from ssh_envelope.envelope_node import AssertionNode, ElidedNode, EnvelopeNode, KnownValueNode, LeafNode, Node, WrappedNode
+from ssh_envelope.known_values import known_value_name
+
+tag_summaries = {
+    ssh_private_key_tag: "SSHPrivateKey",
+    ssh_public_key_tag: "SSHPublicKey",
+    ssh_signature_tag: "SSHSignature",
+    ssh_certificate_tag: "SSHCertificate",
+}
+
+# Format items are tuples whose first element is the kind: ("begin", text),
+# ("end", text), ("item", text) or ("separator",). Nested lists of items are
+# flattened before layout.
+_begin = "begin"
+_end = "end"
+_item = "item"
+_separator = "separator"
+
+float_formats = {
+    25: (">e", 2),
+    26: (">f", 4),
+    27: (">d", 8),
+}
+
+def format_envelope(node: EnvelopeNode) -> str:
+    """
+    Returns the envelope notation of the node, as produced by `envelope format`.
+    """
+    items = _nicen(_flatten(_format_item(node)))
+    lines = []
+    level = 0
+    current_line = ""
+    for item in items:
+        kind = item[0]
+        if kind == _begin:
+            delimiter = item[1]
+            if delimiter:
+                if current_line:
+                    line = _add_space_at_end_if_needed(current_line) + delimiter
+                else:
+                    line = delimiter
+                lines.append(_indent(level) + line)
+            level += 1
+            current_line = ""
+        elif kind == _end:
+            if current_line:
+                lines.append(_indent(level) + current_line)
+                current_line = ""
+            level -= 1
+            lines.append(_indent(level) + item[1])
+        elif kind == _item:
+            current_line += item[1]
+        elif kind == _separator:
+            if current_line:
+                lines.append(_indent(level) + current_line)
+                current_line = ""
+    if current_line:
+        lines.append(current_line)
+    return "\n".join(lines)
+
+def summary(node: EnvelopeNode) -> str:
+    """
+    Returns a single-line summary of a leaf, known value, or elided node.
+    """
+    if isinstance(node, LeafNode):
+        return _diagnostic(node.value, 0)[0]
+    elif isinstance(node, KnownValueNode):
+        return f"'{known_value_name(node.value)}'"
+    elif isinstance(node, ElidedNode):
+        return "ELIDED"
+    else:
+        raise ValueError("No summary for this envelope case")
+
+def _format_item(node: EnvelopeNode) -> list | tuple:
+    if isinstance(node, Node):
+        elided_count = 0
+        assertion_items = []
+        for assertion in node.assertions:
+            if isinstance(assertion, ElidedNode):
+                elided_count += 1
+            else:
+                assertion_items.append([_format_item(assertion)])
+        assertion_items.sort(key=lambda items: _flatten(items))
+        if elided_count > 1:
+            assertion_items.append([(_item, f"ELIDED ({elided_count})")])
+        elif elided_count == 1:
+            assertion_items.append([(_item, "ELIDED")])
+        joined_assertion_items = []
+        for index, items in enumerate(assertion_items):
+            if index > 0:
+                joined_assertion_items.append((_separator,))
+            joined_assertion_items.extend(items)
+        items = []
+        needs_braces = isinstance(node.subject, AssertionNode)
+        if needs_braces:
+            items.append((_begin, "{"))
+        items.append(_format_item(node.subject))
+        if needs_braces:
+            items.append((_end, "}"))
+        items.append((_begin, "["))
+        items.append(joined_assertion_items)
+        items.append((_end, "]"))
+        return items
+    elif isinstance(node, WrappedNode):
+        return [(_begin, "{"), _format_item(node.envelope), (_end, "}")]
+    elif isinstance(node, AssertionNode):
+        return [_format_item(node.predicate), (_item, ": "), _format_item(node.object)]
+    else:
+        return (_item, summary(node))
+
+def _flatten(item) -> list[tuple]:
+    if isinstance(item, list):
+        return [flat for element in item for flat in _flatten(element)]
+    return [item]
+
+def _nicen(items: list[tuple]) -> list[tuple]:
+    # Joins an end delimiter immediately followed by a begin delimiter onto a
+    # single line, e.g. `} [`.
+    result = []
+    index = 0
+    while index < len(items):
+        current = items[index]
+        index += 1
+        if current[0] == _end and index < len(items) and items[index][0] == _begin:
+            result.append((_end, f"{current[1]} {items[index][1]}"))
+            result.append((_begin, ""))
+            index += 1
+        else:
+            result.append(current)
+    return result
+
+def _indent(level: int) -> str:
+    return " " * (level * 4)
+
+def _add_space_at_end_if_needed(s: str) -> str:
+    if not s:
+        return " "
+    if s.endswith(" "):
+        return s
+    return s + " "
+
+def _quote(string: str) -> str:
+    escaped = string.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return f"\"{escaped}\""
+
+def _diagnostic(data: bytes, index: int) -> tuple[str, int]:
+    # Single-line CBOR diagnostic notation, with summaries for known tags.
+    info = data[index] & 0x1f if index < len(data) else 0
+    major_type, argument, index = read_head(data, index)
+    if major_type == 0:
+        return str(argument), index
+    elif major_type == 1:
+        return str(-1 - argument), index
+    elif major_type == 2:
+        return f"Bytes({argument})", index + argument
+    elif major_type == 3:
+        return _quote(data[index:index + argument].decode("utf-8")), index + argument
+    elif major_type == 4:
+        elements = []
+        for _ in range(argument):
+            element, index = _diagnostic(data, index)
+            elements.append(element)
+        return f"[{', '.join(elements)}]", index
+    elif major_type == 5:
+        entries = []
+        for _ in range(argument):
+            key, index = _diagnostic(data, index)
+            value, index = _diagnostic(data, index)
+            entries.append(f"{key}: {value}")
+        return f"{{{', '.join(entries)}}}", index
+    elif major_type == 6:
+        if argument in tag_summaries:
+            return tag_summaries[argument], skip_item(data, index)
+        value, index = _diagnostic(data, index)
+        return f"{argument}({value})", index
+    else:
+        return _simple_diagnostic(info, argument), index
+
+def _simple_diagnostic(info: int, argument: int) -> str:
+    if info in float_formats:
+        value = struct.unpack(float_formats[info][0], argument.to_bytes(float_formats[info][1], byteorder="big"))[0]
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "Infinity" if value > 0 else "-Infinity"
+        return repr(value)
+    return {20: "false", 21: "true", 22: "null", 23: "undefined"}.get(argument, f"simple({argument})")
@@ -0,0 +1,285 @@
+from hashlib import sha256
+
+from ssh_envelope.cbor_utils import encode_head, envelope_tag, known_value_tag, leaf_tag, read_head, skip_item
+
+digest_length = 32
+
+class EnvelopeNode:
+    """
+    An immutable node in the Gordian Envelope tree.
+
+    Every node knows its own untagged CBOR encoding and its digest, each of
+    which is computed once on first use and then remembered. Nodes decoded
+    from CBOR remember the bytes they were decoded from.
+    """
+    def __init__(self):
+        self._digest: bytes | None = None
+        self._cbor: bytes | None = None
+
+    def __eq__(self, other):
+        if isinstance(other, EnvelopeNode):
+            return self.digest == other.digest
+        return False
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    @property
+    def digest(self) -> bytes:
+        if self._digest is None:
+            self._digest = self._compute_digest()
+        return self._digest
+
+    def _compute_digest(self) -> bytes:
+        raise NotImplementedError
+
+    @property
+    def cbor(self) -> bytes:
+        """
+        Returns the untagged CBOR encoding of the node.
+        """
+        if self._cbor is None:
+            self._cbor = self._encode()
+        return self._cbor
+
+    def _encode(self) -> bytes:
+        raise NotImplementedError
+
+    @property
+    def tagged_cbor(self) -> bytes:
+        return encode_head(6, envelope_tag) + self.cbor
+
+    @property
+    def subject(self) -> "EnvelopeNode":
+        return self
+
+    @property
+    def assertions(self) -> list["EnvelopeNode"]:
+        return []
+
+    def add_assertion(self, assertion: "EnvelopeNode") -> "EnvelopeNode":
+        """
+        Returns a node with the given assertion added.
+
+        Adding an assertion that is already present returns the node
+        unchanged.
+        """
+        return self.add_assertions([assertion])
+
+    def add_assertions(self, assertions: list["EnvelopeNode"]) -> "EnvelopeNode":
+        """
+        Returns a node with all of the given assertions added.
+        """
+        if not assertions:
+            return self
+        return Node(self, assertions)
+
+    def wrapped(self) -> "WrappedNode":
+        return WrappedNode(self)
+
+    def assertions_with_predicate(self, predicate: "EnvelopeNode") -> list["EnvelopeNode"]:
+        """
+        Returns the assertions whose predicate has the same digest as the given
+        predicate.
+        """
+        digest = predicate.digest
+        return [
+            assertion for assertion in self.assertions
+            if isinstance(assertion, AssertionNode) and assertion.predicate.digest == digest
+        ]
+
+
+class LeafNode(EnvelopeNode):
+    def __init__(self, cbor: bytes):
+        super().__init__()
+        self._value = cbor
+
+    @property
+    def value(self) -> bytes:
+        """
+        Returns the CBOR encoding of the leaf's value.
+        """
+        return self._value
+
+    def _compute_digest(self) -> bytes:
+        return sha256(self._value).digest()
+
+    def _encode(self) -> bytes:
+        return encode_head(6, leaf_tag) + self._value
+
+
+class KnownValueNode(EnvelopeNode):
+    def __init__(self, value: int):
+        super().__init__()
+        self._value = value
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def _compute_digest(self) -> bytes:
+        return sha256(encode_head(6, known_value_tag) + self.cbor).digest()
+
+    def _encode(self) -> bytes:
+        return encode_head(0, self._value)
+
+
+class WrappedNode(EnvelopeNode):
+    def __init__(self, envelope: EnvelopeNode):
+        super().__init__()
+        self._envelope = envelope
+
+    @property
+    def envelope(self) -> EnvelopeNode:
+        return self._envelope
+
+    def _compute_digest(self) -> bytes:
+        return sha256(self._envelope.digest).digest()
+
+    def _encode(self) -> bytes:
+        return self._envelope.tagged_cbor
+
+
+class AssertionNode(EnvelopeNode):
+    def __init__(self, predicate: EnvelopeNode, object: EnvelopeNode):
+        super().__init__()
+        self._predicate = predicate
+        self._object = object
+
+    @property
+    def predicate(self) -> EnvelopeNode:
+        return self._predicate
+
+    @property
+    def object(self) -> EnvelopeNode:
+        return self._object
+
+    def _compute_digest(self) -> bytes:
+        return sha256(self._predicate.digest + self._object.digest).digest()
+
+    def _encode(self) -> bytes:
+        return encode_head(5, 1) + self._predicate.cbor + self._object.cbor
+
+
+class ElidedNode(EnvelopeNode):
+    def __init__(self, digest: bytes):
+        super().__init__()
+        if len(digest) != digest_length:
+            raise ValueError("Invalid digest length")
+        self._digest = digest
+
+    def _encode(self) -> bytes:
+        return encode_head(2, digest_length) + self.digest
+
+
+class Node(EnvelopeNode):
+    """
+    A subject with one or more assertions.
+
+    Assertions are kept sorted by digest and duplicates are dropped, so the
+    encoding and digest of a node do not depend on insertion order.
+    """
+    def __init__(self, subject: EnvelopeNode, assertions: list[EnvelopeNode]):
+        super().__init__()
+        unique: dict[bytes, EnvelopeNode] = {}
+        for assertion in assertions:
+            if not isinstance(assertion, (AssertionNode, ElidedNode)):
+                raise ValueError("Invalid assertion")
+            unique.setdefault(assertion.digest, assertion)
+        if not unique:
+            raise ValueError("A node must have at least one assertion")
+        self._subject = subject
+        self._assertions = [unique[digest] for digest in sorted(unique)]
+        self._in_source_order = False
+
+    @property
+    def subject(self) -> EnvelopeNode:
+        return self._subject
+
+    @property
+    def assertions(self) -> list[EnvelopeNode]:
+        return list(self._assertions)
+
+    def add_assertions(self, assertions: list[EnvelopeNode]) -> EnvelopeNode:
+        present = {a.digest for a in self._assertions}
+        new_assertions = [a for a in assertions if a.digest not in present]
+        if not new_assertions:
+            return self
+        return Node(self._subject, self._assertions + new_assertions)
+
+    def _compute_digest(self) -> bytes:
+        image = self._subject.digest + b"".join(a.digest for a in self._assertions)
+        return sha256(image).digest()
+
+    def _encode(self) -> bytes:
+        return encode_head(4, 1 + len(self._assertions))\
+            + self._subject.cbor\
+            + b"".join(a.cbor for a in self._assertions)
+
+
+def decode_envelope(data: bytes) -> EnvelopeNode:
+    """
+    Decodes the untagged CBOR encoding of an envelope into a node tree.
+
+    :raises ValueError: If the data is not a valid envelope.
+    """
+    node, index = _decode(data, 0)
+    if index != len(data):
+        raise ValueError("Envelope: extra data after envelope")
+    return node
+
+def decode_tagged_envelope(data: bytes) -> EnvelopeNode:
+    """
+    Decodes the tagged (#6.200) CBOR encoding of an envelope into a node tree.
+
+    :raises ValueError: If the data is not a valid envelope.
+    """
+    major_type, tag, index = read_head(data, 0)
+    if major_type != 6 or tag != envelope_tag:
+        raise ValueError("Envelope: expected envelope tag")
+    node, index = _decode(data, index)
+    if index != len(data):
+        raise ValueError("Envelope: extra data after envelope")
+    return node
+
+def _decode(data: bytes, index: int) -> tuple[EnvelopeNode, int]:
+    node, end = _decode_case(data, index)
+    # Keep the source bytes unless the node had to be normalized.
+    if not isinstance(node, Node) or node._in_source_order:
+        node._cbor = data[index:end]
+    return node, end
+
+def _decode_case(data: bytes, index: int) -> tuple[EnvelopeNode, int]:
+    major_type, argument, content_index = read_head(data, index)
+    if major_type == 6 and argument == leaf_tag:
+        end = skip_item(data, content_index)
+        return LeafNode(data[content_index:end]), end
+    elif major_type == 6 and argument == envelope_tag:
+        envelope, end = _decode(data, content_index)
+        return WrappedNode(envelope), end
+    elif major_type == 0:
+        return KnownValueNode(argument), content_index
+    elif major_type == 2:
+        if argument != digest_length:
+            raise ValueError("Envelope: invalid elided digest")
+        end = content_index + argument
+        return ElidedNode(data[content_index:end]), end
+    elif major_type == 5:
+        if argument != 1:
+            raise ValueError("Envelope: assertion must have exactly one predicate and object")
+        predicate, index = _decode(data, content_index)
+        object, index = _decode(data, index)
+        return AssertionNode(predicate, object), index
+    elif major_type == 4:
+        if argument < 2:
+            raise ValueError("Envelope: node must have a subject and at least one assertion")
+        subject, index = _decode(data, content_index)
+        assertions = []
+        for _ in range(argument - 1):
+            assertion, index = _decode(data, index)
+            assertions.append(assertion)
+        node = Node(subject, assertions)
+        node._in_source_order = [a.digest for a in assertions] == [a.digest for a in node._assertions]
+        return node, index
+    else:
+        raise ValueError("Envelope: unsupported envelope case")
@@ -0,0 +1,177 @@
+import atexit
+import hashlib
+import threading
+import time
+from typing import Callable
+
+from ssh_envelope.pem import PEM
+from ssh_envelope.ssh_private_key import SSHPrivateKey
+
+# An opt-in, in-memory cache of decrypted private keys, so repeated
+# operations with the same encrypted key skip the password prompt and the
+# bcrypt KDF.
+#
+# Entries are keyed by the SHA-256 of the encrypted key blob and expire after
+# a fixed time. Each entry holds the decrypted key as an unencrypted OpenSSH
+# PEM in a bytearray, which is overwritten with zeros when the entry is
+# evicted, expires, or the process exits. Keys returned by `get` are new
+# objects owned by the caller and are not zeroized.
+
+default_ttl = 300.0
+
+class DecryptedKeyCache:
+    """
+    A TTL-bounded cache of decrypted private keys. Safe to share between
+    threads.
+    """
+    def __init__(self, ttl: float = default_ttl, clock: Callable[[], float] = time.monotonic):
+        """
+        :param ttl: How long an entry is kept, in seconds.
+        :param clock: The time source, for testing.
+        :raises ValueError: If `ttl` is not positive.
+        """
+        if ttl <= 0:
+            raise ValueError("Key cache TTL must be positive")
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: dict[bytes, tuple[float, bytearray]] = {}
+        # Held while decrypting a key, so concurrent requests for it wait for
+        # one decryption instead of each running the KDF. Each lock is kept
+        # with the number of callers holding or waiting for it.
+        self._decrypting: dict[bytes, tuple[threading.Lock, int]] = {}
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge()
+            return len(self._entries)
+
+    @staticmethod
+    def key_id(encrypted_pem_string: str) -> bytes:
+        """
+        The cache key of an encrypted private key: the SHA-256 of its blob.
+
+        :raises ValueError: If the string is not a PEM block.
+        """
+        return hashlib.sha256(PEM.from_pem_string(encrypted_pem_string).data).digest()
+
+    def get(self, key_id: bytes) -> SSHPrivateKey | None:
+        """
+        Returns the decrypted key, or None if it isn't cached or has expired.
+        """
+        with self._lock:
+            self._purge()
+            entry = self._entries.get(key_id)
+            if entry is None:
+                return None
+            pem_string = entry[1].decode()
+        return SSHPrivateKey.from_pem_string(pem_string)
+
+    def put(self, key_id: bytes, private_key: SSHPrivateKey):
+        """
+        Caches a decrypted key, replacing and zeroizing any existing entry.
+        """
+        pem = bytearray(private_key.pem_string.encode())
+        with self._lock:
+            self._purge()
+            old = self._entries.get(key_id)
+            if old is not None:
+                _zeroize(old[1])
+            self._entries[key_id] = (self._clock() + self._ttl, pem)
+
+    def get_or_decrypt(self, key_id: bytes, decrypt: Callable[[], SSHPrivateKey]) -> SSHPrivateKey:
+        """
+        Returns the cached key, or decrypts and caches it. Concurrent calls for
+        the same key decrypt it once.
+        """
+        private_key = self.get(key_id)
+        if private_key is not None:
+            return private_key
+        with self._lock:
+            decrypting, callers = self._decrypting.get(key_id, (None, 0))
+            if decrypting is None:
+                decrypting = threading.Lock()
+            self._decrypting[key_id] = (decrypting, callers + 1)
+        try:
+            with decrypting:
+                private_key = self.get(key_id)
+                if private_key is None:
+                    private_key = decrypt()
+                    self.put(key_id, private_key)
+        finally:
+            # The last caller removes the lock, whether or not decryption
+            # succeeded.
+            with self._lock:
+                callers = self._decrypting[key_id][1] - 1
+                if callers:
+                    self._decrypting[key_id] = (decrypting, callers)
+                else:
+                    del self._decrypting[key_id]
+        return private_key
+
+    def evict(self, key_id: bytes) -> bool:
+        """
+        Removes and zeroizes an entry.
+
+        :return: Whether the key was cached.
+        """
+        with self._lock:
+            entry = self._entries.pop(key_id, None)
+        if entry is None:
+            return False
+        _zeroize(entry[1])
+        return True
+
+    def clear(self):
+        """
+        Removes and zeroizes every entry.
+        """
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        for _, pem in entries.values():
+            _zeroize(pem)
+
+    def _purge(self):
+        # Must be called with the lock held.
+        now = self._clock()
+        expired = [key_id for key_id, (expires, _) in self._entries.items() if expires <= now]
+        for key_id in expired:
+            _zeroize(self._entries.pop(key_id)[1])
+
+def _zeroize(buffer: bytearray):
+    buffer[:] = bytes(len(buffer))
+
+
+_shared_cache: DecryptedKeyCache | None = None
+
+def shared_cache() -> DecryptedKeyCache | None:
+    """
+    The process-wide cache, or None if caching is off (the default).
+    """
+    return _shared_cache
+
+def enable_shared_cache(ttl: float = default_ttl) -> DecryptedKeyCache:
+    """
+    Turns on the process-wide cache, used by every import in the process,
+    including batch mode and the signing daemon.
+    """
+    global _shared_cache
+    if _shared_cache is None or _shared_cache.ttl != ttl:
+        disable_shared_cache()
+        _shared_cache = DecryptedKeyCache(ttl)
+    return _shared_cache
+
+def disable_shared_cache():
+    """
+    Turns off the process-wide cache, zeroizing its entries.
+    """
+    global _shared_cache
+    if _shared_cache is not None:
+        _shared_cache.clear()
+        _shared_cache = None
+
+atexit.register(disable_shared_cache)
@@ -0,0 +1,221 @@
+import os
+import sqlite3
+import threading
+from typing import Iterable, NamedTuple
+
+from ssh_envelope.envelope import Envelope
+from ssh_envelope.keyring import Keyring
+from ssh_envelope.ssh_private_key import SSHPrivateKey
+from ssh_envelope.ssh_public_key import SSHPublicKey
+from ssh_envelope.ssh_signature import SSHSignature
+
+# A local store of key envelopes in SQLite, indexed by SHA256 fingerprint and
+# by key blob. A key can be stored as a public key, a private key, or both;
+# adding a private key also adds its public key.
+
+schema = """
+CREATE TABLE IF NOT EXISTS keys (
+    fingerprint TEXT NOT NULL,
+    is_private INTEGER NOT NULL,
+    blob BLOB NOT NULL,
+    type TEXT NOT NULL,
+    key_size INTEGER NOT NULL,
+    comment TEXT NOT NULL,
+    envelope TEXT NOT NULL,
+    PRIMARY KEY (fingerprint, is_private)
+);
+CREATE INDEX IF NOT EXISTS keys_blob ON keys (blob);
+"""
+
+_columns = "fingerprint, is_private, type, key_size, comment, envelope"
+
+def default_store_path() -> str:
+    """
+    The store used when no path is given: `SSH_ENVELOPE_STORE`, or
+    `~/.ssh_envelope/keys.db`.
+    """
+    return os.environ.get("SSH_ENVELOPE_STORE") or os.path.join(os.path.expanduser("~"), ".ssh_envelope", "keys.db")
+
+class StoredKey(NamedTuple):
+    fingerprint: str
+    is_private: bool
+    # The key type name, e.g. `ED25519`.
+    type: str
+    key_size: int
+    comment: str
+    # The key envelope's UR.
+    envelope: str
+
+    def to_envelope(self) -> Envelope:
+        return Envelope(self.envelope)
+
+    @property
+    def line(self) -> str:
+        """
+        A one-line summary, e.g. `SHA256:... public ED25519 256 comment`.
+        """
+        kind = "private" if self.is_private else "public"
+        return " ".join(filter(None, [self.fingerprint, kind, self.type, str(self.key_size), self.comment]))
+
+class KeyStore:
+    """
+    A SQLite database of public and private key envelopes.
+
+    One store can be shared between threads.
+    """
+    def __init__(self, path: str | None = None):
+        """
+        :param path: The database file, created if it doesn't exist, only
+            accessible to the current user. Defaults to `default_store_path()`.
+        """
+        path = path or default_store_path()
+        if path != ":memory:" and not os.path.exists(path):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        self._path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def add(self, envelope: Envelope) -> str:
+        """
+        Adds a public or private key envelope, replacing any stored envelope
+        for the same key and kind.
+
+        :return: The key's fingerprint.
+        :raises ValueError: If the envelope isn't a public or private key.
+        """
+        return self.add_all([envelope])[0]
+
+    def add_all(self, envelopes: Iterable[Envelope]) -> list[str]:
+        """
+        Adds key envelopes in one transaction.
+
+        :return: The keys' fingerprints.
+        :raises ValueError: If an envelope isn't a public or private key. No
+            keys are added.
+        """
+        rows: list[tuple] = []
+        fingerprints: list[str] = []
+        for envelope in envelopes:
+            ssh_object = envelope.to_ssh_object()
+            if isinstance(ssh_object, SSHPrivateKey):
+                rows.append(_row(ssh_object.public_key, Envelope.from_ssh_public_key(ssh_object.public_key)))
+                rows.append(_row(ssh_object, envelope))
+            elif isinstance(ssh_object, SSHPublicKey):
+                rows.append(_row(ssh_object, envelope))
+            else:
+                raise ValueError("Only key envelopes can be stored")
+            fingerprints.append(ssh_object.fingerprint)
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO keys (fingerprint, is_private, blob, type, key_size, comment, envelope) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return fingerprints
+
+    def get(self, fingerprint: str, private: bool = False) -> StoredKey | None:
+        """
+        Returns the public or private key with the fingerprint (e.g.
+        `SHA256:...`), or None.
+        """
+        rows = self._query(f"SELECT {_columns} FROM keys WHERE fingerprint = ? AND is_private = ?", (fingerprint, int(private)))
+        return rows[0] if rows else None
+
+    def find(self, query: str = "", type: str | None = None, private: bool | None = None) -> list[StoredKey]:
+        """
+        Returns the keys whose fingerprint starts with the query, with or
+        without the `SHA256:` prefix, or whose comment contains it.
+
+        :param type: Only keys of this type name, e.g. `ED25519`.
+        :param private: Only private keys if True, only public keys if False.
+        """
+        conditions: list[str] = []
+        parameters: list = []
+        if query:
+            pattern = _escape_like(query)
+            conditions.append("(fingerprint LIKE ? ESCAPE '\\' OR fingerprint LIKE ? ESCAPE '\\' OR comment LIKE ? ESCAPE '\\')")
+            parameters += [pattern + "%", "SHA256:" + pattern + "%", "%" + pattern + "%"]
+        if type is not None:
+            conditions.append("type = ?")
+            parameters.append(type.upper())
+        if private is not None:
+            conditions.append("is_private = ?")
+            parameters.append(int(private))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._query(f"SELECT {_columns} FROM keys{where} ORDER BY fingerprint, is_private", tuple(parameters))
+
+    def all(self, private: bool | None = None) -> list[StoredKey]:
+        return self.find(private=private)
+
+    def find_by_blob(self, blob: bytes, private: bool = False) -> StoredKey | None:
+        """
+        Returns the public or private key with the key blob, or None.
+        """
+        rows = self._query(f"SELECT {_columns} FROM keys WHERE blob = ? AND is_private = ?", (blob, int(private)))
+        return rows[0] if rows else None
+
+    def private_keys(self, fingerprints: list[str]) -> list[Envelope]:
+        """
+        Returns the private key envelopes with the fingerprints.
+
+        :raises ValueError: If a private key is not in the store.
+        """
+        return [self._require(fingerprint, True).to_envelope() for fingerprint in fingerprints]
+
+    def keyring(self, fingerprints: list[str]) -> Keyring:
+        """
+        Returns a keyring of the public keys with the fingerprints.
+
+        :raises ValueError: If a public key is not in the store.
+        """
+        return Keyring(self._require(fingerprint, False).to_envelope().to_ssh_public_key() for fingerprint in fingerprints)
+
+    def keyring_for(self, signatures: list[SSHSignature]) -> Keyring:
+        """
+        Returns a keyring of the stored public keys that made the signatures,
+        found by key blob. The signatures themselves are not checked.
+        """
+        keyring = Keyring()
+        for signature in signatures:
+            stored = self.find_by_blob(signature.public_key_data.hash_image)
+            if stored is not None:
+                keyring.add(stored.to_envelope().to_ssh_public_key())
+        return keyring
+
+    def _require(self, fingerprint: str, private: bool) -> StoredKey:
+        stored = self.get(fingerprint, private)
+        if stored is None:
+            raise ValueError(f"No {'private' if private else 'public'} key {fingerprint} in the store")
+        return stored
+
+    def _query(self, sql: str, parameters: tuple) -> list[StoredKey]:
+        with self._lock:
+            rows = self._connection.execute(sql, parameters).fetchall()
+        return [StoredKey(fingerprint, bool(is_private), type, key_size, comment, envelope)
+                for fingerprint, is_private, type, key_size, comment, envelope in rows]
+
+def _row(key: SSHPublicKey | SSHPrivateKey, envelope: Envelope) -> tuple:
+    is_private = isinstance(key, SSHPrivateKey)
+    blob = key.public_key_data.hash_image if isinstance(key, SSHPrivateKey) else key.key_data.hash_image
+    return (key.fingerprint, int(is_private), blob, key.type_name, key.key_size, key.comment, envelope.ur)
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -0,0 +1,60 @@
+from typing import Iterable, Iterator
+
+from ssh_envelope.ssh_public_key import SSHPublicKey
+from ssh_envelope.ssh_public_key_data import SSHPublicKeyData
+from ssh_envelope.ssh_signature import SSHSignature
+
+class Keyring:
+    """
+    A set of trusted public keys, indexed by key blob and by fingerprint.
+
+    Signatures carry the public key that made them, so the keyring can pair a
+    signature with its signer with a single lookup instead of trying every key.
+    """
+    def __init__(self, public_keys: Iterable[SSHPublicKey] = ()):
+        self._by_blob: dict[bytes, SSHPublicKey] = {}
+        self._by_fingerprint: dict[str, SSHPublicKey] = {}
+        for public_key in public_keys:
+            self.add(public_key)
+
+    def add(self, public_key: SSHPublicKey):
+        """
+        Adds a public key to the keyring.
+
+        If the same key is added more than once, the first one is kept.
+        """
+        blob = public_key.key_data.hash_image
+        if blob in self._by_blob:
+            return
+        self._by_blob[blob] = public_key
+        self._by_fingerprint[public_key.fingerprint] = public_key
+
+    def __len__(self) -> int:
+        return len(self._by_blob)
+
+    def __iter__(self) -> Iterator[SSHPublicKey]:
+        return iter(self._by_blob.values())
+
+    def __contains__(self, public_key: SSHPublicKey) -> bool:
+        return self.find_by_key_data(public_key.key_data) is not None
+
+    def find_by_key_data(self, key_data: SSHPublicKeyData) -> SSHPublicKey | None:
+        """
+        Returns the key with the given key data, or None if it is not on the
+        keyring.
+        """
+        return self._by_blob.get(key_data.hash_image)
+
+    def find_by_fingerprint(self, fingerprint: str) -> SSHPublicKey | None:
+        """
+        Returns the key with the given fingerprint (e.g. `SHA256:...`), or None
+        if it is not on the keyring.
+        """
+        return self._by_fingerprint.get(fingerprint)
+
+    def signer_of(self, signature: SSHSignature) -> SSHPublicKey | None:
+        """
+        Returns the key on the keyring that the signature claims to be made by,
+        or None. The signature itself is not checked.
+        """
+        return self.find_by_key_data(signature.public_key_data)
@@ -0,0 +1,41 @@
+known_value_names = {
+    1: "isA",
+    2: "id",
+    3: "verifiedBy",
+    4: "note",
+    5: "hasRecipient",
+    6: "sskrShare",
+    7: "controller",
+    8: "publicKey",
+    9: "dereferenceVia",
+    10: "entity",
+    11: "hasName",
+    12: "language",
+    13: "issuer",
+    14: "holder",
+    15: "salt",
+    16: "date",
+}
+
+known_value_values = {name: value for value, name in known_value_names.items()}
+
+def known_value_from_string(value: int | str) -> int:
+    """
+    Resolves a known value given either its name or its numeric value.
+
+    :raises ValueError: If the value is neither a known name nor an unsigned
+        integer.
+    """
+    if isinstance(value, int):
+        if value < 0:
+            raise ValueError("Known values must be unsigned integers")
+        return value
+    if value in known_value_values:
+        return known_value_values[value]
+    try:
+        return known_value_from_string(int(value))
+    except ValueError:
+        raise ValueError(f"Unknown known value: {value}")
+
+def known_value_name(value: int) -> str:
+    return known_value_names.get(value, str(value))
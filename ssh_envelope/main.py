@@ -7,14 +7,28 @@ import argparse
 import os
 import sys
 import traceback
+from contextlib import contextmanager
+from getpass import getpass
+from typing import Callable, Iterator
 
 from ssh_envelope import logconfig
 from ssh_envelope.ssh_private_key import SSHPrivateKey
 from ssh_envelope.ssh_public_key import SSHPublicKey
+from ssh_envelope.ssh_signature import SSHSignature
 from ssh_envelope.version import __version__
 __all__ = ['logconfig']
 
+from ssh_envelope.batch import read_records, run_batch
+from ssh_envelope.bulk_import import bulk_import, find_objects, read_bundle, write_directory, write_ndjson
+from ssh_envelope.client import EnvelopeClient
 from ssh_envelope.envelope import Envelope
+from ssh_envelope.key_cache import disable_shared_cache, enable_shared_cache
+from ssh_envelope.key_store import KeyStore
+from ssh_envelope.keyring import Keyring
+from ssh_envelope.server import EnvelopeServer
+from ssh_envelope.ssh_key_files import KeyFileIndex, read_allowed_signers
+from ssh_envelope.ssh_agent import SSHAgent
+from ssh_envelope.threshold import verify_threshold
 from ssh_envelope.ssh_keygen_utils import extract_comment_from_path, sign_message
 
 from ssh_envelope.ssh_object_utils import derive_public_key, generate_ed25519_private, import_ssh_object
@@ -52,6 +66,44 @@ def read_private_key(args) -> Envelope:
     return key
 
 
+def read_batch_records(args):
+    if args.batch == '-':
+        logger.info("Reading batch records from stdin")
+        yield from read_records(sys.stdin)
+    else:
+        logger.info("Reading batch records from --batch")
+        with open(args.batch, 'r') as file:
+            yield from read_records(file)
+
+
+def run_batch_command(args: argparse.Namespace, process):
+    failures = run_batch(read_batch_records(args), process, sys.stdout, jobs=args.jobs)
+    if failures:
+        sys.stderr.write(f"{failures} record(s) failed\n")
+        sys.exit(1)
+
+
+def require_key_option(args):
+    # In batch mode stdin carries the records, so keys must be given as options.
+    if not args.key and not args.key_path:
+        raise ValueError("In batch mode the key envelope (--key or --key-path) must be provided on the command line.")
+
+
+def read_private_keys(args) -> list[Envelope]:
+    keys: list[Envelope] = []
+    for key in args.key or []:
+        logger.info("Reading private key from --key")
+        keys.append(Envelope(key))
+    for key_path in args.key_path or []:
+        logger.info("Reading private key from --key-path")
+        with open(key_path, 'r') as file:
+            keys.append(Envelope(file.read()))
+    if not keys:
+        logger.info("Reading private key from stdin")
+        keys.append(Envelope(sys.stdin.read()))
+    return keys
+
+
 def read_public_key(args) -> Envelope:
     key: Envelope | None = None
     if args.key:
@@ -67,6 +119,53 @@ def read_public_key(args) -> Envelope:
     return key
 
 
+def read_keyring(path: str) -> Keyring:
+    logger.info("Reading keyring from --keyring")
+    keyring = Keyring()
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                keyring.add(Envelope(line).to_ssh_public_key())
+    return keyring
+
+
+def read_allowed_signers_keyring(path: str, namespace: str) -> Keyring:
+    logger.info("Reading keyring from --allowed-signers")
+    index = KeyFileIndex(read_allowed_signers(path))
+    return index.keyring(lambda entry: not entry.is_cert_authority and entry.allows_namespace(namespace))
+
+
+def has_keyring_option(args) -> bool:
+    return bool(args.keyring or args.allowed_signers) or args.store is not None
+
+
+@contextmanager
+def open_verify_keyring(args) -> Iterator[Callable[[Envelope], Keyring] | None]:
+    # Yields the keyring to verify each envelope against, or None if a single
+    # key is used. A --store is closed on exit.
+    if sum([bool(args.keyring), bool(args.allowed_signers), args.store is not None]) > 1:
+        raise ValueError("Only one of --keyring, --allowed-signers and --store can be used.")
+    if args.fingerprint and args.store is None:
+        raise ValueError("--fingerprint requires --store.")
+    keyring: Keyring | None = None
+    if args.keyring:
+        keyring = read_keyring(args.keyring)
+    elif args.allowed_signers:
+        keyring = read_allowed_signers_keyring(args.allowed_signers, args.namespace)
+    elif args.store is not None:
+        logger.info("Reading keyring from --store")
+        with KeyStore(args.store or None) as store:
+            if args.fingerprint:
+                keyring = store.keyring(args.fingerprint)
+                yield lambda _: keyring
+            else:
+                # Look up just the signers of each envelope.
+                yield lambda envelope: store.keyring_for(envelope.find_signatures())
+        return
+    yield None if keyring is None else lambda _: keyring
+
+
 def read_object_data(args) -> str:
     object_data = None
     if args.object:
@@ -82,15 +181,23 @@ def read_object_data(args) -> str:
     return object_data
 
 
-def import_command(args: argparse.Namespace):
-    logger.info(f"Importing SSH object")
-    object_data = read_object_data(args)
+def import_object(object_data: str, comment: str | None) -> SSHPrivateKey | SSHPublicKey | SSHSignature:
     object = import_ssh_object(object_data)
-    if args.comment:
+    if comment:
         if isinstance(object, SSHPrivateKey):
-            object.comment = args.comment
+            object.comment = comment
         elif isinstance(object, SSHPublicKey):
-            object.comment = args.comment
+            object.comment = comment
+    return object
+
+
+def import_command(args: argparse.Namespace):
+    logger.info(f"Importing SSH object")
+    if args.batch:
+        run_batch_command(args, lambda record: Envelope.from_ssh_object(import_object(record, args.comment)).ur)
+        return
+    object_data = read_object_data(args)
+    object = import_object(object_data, args.comment)
     # This is a workaround to set the comment on the private key object because
     # OpenSSH encrypted private key files do *not* contain a comment field, even
     # though a *decrypted* private key files and public key file do. When asked
@@ -107,8 +214,37 @@ def import_command(args: argparse.Namespace):
     sys.stdout.write(envelope.ur + '\n')
 
 
+def import_bulk_command(args: argparse.Namespace):
+    logger.info(f"Importing SSH objects in bulk")
+    if '-' in args.paths:
+        if len(args.paths) > 1:
+            raise ValueError("A bundle on stdin (-) cannot be combined with other paths.")
+        logger.info("Reading bundle from stdin")
+        items = read_bundle(sys.stdin.read(), "stdin", "stdin")
+    else:
+        items = find_objects(args.paths)
+    password = getpass("Enter the password for the encrypted SSH keys: ") if args.ask_password else None
+    results = bulk_import(items, jobs=args.jobs, password=password)
+
+    errors_file = open(args.errors, 'w') if args.errors else None
+    try:
+        if args.output_dir:
+            failures = write_directory(results, args.output_dir, errors_file or sys.stderr)
+        else:
+            failures = write_ndjson(results, sys.stdout, errors_file)
+    finally:
+        if errors_file is not None:
+            errors_file.close()
+    if failures:
+        sys.stderr.write(f"{failures} object(s) or file(s) failed\n")
+        sys.exit(1)
+
+
 def export_command(args: argparse.Namespace):
     logger.info(f"Exporting object")
+    if args.batch:
+        run_batch_command(args, lambda record: f"{Envelope(record).to_ssh_object()}")
+        return
     envelope = read_envelope(args)
     object = envelope.to_ssh_object()
     sys.stdout.write(f"{object}" + '\n')
@@ -123,11 +259,17 @@ def generate_command(args: argparse.Namespace):
     sys.stdout.write(envelope.ur + '\n')
 
 
+def public_key_envelope(key: Envelope) -> Envelope:
+    return Envelope.from_ssh_public_key(derive_public_key(key.to_ssh_private_key()))
+
+
 def public_command(args: argparse.Namespace):
     logger.info(f"Deriving public key from private key")
+    if args.batch:
+        run_batch_command(args, lambda record: public_key_envelope(Envelope(record)).ur)
+        return
     key = read_private_key(args)
-    public_key_envelope = Envelope.from_ssh_public_key(derive_public_key(key.to_ssh_private_key()))
-    sys.stdout.write(public_key_envelope.ur + '\n')
+    sys.stdout.write(public_key_envelope(key).ur + '\n')
 
 
 # def sign_data_command(args: argparse.Namespace):
@@ -168,27 +310,127 @@ def public_command(args: argparse.Namespace):
 #     signature_envelope = Envelope.from_ssh_signature(sign_message(message, key.to_ssh_private_key(), args.namespace))
 #     sys.stdout.write(signature_envelope.ur + '\n')
 
+def read_agent_keys(agent: SSHAgent, fingerprints: list[str] | None) -> list[SSHPublicKey]:
+    logger.info("Reading identities from ssh-agent")
+    identities = agent.identities()
+    if not fingerprints:
+        if not identities:
+            raise ValueError("The ssh-agent holds no keys.")
+        return identities
+    by_fingerprint = {key.fingerprint: key for key in identities}
+    keys: list[SSHPublicKey] = []
+    for fingerprint in fingerprints:
+        if fingerprint not in by_fingerprint:
+            raise ValueError(f"The ssh-agent does not hold the key {fingerprint}.")
+        keys.append(by_fingerprint[fingerprint])
+    return keys
+
+
+def read_signing_keys(args) -> list[Envelope]:
+    if args.store is None:
+        return read_private_keys(args)
+    if not args.fingerprint:
+        raise ValueError("--store requires --fingerprint to select the signing keys.")
+    logger.info("Reading private keys from --store")
+    with KeyStore(args.store or None) as store:
+        return store.private_keys(args.fingerprint)
+
+
 def add_signature_command(args: argparse.Namespace):
     logger.info(f"Adding signature to envelope")
 
-    if not args.envelope and not args.envelope_path and not args.key and not args.key_path:
+    if args.via_socket:
+        with EnvelopeClient(args.via_socket) as client:
+            sign = lambda envelope: client.add_signature(envelope, args.namespace, args.fingerprint)
+            if args.batch:
+                run_batch_command(args, lambda record: sign(Envelope(record)).ur)
+            else:
+                sys.stdout.write(sign(read_envelope(args)).ur + '\n')
+        return
+
+    if args.agent:
+        with SSHAgent() as agent:
+            public_keys = read_agent_keys(agent, args.fingerprint)
+            sign = lambda envelope: envelope.add_agent_signatures(agent, public_keys, args.namespace)
+            if args.batch:
+                run_batch_command(args, lambda record: sign(Envelope(record)).ur)
+            else:
+                sys.stdout.write(sign(read_envelope(args)).ur + '\n')
+        return
+
+    if args.batch:
+        if args.store is None:
+            require_key_option(args)
+        # Decode the keys once for all records. Records already run
+        # concurrently with --jobs, so each one signs on its own thread.
+        ssh_keys = [key.to_ssh_private_key() for key in read_signing_keys(args)]
+        run_batch_command(args, lambda record: Envelope(record).add_ssh_signatures(ssh_keys, args.namespace, max_workers=1).ur)
+        return
+
+    if not args.envelope and not args.envelope_path and not args.key and not args.key_path and args.store is None:
         raise ValueError("At least one of the envelope (--envelope or --envelope-path) or the key envelope (--key or --key-path) must be provided on the command line: they cannot both be provided via stdin.")
 
-    key = read_private_key(args)
+    keys = read_signing_keys(args)
     envelope = read_envelope(args)
-    signed_envelope = envelope.add_signature(key, namespace=args.namespace)
+    signed_envelope = envelope.add_signatures(keys, namespace=args.namespace)
     sys.stdout.write(signed_envelope.ur + '\n')
 
 
+def verify_envelope(envelope: Envelope, key: SSHPublicKey | None, keyring: Keyring | None, threshold: int | None) -> tuple[bool, list[SSHPublicKey]]:
+    if keyring is not None:
+        if threshold is not None:
+            signers = verify_threshold(envelope.subject.digest, envelope.find_signatures(), keyring, threshold)
+            return len(signers) >= threshold, signers
+        signers = envelope.verified_signers(keyring)
+        return len(signers) > 0, signers
+    assert key is not None
+    return envelope.verify_ssh_signature(key), []
+
+
 def verify_signature_command(args: argparse.Namespace):
     logger.info(f"Verifying signature on envelope")
 
-    if not args.envelope and not args.envelope_path and not args.key and not args.key_path:
-        raise ValueError("At least one of the envelope (--envelope or --envelope-path) or the key envelope (--key or --key-path) must be provided on the command line: they cannot both be provided via stdin.")
+    if args.via_socket:
+        verify_signature_via_socket(args)
+        return
+
+    if args.threshold is not None and not has_keyring_option(args):
+        raise ValueError("--threshold requires --keyring, --allowed-signers or --store.")
+
+    if args.batch:
+        with open_verify_keyring(args) as keyring_for:
+            key = None
+            if keyring_for is None:
+                require_key_option(args)
+                key = read_public_key(args).to_ssh_public_key()
+
+            def verify_record(record: str) -> str:
+                envelope = Envelope(record)
+                keyring = keyring_for(envelope) if keyring_for is not None else None
+                is_verified, _ = verify_envelope(envelope, key, keyring, args.threshold)
+                if not is_verified:
+                    raise ValueError("Signature verification failed")
+                return envelope.ur
+
+            run_batch_command(args, verify_record)
+        return
+
+    if has_keyring_option(args):
+        envelope = read_envelope(args)
+        with open_verify_keyring(args) as keyring_for:
+            assert keyring_for is not None
+            keyring = keyring_for(envelope)
+            is_verified, signers = verify_envelope(envelope, None, keyring, args.threshold)
+        if is_verified and not args.silent:
+            for signer in signers:
+                sys.stderr.write(f"Verified by {' '.join(filter(None, [signer.fingerprint, signer.comment]))}\n")
+    else:
+        if not args.envelope and not args.envelope_path and not args.key and not args.key_path:
+            raise ValueError("At least one of the envelope (--envelope or --envelope-path) or the key envelope (--key or --key-path) must be provided on the command line: they cannot both be provided via stdin.")
 
-    key = read_public_key(args)
-    envelope = read_envelope(args)
-    is_verified = envelope.verify_signature(key)
+        key = read_public_key(args)
+        envelope = read_envelope(args)
+        is_verified, _ = verify_envelope(envelope, key.to_ssh_public_key(), None, None)
     if is_verified:
         if not args.silent:
             sys.stdout.write(f"{envelope.ur}\n")
@@ -197,12 +439,125 @@ def verify_signature_command(args: argparse.Namespace):
         sys.exit(1)
 
 
+def verify_signature_via_socket(args: argparse.Namespace):
+    if has_keyring_option(args):
+        raise ValueError("--keyring, --allowed-signers and --store cannot be used with --via-socket: the daemon's keyring is used.")
+    key = read_public_key(args) if args.key or args.key_path else None
+    with EnvelopeClient(args.via_socket) as client:
+        def verify(envelope: Envelope) -> list[str]:
+            is_verified, signers = client.verify_signature(envelope, key, args.threshold)
+            if not is_verified:
+                raise ValueError("Signature verification failed")
+            return signers
+
+        if args.batch:
+            def verify_record(record: str) -> str:
+                envelope = Envelope(record)
+                verify(envelope)
+                return envelope.ur
+            run_batch_command(args, verify_record)
+            return
+
+        envelope = read_envelope(args)
+        try:
+            signers = verify(envelope)
+        except ValueError:
+            sys.stderr.write(f"Signature verification failed\n")
+            sys.exit(1)
+        if not args.silent:
+            for signer in signers:
+                sys.stderr.write(f"Verified by {signer}\n")
+            sys.stdout.write(f"{envelope.ur}\n")
+
+
+def read_key_envelopes(args) -> list[Envelope]:
+    keys: list[Envelope] = []
+    for key in args.key or []:
+        keys.append(Envelope(key))
+    for key_path in args.key_path or []:
+        with open(key_path, 'r') as file:
+            keys.append(Envelope(file.read()))
+    if not keys:
+        logger.info("Reading key envelopes from stdin")
+        keys = [Envelope(line.strip()) for line in sys.stdin if line.strip()]
+    return keys
+
+
+def store_add_command(args: argparse.Namespace):
+    logger.info(f"Adding keys to the store")
+    with KeyStore(args.store) as store:
+        for fingerprint in store.add_all(read_key_envelopes(args)):
+            sys.stdout.write(fingerprint + '\n')
+
+
+def store_get_command(args: argparse.Namespace):
+    logger.info(f"Getting a key from the store")
+    with KeyStore(args.store) as store:
+        stored = store.get(args.fingerprint, private=args.private)
+    if stored is None:
+        sys.stderr.write(f"No {'private' if args.private else 'public'} key {args.fingerprint} in the store\n")
+        sys.exit(1)
+    sys.stdout.write(stored.envelope + '\n')
+
+
+def store_find_command(args: argparse.Namespace):
+    logger.info(f"Finding keys in the store")
+    with KeyStore(args.store) as store:
+        found = store.find(args.query, type=args.type, private=args.private)
+    for stored in found:
+        sys.stdout.write(stored.line + '\n')
+    if not found:
+        sys.exit(1)
+
+
+def store_list_command(args: argparse.Namespace):
+    logger.info(f"Listing keys in the store")
+    with KeyStore(args.store) as store:
+        for stored in store.all(private=args.private):
+            sys.stdout.write(stored.line + '\n')
+
+
+def serve_command(args: argparse.Namespace):
+    logger.info(f"Starting signing daemon")
+    keys = read_private_keys(args) if args.key or args.key_path else []
+    keyring = read_keyring(args.keyring) if args.keyring else None
+    if not keys and keyring is None:
+        raise ValueError("At least one private key (--key or --key-path) or a keyring (--keyring) must be provided.")
+    server = EnvelopeServer(keys, keyring, max_workers=args.jobs)
+    try:
+        server.serve(args.socket)
+    except KeyboardInterrupt:
+        pass
+
+
+def configure_key_cache(args: argparse.Namespace):
+    ttl = args.key_cache_ttl
+    if ttl is None and os.environ.get('SSH_ENVELOPE_KEY_CACHE_TTL'):
+        try:
+            ttl = float(os.environ['SSH_ENVELOPE_KEY_CACHE_TTL'])
+        except ValueError:
+            raise ValueError("SSH_ENVELOPE_KEY_CACHE_TTL must be a number of seconds") from None
+    if ttl is None:
+        # Leave a cache set up by an embedding program alone.
+        return
+    if ttl:
+        logger.info(f"Caching decrypted keys for {ttl} seconds")
+        enable_shared_cache(ttl)
+    else:
+        disable_shared_cache()
+
+def add_batch_arguments(parser: argparse.ArgumentParser, record: str):
+    parser.add_argument('-b', '--batch', help=f'Batch mode: read newline-delimited {record} records from the given file, or from stdin if no file is given, and write one JSON result per record, in input order. A record line starting with `"` is a JSON string, for records that span several lines.', nargs='?', const='-', default=None)
+    parser.add_argument('-j', '--jobs', help='Number of records to process concurrently in batch mode', type=int, default=1)
+
+
 def _main(arg_array):
     if "--version" in arg_array:
         print(f"SSH Envelope version {__version__}")
         sys.exit(0)
 
     parser = argparse.ArgumentParser(description="Envelope/SSH Key Management Tool")
+    parser.add_argument('--key-cache-ttl', help='Keep decrypted private keys in memory for this many seconds, so an encrypted key imported more than once in this process (e.g. in batch mode) asks for its password once. Defaults to SSH_ENVELOPE_KEY_CACHE_TTL; off if neither is set. Cached keys are zeroized when they expire and on exit.', type=float, default=None)
     subparsers = parser.add_subparsers(help='commands')
 
     # import_command
@@ -210,12 +565,23 @@ def _main(arg_array):
     parser_import.add_argument('-o', '--object', help='SSH object as a string', default=None)
     parser_import.add_argument('-O', '--object-path', help='Path to the file containing the SSH object', default=None)
     parser_import.add_argument('-c', '--comment', help='Comment to add to the private or public key. Overrides any comment contained in the original object. Ignored for signatures.', default=None)
+    add_batch_arguments(parser_import, 'SSH object')
     parser_import.set_defaults(func=import_command)
 
+    # import_bulk_command
+    parser_import_bulk = subparsers.add_parser('import-bulk', help='Convert every SSH object in files, directory trees or a bundle to envelopes, in parallel')
+    parser_import_bulk.add_argument('paths', help='Files or directories to import. Directories are walked recursively. Each file may hold any number of PEM blocks and public key lines. Use - to read a bundle from stdin.', nargs='+')
+    parser_import_bulk.add_argument('-D', '--output-dir', help='Write each envelope to its own `.ur` file in this directory, mirroring the input tree, instead of writing JSON lines to stdout', default=None)
+    parser_import_bulk.add_argument('--errors', help='Write the error report, one JSON object per failed object or file, to this file. Defaults to stderr with --output-dir, and to the JSON lines on stdout otherwise.', default=None)
+    parser_import_bulk.add_argument('-j', '--jobs', help='Number of worker processes. Defaults to the number of CPUs.', type=int, default=None)
+    parser_import_bulk.add_argument('-P', '--ask-password', help='Prompt once for a password, and decrypt the encrypted private keys with it. Without this, encrypted private keys are reported as errors.', default=False, action='store_true')
+    parser_import_bulk.set_defaults(func=import_bulk_command)
+
     # export_command
     parser_export = subparsers.add_parser('export', help='Convert an envelope to an SSH object')
     parser_export.add_argument('-e', '--envelope', help='Envelope to export', default=None)
     parser_export.add_argument('-E', '--envelope-path', help='Path to the file containing the envelope', default=None)
+    add_batch_arguments(parser_export, 'envelope')
     parser_export.set_defaults(func=export_command)
 
     # generate_command
@@ -227,6 +593,7 @@ def _main(arg_array):
     parser_public = subparsers.add_parser('public', help='Derive a public key from a private key')
     parser_public.add_argument('-k', '--key', help='Private key envelope', default=None)
     parser_public.add_argument('-K', '--key-path', help='Path to the file containing the private key envelope', default=None)
+    add_batch_arguments(parser_public, 'private key envelope')
     parser_public.set_defaults(func=public_command)
 
     # # sign_data_command
@@ -240,11 +607,16 @@ def _main(arg_array):
 
     # add_signature_command
     parser_add_signature = subparsers.add_parser('add-signature', help='Add an SSH signature to an envelope. The digest of the subject is signed and a new `verifiedBy` assertion is added.')
-    parser_add_signature.add_argument('-k', '--key', help='Private key envelope', default=None)
-    parser_add_signature.add_argument('-K', '--key-path', help='Path to the file containing the private key envelope', default=None)
+    parser_add_signature.add_argument('-k', '--key', help='Private key envelope. May be given more than once to add several signatures.', action='append', default=None)
+    parser_add_signature.add_argument('-K', '--key-path', help='Path to the file containing the private key envelope. May be given more than once to add several signatures.', action='append', default=None)
     parser_add_signature.add_argument('-e', '--envelope', help='Envelope to sign', default=None)
     parser_add_signature.add_argument('-E', '--envelope-path', help='Path to the file containing the envelope to sign', default=None)
     parser_add_signature.add_argument('-n', '--namespace', help='Namespace for the signature', default='envelope')
+    parser_add_signature.add_argument('--via-socket', help='Have the `serve` daemon listening on this Unix socket sign the envelope with its keys, instead of --key or --key-path.', default=None)
+    parser_add_signature.add_argument('-a', '--agent', help='Sign with keys held by the ssh-agent at SSH_AUTH_SOCK, instead of --key or --key-path.', default=False, action='store_true')
+    parser_add_signature.add_argument('--store', help='Sign with private keys from the key store at this path, or the default store if no path is given, selected with --fingerprint.', nargs='?', const='', default=None)
+    parser_add_signature.add_argument('-f', '--fingerprint', help='With --via-socket, --agent or --store, the fingerprint of the key to sign with. May be given more than once. Defaults to all of the daemon\'s or agent\'s keys; required with --store.', action='append', default=None)
+    add_batch_arguments(parser_add_signature, 'envelope')
     parser_add_signature.set_defaults(func=add_signature_command)
 
     # verify_signature_command
@@ -253,10 +625,57 @@ def _main(arg_array):
     parser_verify_signature.add_argument('-K', '--key-path', help='Path to the file containing the public key envelope', default=None)
     parser_verify_signature.add_argument('-e', '--envelope', help='Envelope to verify', default=None)
     parser_verify_signature.add_argument('-E', '--envelope-path', help='Path to the file containing the envelope to verify', default=None)
+    parser_verify_signature.add_argument('-r', '--keyring', help='Path to a file of public key envelopes, one per line. Each signature is checked against its own signer on the keyring, and verified signers are reported on stderr. Replaces --key and --key-path.', default=None)
+    parser_verify_signature.add_argument('-A', '--allowed-signers', help='Path to an OpenSSH allowed_signers file to use as the keyring, instead of --keyring. Entries restricted by `namespaces=` must allow --namespace, and `cert-authority` entries are ignored.', default=None)
+    parser_verify_signature.add_argument('-n', '--namespace', help='With --allowed-signers, the namespace the signers must be allowed to sign in', default='envelope')
+    parser_verify_signature.add_argument('--store', help='Use the public keys in the key store at this path, or the default store if no path is given, as the keyring. The signers of each envelope are looked up by key.', nargs='?', const='', default=None)
+    parser_verify_signature.add_argument('-f', '--fingerprint', help='With --store, use only the key with this fingerprint. May be given more than once.', action='append', default=None)
+    parser_verify_signature.add_argument('-t', '--threshold', help='Require valid signatures from at least this many distinct signers on the keyring. Requires --keyring, --allowed-signers, --store or --via-socket.', type=int, default=None)
     parser_verify_signature.add_argument('-s', '--silent', help='Suppress output', default=False, action='store_true')
+    parser_verify_signature.add_argument('--via-socket', help='Have the `serve` daemon listening on this Unix socket verify the envelope. Uses the daemon\'s keyring unless --key or --key-path is given.', default=None)
+    add_batch_arguments(parser_verify_signature, 'envelope')
     parser_verify_signature.set_defaults(func=verify_signature_command)
 
+    # serve_command
+    parser_serve = subparsers.add_parser('serve', help='Run a daemon that keeps keys loaded and signs and verifies envelopes over a Unix socket.')
+    parser_serve.add_argument('-S', '--socket', help='Path of the Unix socket to listen on', required=True)
+    parser_serve.add_argument('-k', '--key', help='Private key envelope to sign with. May be given more than once.', action='append', default=None)
+    parser_serve.add_argument('-K', '--key-path', help='Path to the file containing a private key envelope to sign with. May be given more than once.', action='append', default=None)
+    parser_serve.add_argument('-r', '--keyring', help='Path to a file of public key envelopes, one per line, to verify against. The public keys of the signing keys are always included.', default=None)
+    parser_serve.add_argument('-j', '--jobs', help='Number of requests to process concurrently', type=int, default=None)
+    parser_serve.set_defaults(func=serve_command)
+
+    # store commands
+    parser_store = subparsers.add_parser('store', help='Manage a local SQLite store of key envelopes, indexed by fingerprint')
+    store_subparsers = parser_store.add_subparsers(help='store commands')
+
+    def add_store_parser(name: str, help: str) -> argparse.ArgumentParser:
+        store_parser = store_subparsers.add_parser(name, help=help)
+        store_parser.add_argument('-s', '--store', help='Path to the key store. Defaults to SSH_ENVELOPE_STORE or ~/.ssh_envelope/keys.db.', default=None)
+        return store_parser
+
+    parser_store_add = add_store_parser('add', 'Add public or private key envelopes to the store, and print their fingerprints. Adding a private key also adds its public key.')
+    parser_store_add.add_argument('-k', '--key', help='Key envelope. May be given more than once.', action='append', default=None)
+    parser_store_add.add_argument('-K', '--key-path', help='Path to the file containing a key envelope. May be given more than once.', action='append', default=None)
+    parser_store_add.set_defaults(func=store_add_command)
+
+    parser_store_get = add_store_parser('get', 'Print the key envelope with a fingerprint')
+    parser_store_get.add_argument('fingerprint', help='The key\'s fingerprint, e.g. SHA256:...')
+    parser_store_get.add_argument('-p', '--private', help='Get the private key instead of the public key', default=False, action='store_true')
+    parser_store_get.set_defaults(func=store_get_command)
+
+    parser_store_find = add_store_parser('find', 'List the keys whose fingerprint starts with the query or whose comment contains it')
+    parser_store_find.add_argument('query', help='Fingerprint prefix, with or without SHA256:, or comment text', nargs='?', default='')
+    parser_store_find.add_argument('-t', '--type', help='Only keys of this type, e.g. ED25519', default=None)
+    parser_store_find.add_argument('-p', '--private', help='Only private keys', default=None, action='store_true')
+    parser_store_find.set_defaults(func=store_find_command)
+
+    parser_store_list = add_store_parser('list', 'List the keys in the store')
+    parser_store_list.add_argument('-p', '--private', help='Only private keys', default=None, action='store_true')
+    parser_store_list.set_defaults(func=store_list_command)
+
     args = parser.parse_args(arg_array)
+    configure_key_cache(args)
     if hasattr(args, 'func'):
         # try:
             args.func(args)
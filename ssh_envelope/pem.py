@@ -1,35 +1,50 @@
-import base64
+import binascii
+import re
+
+line_length = 70
+
+# A canonical body: full lines of base64, then a final line that may end in
+# padding.
+_canonical_body = re.compile(rf"(?:[A-Za-z0-9+/]{{{line_length}}}\n)*[A-Za-z0-9+/]*={{0,2}}")
 
 class PEM:
+    """
+    A PEM block: a header and the data it encodes.
+
+    Both directions are lazy. Parsing only splits off the header and footer;
+    the body is base64-decoded on the first access to `data`. Encoding happens
+    on the first access to `pem_string`, and a parsed block whose text is
+    already canonical returns that text unchanged.
+    """
+    __slots__ = ("_header", "_data", "_text", "_body", "_pem_string")
+
     def __init__(self, header: str, data: bytes):
+        self._init(header, data, None, None)
+
+    def _init(self, header: str, data: bytes | None, text: str | None, body: str | None):
         self._header = header
         self._data = data
-        self._pem_string = ""
-        self._encode_pem()
+        # The original text, as `pem_string` would produce it if canonical.
+        self._text = text
+        # The base64 body of the original text, including line breaks.
+        self._body = body
+        self._pem_string: str | None = None
 
     @classmethod
     def from_pem_string(cls, pem_string: str):
-        header, decoded_data = cls._parse_pem(pem_string)
-        return cls(header, decoded_data)
-
-    @classmethod
-    def from_header_and_data(cls, header: str, data: bytes):
-        return cls(header, data)
-
-    @staticmethod
-    def _parse_pem(pem_string: str):
-        lines = pem_string.strip().split("\n")
-
-        if not lines:
-            raise ValueError("Empty PEM data")
+        text = pem_string.strip()
+        first_break = text.find("\n")
+        last_break = text.rfind("\n")
+        header_line = text[:first_break] if first_break >= 0 else text
+        footer_line = text[last_break + 1:] if last_break >= 0 else text
 
-        header = lines[0].strip()
-        footer = lines[-1].strip()
+        header = header_line.strip()
+        footer = footer_line.strip()
 
         if not header.startswith("-----BEGIN"):
             raise ValueError("Invalid PEM header")
 
-        if not footer.startswith("-----END"):
+        if not footer.startswith("-----END") or first_break < 0:
             raise ValueError("Invalid PEM footer")
 
         header_type = header[11:-5]
@@ -38,22 +53,51 @@ class PEM:
         if header_type != footer_type:
             raise ValueError("PEM header and footer do not match")
 
-        base64_data = "".join(lines[1:-1]).replace(" ", "").replace("\t", "")
-        decoded_data = base64.b64decode(base64_data)
+        body = text[first_break + 1:last_break] if first_break < last_break else ""
+        pem = cls.__new__(cls)
+        pem._init(header_type, None, text + "\n", body)
+        return pem
 
-        return header_type, decoded_data
+    @classmethod
+    def from_header_and_data(cls, header: str, data: bytes):
+        return cls(header, data)
 
-    def _encode_pem(self):
-        base64_data = base64.b64encode(self._data).decode("utf-8")
-        pem_lines = [f"-----BEGIN {self._header}-----"]
-        line_len = 70
-        pem_lines.extend(base64_data[i:i+line_len] for i in range(0, len(base64_data), line_len))
-        pem_lines.append(f"-----END {self._header}-----")
-        self._pem_string = "\n".join(pem_lines) + "\n"
+    def _decode(self) -> bytes:
+        # The non-strict decoder skips line breaks and other whitespace itself.
+        assert self._body is not None
+        try:
+            return binascii.a2b_base64(self._body)
+        except binascii.Error as e:
+            raise ValueError(f"Invalid PEM data: {e}") from e
+
+    def _encode(self) -> str:
+        base64_data = binascii.b2a_base64(self.data, newline=False).decode("ascii")
+        body = "\n".join(base64_data[i:i + line_length] for i in range(0, len(base64_data), line_length))
+        if body:
+            body += "\n"
+        return f"-----BEGIN {self._header}-----\n{body}-----END {self._header}-----\n"
+
+    def _is_canonical(self) -> bool:
+        assert self._text is not None and self._body is not None
+        if not self._text.startswith(f"-----BEGIN {self._header}-----\n"):
+            return False
+        if not self._text.endswith(f"\n-----END {self._header}-----\n"):
+            return False
+        if _canonical_body.fullmatch(self._body) is None:
+            return False
+        if len(self._body) - self._body.rfind("\n") - 1 > line_length:
+            return False
+        data = self.data
+        base64_length = len(self._body) - self._body.count("\n")
+        if base64_length != 4 * ((len(data) + 2) // 3):
+            return False
+        # Only the last group can carry non-zero padding bits.
+        tail = data[len(data) - (len(data) % 3 or 3):]
+        return self._body.endswith(binascii.b2a_base64(tail, newline=False).decode("ascii"))
 
     def __eq__(self, other):
         if isinstance(other, PEM):
-            return self._header == other._header and self._data == other._data
+            return self._header == other._header and self.data == other.data
         return False
 
     @property
@@ -61,9 +105,16 @@ class PEM:
         return self._header
 
     @property
-    def data(self):
+    def data(self) -> bytes:
+        if self._data is None:
+            self._data = self._decode()
         return self._data
 
     @property
-    def pem_string(self):
+    def pem_string(self) -> str:
+        if self._pem_string is None:
+            if self._text is not None and self._is_canonical():
+                self._pem_string = self._text
+            else:
+                self._pem_string = self._encode()
         return self._pem_string
@@ -0,0 +1,71 @@
+import json
+import socket
+import struct
+from typing import Any
+
+# The `serve` daemon and its clients exchange messages over a Unix domain
+# socket. Each message is a 4-byte big-endian length followed by that many
+# bytes of UTF-8 JSON, which is always an object.
+#
+# Requests:
+#
+#   {"op": "sign", "envelope": "ur:envelope/...", "namespace": "envelope",
+#    "fingerprints": ["SHA256:..."]}  (fingerprints are optional)
+#   {"op": "verify", "envelope": "ur:envelope/...",
+#    "key": "ur:envelope/...", "threshold": 2}  (key and threshold are optional)
+#   {"op": "keys"}
+#
+# Responses carry `"status": "ok"` with the results, or `"status": "error"`
+# with an `"error"` message.
+
+max_message_size = 16 * 1024 * 1024
+
+_length = struct.Struct(">I")
+
+def send_message(sock: socket.socket, message: dict[str, Any]):
+    """
+    Sends a length-prefixed JSON message.
+
+    :raises ValueError: If the message is too large.
+    """
+    body = json.dumps(message, separators=(",", ":")).encode()
+    if len(body) > max_message_size:
+        raise ValueError("Message too large")
+    sock.sendall(_length.pack(len(body)) + body)
+
+def receive_message(sock: socket.socket) -> dict[str, Any] | None:
+    """
+    Receives a length-prefixed JSON message.
+
+    Returns None if the peer closed the connection between messages.
+
+    :raises ValueError: If the message is too large, truncated or not a JSON
+        object.
+    """
+    header = _receive_exactly(sock, _length.size)
+    if header is None:
+        return None
+    (length,) = _length.unpack(header)
+    if length > max_message_size:
+        raise ValueError("Message too large")
+    body = _receive_exactly(sock, length)
+    if body is None:
+        raise ValueError("Truncated message")
+    try:
+        message = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid message: {e}") from e
+    if not isinstance(message, dict):
+        raise ValueError("Invalid message: not a JSON object")
+    return message
+
+def _receive_exactly(sock: socket.socket, length: int) -> bytes | None:
+    buf = bytearray()
+    while len(buf) < length:
+        chunk = sock.recv(length - len(buf))
+        if not chunk:
+            if buf:
+                raise ValueError("Truncated message")
+            return None
+        buf += chunk
+    return bytes(buf)
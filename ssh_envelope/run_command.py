@@ -1,23 +1,27 @@
+import asyncio
 import os
 import subprocess
 
-def run_command(command: list[str], stdin: bytes | None = None) -> bytes:
+def _command_env() -> dict[str, str]:
+    env = os.environ.copy()
+    cargo_bin_path = os.path.expanduser("~/.cargo/bin")
+    env["PATH"] = cargo_bin_path + os.pathsep + env["PATH"]
+    return env
+
+def run_command(command: list[str], stdin: bytes | None = None, pass_fds: tuple[int, ...] = ()) -> bytes:
     """
     Run a command in the shell and return the output.
 
     Args:
         command (list[str]): The command to be executed as a list of strings.
         stdin (bytes | None): Optional bytes to send to the command's standard input.
+        pass_fds (tuple[int, ...]): File descriptors to keep open in the command.
 
     Returns:
         str: The output of the command.
     """
-    env = os.environ.copy()
-    cargo_bin_path = os.path.expanduser("~/.cargo/bin")
-    env["PATH"] = cargo_bin_path + os.pathsep + env["PATH"]
-
     input_data = stdin if stdin else None
-    result = subprocess.run(command, input=input_data, capture_output=True, env=env)
+    result = subprocess.run(command, input=input_data, capture_output=True, env=_command_env(), pass_fds=pass_fds)
 
     error_status = result.returncode
     stdout = result.stdout
@@ -27,3 +31,34 @@ def run_command(command: list[str], stdin: bytes | None = None) -> bytes:
         raise Exception(f"Command '{command}' failed with error code {error_status}: {stderr}")
 
     return stdout
+
+async def run_command_async(command: list[str], stdin: bytes | None = None, pass_fds: tuple[int, ...] = ()) -> bytes:
+    """
+    Run a command without blocking the event loop and return the output.
+
+    Behaves like `run_command`, but spawns the process with
+    `asyncio.create_subprocess_exec`.
+
+    Args:
+        command (list[str]): The command to be executed as a list of strings.
+        stdin (bytes | None): Optional bytes to send to the command's standard input.
+        pass_fds (tuple[int, ...]): File descriptors to keep open in the command.
+
+    Returns:
+        bytes: The output of the command.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdin=subprocess.PIPE if stdin else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=_command_env(),
+        pass_fds=pass_fds,
+    )
+    stdout, stderr = await process.communicate(stdin if stdin else None)
+
+    error_status = process.returncode
+    if error_status != 0:
+        raise Exception(f"Command '{command}' failed with error code {error_status}: {stderr}")
+
+    return stdout
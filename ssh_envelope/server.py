@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from ssh_envelope.envelope import Envelope
+from ssh_envelope.keyring import Keyring
+from ssh_envelope.protocol import receive_message, send_message
+from ssh_envelope.ssh_object_utils import derive_public_key
+from ssh_envelope.ssh_private_key import SSHPrivateKey
+from ssh_envelope.threshold import verify_threshold
+
+logger = logging.getLogger(__name__)
+
+class EnvelopeServer:
+    """
+    Signs and verifies envelopes with keys that are decoded once and kept in
+    memory, for the `serve` daemon.
+
+    Requests run on a worker pool. Identical requests that arrive while one is
+    already in flight share its result instead of being run again.
+    """
+    def __init__(self, private_keys: list[Envelope], keyring: Keyring | None = None, max_workers: int | None = None):
+        """
+        :param private_keys: The keys used for signing. Their public keys are
+            added to the keyring.
+        :param keyring: The trusted public keys used for verification.
+        :param max_workers: The size of the worker pool.
+        """
+        self._signers: dict[str, SSHPrivateKey] = {}
+        self._keyring = keyring if keyring is not None else Keyring()
+        for private_key in private_keys:
+            ssh_private_key = private_key.to_ssh_private_key()
+            public_key = derive_public_key(ssh_private_key)
+            self._signers[public_key.fingerprint] = ssh_private_key
+            self._keyring.add(public_key)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, Future] = {}
+        self._server: socketserver.UnixStreamServer | None = None
+
+    @property
+    def keyring(self) -> Keyring:
+        return self._keyring
+
+    @property
+    def fingerprints(self) -> list[str]:
+        """
+        The fingerprints of the signing keys.
+        """
+        return list(self._signers)
+
+    def submit(self, request: dict[str, Any]) -> Future:
+        """
+        Schedules a request on the worker pool, or joins an identical request
+        already in flight. The future's result is the response.
+        """
+        key = json.dumps(request, sort_keys=True)
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(self.handle, request)
+            self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return future
+
+    def _forget(self, key: str, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        """
+        Runs a request and returns the response. Errors are reported in the
+        response rather than raised.
+        """
+        try:
+            op = request.get("op")
+            if op == "sign":
+                return self._sign(request)
+            elif op == "verify":
+                return self._verify(request)
+            elif op == "keys":
+                return {"status": "ok", "fingerprints": self.fingerprints}
+            else:
+                raise ValueError(f"Unknown op: {op}")
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+
+    def _sign(self, request: dict[str, Any]) -> dict[str, Any]:
+        fingerprints = request.get("fingerprints") or self.fingerprints
+        if not fingerprints:
+            raise ValueError("No signing keys loaded")
+        keys: list[SSHPrivateKey] = []
+        for fingerprint in fingerprints:
+            if fingerprint not in self._signers:
+                raise ValueError(f"Unknown signing key: {fingerprint}")
+            keys.append(self._signers[fingerprint])
+        envelope = Envelope(_required(request, "envelope"))
+        signed_envelope = envelope.add_ssh_signatures(keys, request.get("namespace", "envelope"), max_workers=1)
+        return {"status": "ok", "result": signed_envelope.ur}
+
+    def _verify(self, request: dict[str, Any]) -> dict[str, Any]:
+        envelope = Envelope(_required(request, "envelope"))
+        threshold = request.get("threshold")
+        if request.get("key"):
+            if threshold is not None:
+                raise ValueError("threshold cannot be used with key")
+            is_verified = envelope.verify_signature(Envelope(request["key"]))
+            signers = []
+        elif threshold is not None:
+            signers = verify_threshold(envelope.subject.digest, envelope.find_signatures(), self._keyring, threshold)
+            is_verified = len(signers) >= threshold
+        else:
+            signers = envelope.verified_signers(self._keyring)
+            is_verified = len(signers) > 0
+        return {
+            "status": "ok",
+            "verified": is_verified,
+            "signers": [signer.fingerprint for signer in signers],
+        }
+
+    def serve(self, path: str):
+        """
+        Listens on a Unix domain socket at the given path until `shutdown` is
+        called. The socket is only accessible to the current user.
+
+        :raises ValueError: If something other than a socket exists at the
+            path, or another server is listening on it.
+        """
+        if os.path.exists(path):
+            if not stat.S_ISSOCK(os.stat(path).st_mode):
+                raise ValueError(f"Not a socket: {path}")
+            # Only a socket nobody is listening on is stale and safe to remove.
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(path)
+                except ConnectionRefusedError:
+                    os.unlink(path)
+                else:
+                    raise ValueError(f"Socket already in use: {path}")
+        server = _UnixServer(path, _Handler, bind_and_activate=False)
+        try:
+            server.server_bind()
+            # Nobody can connect until `listen`, so restricting the socket in
+            # between leaves no window for other users.
+            os.chmod(path, 0o600)
+            server.server_activate()
+        except BaseException:
+            server.server_close()
+            raise
+        server.envelope_server = self
+        self._server = server
+        logger.info(f"Serving on {path}")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            if os.path.exists(path):
+                os.unlink(path)
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """
+        Stops a running `serve` call. Must be called from another thread.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def _required(request: dict[str, Any], field: str) -> Any:
+    value = request.get(field)
+    if value is None:
+        raise ValueError(f"Missing field: {field}")
+    return value
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        envelope_server: EnvelopeServer = self.server.envelope_server # type: ignore
+        while True:
+            try:
+                request = receive_message(self.request)
+            except ValueError as e:
+                send_message(self.request, {"status": "error", "error": str(e)})
+                return
+            except OSError:
+                return
+            if request is None:
+                return
+            response = envelope_server.submit(request).result()
+            send_message(self.request, response)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    envelope_server: EnvelopeServer
@@ -0,0 +1,201 @@
+import os
+import socket
+import struct
+import threading
+
+from ssh_envelope.ssh_buffer import SSHReadBuffer, SSHWriteBuffer
+from ssh_envelope.ssh_hash import SSHHash
+from ssh_envelope.ssh_key_type import SSHKeyType
+from ssh_envelope.ssh_public_key import SSHPublicKey
+from ssh_envelope.ssh_public_key_data import SSHPublicKeyData
+from ssh_envelope.ssh_signature import SSHSignature
+from ssh_envelope.ssh_utils import parse_public_key_data
+from ssh_envelope.sshsig import signed_data
+
+# Client side of the ssh-agent protocol, enough to list the agent's keys and
+# have it make SSHSIG signatures. Keys stay in the agent; nothing is written
+# to disk. See draft-miller-ssh-agent.
+
+agent_failure = 5
+agentc_request_identities = 11
+agent_identities_answer = 12
+agentc_sign_request = 13
+agent_sign_response = 14
+
+# Sign request flags selecting the RSA signature algorithm.
+agent_rsa_sha2_256 = 2
+agent_rsa_sha2_512 = 4
+
+max_agent_message_size = 256 * 1024
+
+_length = struct.Struct(">I")
+
+class SSHAgent:
+    """
+    A connection to an ssh-agent.
+
+    The connection is opened on first use and shared between threads, one
+    request at a time.
+    """
+    def __init__(self, path: str | None = None):
+        """
+        :param path: The path of the agent's socket. Defaults to
+            `SSH_AUTH_SOCK`.
+        :raises ValueError: If no path is given and `SSH_AUTH_SOCK` is not set.
+        """
+        path = path or os.environ.get("SSH_AUTH_SOCK")
+        if not path:
+            raise ValueError("No ssh-agent: SSH_AUTH_SOCK is not set")
+        self._path = path
+        self._socket: socket.socket | None = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def close(self):
+        with self._lock:
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
+
+    def request(self, message_type: int, payload: bytes = b"") -> tuple[int, bytes]:
+        """
+        Sends a message to the agent and returns the type and payload of its
+        reply.
+
+        :raises ValueError: If the reply is malformed.
+        """
+        with self._lock:
+            if self._socket is None:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self._path)
+                self._socket = sock
+            try:
+                return _request(self._socket, message_type, payload)
+            except (OSError, ValueError):
+                self._socket.close()
+                self._socket = None
+                raise
+
+    def identities(self) -> list[SSHPublicKey]:
+        """
+        Returns the keys held by the agent, with their comments.
+
+        :raises ValueError: If the agent refuses the request.
+        """
+        message_type, payload = self.request(agentc_request_identities)
+        if message_type != agent_identities_answer:
+            raise ValueError("ssh-agent refused to list identities")
+        buf = SSHReadBuffer(payload)
+        count = buf.read_int()
+        keys: list[SSHPublicKey] = []
+        for _ in range(count):
+            blob = buf.read_chunk_view()
+            comment = buf.read_length_prefixed_string()
+            try:
+                key_data = _parse_key_blob(blob)
+            except ValueError:
+                # Skip certificates and key types we don't support.
+                continue
+            # Comments with whitespace aren't allowed on SSHPublicKey.
+            keys.append(SSHPublicKey(key_data, comment if not any(c.isspace() for c in comment) else ""))
+        return keys
+
+    def sign_data(self, data: bytes, public_key_data: SSHPublicKeyData, flags: int = 0) -> tuple[str, bytes]:
+        """
+        Has the agent sign raw data with the key it holds for the given public
+        key.
+
+        Returns a tuple of the SSH signature type and the signature blob in SSH
+        wire format.
+
+        :raises ValueError: If the agent refuses, e.g. because it doesn't hold
+            the key.
+        """
+        buf = SSHWriteBuffer()
+        buf.write_chunk(public_key_data.hash_image)
+        buf.write_chunk(data)
+        buf.write_int(flags)
+        message_type, payload = self.request(agentc_sign_request, buf.data)
+        if message_type != agent_sign_response:
+            raise ValueError("ssh-agent refused to sign")
+        buf = SSHReadBuffer(payload)
+        sig_buf = SSHReadBuffer(buf.read_chunk_view())
+        signature_type = sig_buf.read_length_prefixed_string()
+        signature_data = sig_buf.read_chunk()
+        if not sig_buf.is_at_end:
+            raise ValueError("ssh-agent: Extra data after signature")
+        return signature_type, signature_data
+
+    def sign_message(self,
+                     message: bytes,
+                     public_key_data: SSHPublicKeyData,
+                     namespace: str,
+                     hash_algorithm: SSHHash.Algorithm = SSHHash.Algorithm.SHA512,
+                     ) -> SSHSignature:
+        """
+        Makes an SSHSIG signature over the message with the agent's key for the
+        given public key. RSA signatures use `rsa-sha2-512`, as `ssh-keygen`
+        does.
+
+        :raises ValueError: If the agent refuses to sign, or signs with an
+            algorithm SSHSIG doesn't allow for the key, such as SHA-1 `ssh-rsa`
+            from an agent that ignores the requested flags.
+        """
+        data = signed_data(message, namespace, hash_algorithm)
+        flags = agent_rsa_sha2_512 if public_key_data.type is SSHKeyType.RSA else 0
+        signature_type, signature_data = self.sign_data(data, public_key_data, flags)
+        if public_key_data.type is SSHKeyType.RSA:
+            allowed = signature_type in ("rsa-sha2-512", "rsa-sha2-256")
+        else:
+            allowed = signature_type == str(public_key_data.type)
+        if not allowed:
+            raise ValueError(f"ssh-agent signed with {signature_type}, which is not allowed for a {public_key_data.type} key")
+        return SSHSignature(public_key_data, namespace, hash_algorithm, signature_data, signature_type)
+
+def _parse_key_blob(blob: bytes) -> SSHPublicKeyData:
+    buf = SSHReadBuffer(blob)
+    key_data = parse_public_key_data(buf)
+    if not buf.is_at_end:
+        raise ValueError("Extra data after public key")
+    return key_data
+
+def _request(sock: socket.socket, message_type: int, payload: bytes) -> tuple[int, bytes]:
+    write_agent_message(sock, message_type, payload)
+    return read_agent_message(sock)
+
+def read_agent_message(sock: socket.socket) -> tuple[int, bytes]:
+    """
+    Reads one ssh-agent message, returning its type and payload.
+
+    :raises ValueError: If the connection is closed or the message is
+        malformed.
+    """
+    (length,) = _length.unpack(_receive_exactly(sock, _length.size))
+    if length < 1 or length > max_agent_message_size:
+        raise ValueError("ssh-agent: Invalid message length")
+    message = _receive_exactly(sock, length)
+    return message[0], message[1:]
+
+def write_agent_message(sock: socket.socket, message_type: int, payload: bytes = b""):
+    """
+    Writes one ssh-agent message.
+    """
+    sock.sendall(_length.pack(len(payload) + 1) + bytes([message_type]) + payload)
+
+def _receive_exactly(sock: socket.socket, length: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < length:
+        chunk = sock.recv(length - len(buf))
+        if not chunk:
+            raise ValueError("ssh-agent: Connection closed")
+        buf += chunk
+    return bytes(buf)
@@ -1,53 +1,82 @@
+import struct
+from contextlib import contextmanager
+from typing import Iterator
+
+_uint32 = struct.Struct(">I")
+
 class SSHReadBuffer:
-    def __init__(self, data: bytes):
-        self.data = data
+    """
+    Reads SSH wire-format data without copying it.
+
+    The `*_view` methods and `read_chunks` return memoryviews into the
+    underlying data; `read` and `read_chunk` return copies, for values that
+    are kept after parsing.
+    """
+    def __init__(self, data: bytes | bytearray | memoryview):
+        self._source = data
+        self.data = memoryview(data)
         self.index = 0
 
-    def read(self, count: int) -> bytes:
-        if self.index + count > len(self.data):
+    def read_view(self, count: int) -> memoryview:
+        end = self.index + count
+        if count < 0 or end > len(self.data):
             raise ValueError("Buffer underflow")
-        bytes_ = self.data[self.index:self.index + count]
-        self.index += count
-        return bytes_
+        view = self.data[self.index:end]
+        self.index = end
+        return view
+
+    def read(self, count: int) -> bytes:
+        return bytes(self.read_view(count))
 
     def read_int(self) -> int:
-        length_data = self.read(4)
-        return int.from_bytes(length_data, byteorder="big")
+        if self.index + 4 > len(self.data):
+            raise ValueError("Buffer underflow")
+        (n,) = _uint32.unpack_from(self.data, self.index)
+        self.index += 4
+        return n
 
-    def read_chunk(self) -> bytes:
+    def read_chunk_view(self) -> memoryview:
         length = self.read_int()
-        return self.read(length)
+        return self.read_view(length)
+
+    def read_chunk(self) -> bytes:
+        return bytes(self.read_chunk_view())
 
-    def read_chunks(self) -> list[bytes]:
+    def read_chunks(self) -> list[memoryview]:
         chunks = []
         while self.index < len(self.data):
-            chunks.append(self.read_chunk())
+            chunks.append(self.read_chunk_view())
         return chunks
 
     @staticmethod
-    def read_chunks_from(data: bytes) -> list[bytes]:
+    def read_chunks_from(data: bytes) -> list[memoryview]:
         buf = SSHReadBuffer(data)
         return buf.read_chunks()
 
     def read_null_terminated_string(self) -> str:
-        bytes_ = b""
-        while True:
-            byte = self.read(1)
-            if byte == b"\x00":
-                break
-            bytes_ += byte
-        return bytes_.decode("utf-8")
+        if isinstance(self._source, (bytes, bytearray)):
+            end = self._source.find(b"\x00", self.index)
+        else:
+            end = self.data[self.index:].tobytes().find(b"\x00")
+            end = end + self.index if end >= 0 else end
+        if end < 0:
+            raise ValueError("Buffer underflow")
+        string = str(self.data[self.index:end], "utf-8")
+        self.index = end + 1
+        return string
 
     def read_length_prefixed_string(self) -> str:
-        length = self.read_int()
-        data = self.read(length)
-        return data.decode("utf-8")
-
-    def expect_padding(self):
-        padding_needed = 8 - (self.index % 8)
-        expected_padding = b"\x01\x02\x03\x04\x05\x06\x07"[:padding_needed]
-        padding = self.read(padding_needed)
-        if padding != expected_padding:
+        return str(self.read_chunk_view(), "utf-8")
+
+    def read_mpint(self) -> int:
+        return int.from_bytes(self.read_chunk_view(), byteorder="big", signed=True)
+
+    def expect_padding(self, block_size: int = 8):
+        # OpenSSH omits the padding when the data is already aligned, while
+        # other writers add a full block, so accept any run of 1, 2, 3, ...
+        # up to the end of the buffer.
+        padding = self.read_view(self.remaining)
+        if len(padding) > block_size or padding != bytes(range(1, len(padding) + 1)):
             raise ValueError("Invalid padding")
 
     @property
@@ -59,16 +88,26 @@ class SSHReadBuffer:
         return len(self.data) - self.index
 
 class SSHWriteBuffer:
+    """
+    Writes SSH wire-format data into a single growing `bytearray`.
+
+    Nested length-prefixed sections are written in place with `nested_chunk`,
+    so serialization is linear in the size of the output.
+    """
     def __init__(self):
-        self.data = b""
+        self._data = bytearray()
 
-    def write(self, bytes_: bytes):
-        self.data += bytes_
+    @property
+    def data(self) -> bytes:
+        return bytes(self._data)
+
+    def write(self, bytes_: bytes | bytearray | memoryview):
+        self._data += bytes_
 
     def write_int(self, n: int):
-        self.write(n.to_bytes(4, byteorder="big"))
+        self._data += _uint32.pack(n)
 
-    def write_chunk(self, chunk: bytes):
+    def write_chunk(self, chunk: bytes | bytearray | memoryview):
         self.write_int(len(chunk))
         self.write(chunk)
 
@@ -79,6 +118,21 @@ class SSHWriteBuffer:
         for chunk in chunks:
             self.write_chunk(chunk)
 
+    @contextmanager
+    def nested_chunk(self) -> Iterator[int]:
+        """
+        Writes a length-prefixed section in place. Everything written inside
+        the `with` block becomes the section's content, and its length is
+        filled in when the block exits.
+
+        Yields the offset where the section's content starts, for alignment.
+        """
+        length_offset = len(self._data)
+        self._data += b"\x00\x00\x00\x00"
+        start = len(self._data)
+        yield start
+        _uint32.pack_into(self._data, length_offset, len(self._data) - start)
+
     @staticmethod
     def chunks_to_data(chunks: list[bytes]) -> bytes:
         buf = SSHWriteBuffer()
@@ -90,14 +144,20 @@ class SSHWriteBuffer:
         self.write(b"\x00")
 
     def write_length_prefixed_string(self, string: str):
-        string_data = string.encode("utf-8")
-        self.write_int(len(string_data))
-        self.write(string_data)
+        self.write_chunk(string.encode("utf-8"))
+
+    def write_mpint(self, n: int):
+        length = (n.bit_length() + 8) // 8 if n > 0 else 0
+        self.write_chunk(n.to_bytes(length, byteorder="big", signed=True))
 
-    def write_padding(self):
-        padding_needed = 8 - (len(self.data) % 8)
-        self.write(b"\x01\x02\x03\x04\x05\x06\x07"[:padding_needed])
+    def write_padding(self, start: int = 0, block_size: int = 8):
+        """
+        Pads to a multiple of `block_size` bytes, counting from `start`. As
+        in ssh-keygen, data that is already aligned gets no padding.
+        """
+        padding_needed = -(len(self._data) - start) % block_size
+        self.write(bytes(range(1, padding_needed + 1)))
 
     @property
     def length(self) -> int:
-        return len(self.data)
+        return len(self._data)
@@ -20,6 +20,8 @@ class SSHHash:
         def __str__(self):
             return self.value
 
+    __slots__ = ("algorithm", "data")
+
     def __init__(self, data: Union[bytes, str], algorithm: Algorithm = Algorithm.SHA256):
         if isinstance(data, str):
             if algorithm == self.Algorithm.SHA256:
@@ -0,0 +1,173 @@
+import os
+from typing import NamedTuple
+
+import bcrypt
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from ssh_envelope.ssh_buffer import SSHReadBuffer, SSHWriteBuffer
+
+# An encrypted OpenSSH private key (see PROTOCOL.key in OpenSSH) names its
+# cipher and KDF in the clear:
+#
+#   string ciphername   e.g. "aes256-ctr"
+#   string kdfname      "bcrypt"
+#   string kdfoptions   string salt, uint32 rounds
+#
+# The cipher's key and IV are derived together from the password with
+# bcrypt_pbkdf, and the private section is encrypted with them. It is padded
+# to the cipher's block size, and for AES-GCM the 16-byte tag follows the
+# encrypted section, outside of its length.
+
+bcrypt_kdf = "bcrypt"
+default_cipher = "aes256-ctr"
+# The ssh-keygen defaults.
+default_rounds = 16
+salt_length = 16
+
+incorrect_password = "OpenSSH private key: Incorrect password"
+
+class _Cipher(NamedTuple):
+    key_length: int
+    iv_length: int
+    block_size: int
+    tag_length: int
+
+_ciphers = {
+    "aes256-ctr": _Cipher(32, 16, 16, 0),
+    "aes256-gcm@openssh.com": _Cipher(32, 12, 16, 16),
+}
+
+class SSHKeyEncryption:
+    """
+    How an OpenSSH private key is encrypted: its cipher, and the salt and
+    rounds of its bcrypt KDF. Holds no key material.
+    """
+    __slots__ = ("_cipher_name", "_salt", "_rounds")
+
+    def __init__(self, cipher_name: str, salt: bytes, rounds: int):
+        """
+        :raises ValueError: If the cipher is not supported, or the salt or
+            rounds are empty.
+        """
+        if cipher_name not in _ciphers:
+            raise ValueError(f"OpenSSH private key: Unsupported cipher {cipher_name}")
+        if not salt or rounds < 1:
+            raise ValueError("OpenSSH private key: Invalid KDF options")
+        self._cipher_name = cipher_name
+        self._salt = bytes(salt)
+        self._rounds = rounds
+
+    @classmethod
+    def generate(cls, cipher_name: str = default_cipher, rounds: int = default_rounds) -> "SSHKeyEncryption":
+        """
+        Returns encryption parameters with a fresh random salt.
+        """
+        return cls(cipher_name, os.urandom(salt_length), rounds)
+
+    @classmethod
+    def from_kdf(cls, cipher_name: str, kdf_name: str, kdf_options: bytes | memoryview) -> "SSHKeyEncryption":
+        """
+        :raises ValueError: If the cipher or KDF is not supported.
+        """
+        if cipher_name not in _ciphers:
+            raise ValueError(f"OpenSSH private key: Unsupported cipher {cipher_name}")
+        if kdf_name != bcrypt_kdf:
+            raise ValueError(f"OpenSSH private key: Unsupported KDF {kdf_name}")
+        buf = SSHReadBuffer(kdf_options)
+        salt = buf.read_chunk()
+        rounds = buf.read_int()
+        if not buf.is_at_end:
+            raise ValueError("OpenSSH private key: Extra data after KDF options")
+        return cls(cipher_name, salt, rounds)
+
+    def __repr__(self) -> str:
+        return f"SSHKeyEncryption({self._cipher_name!r}, salt={self._salt.hex()}, rounds={self._rounds})"
+
+    def __eq__(self, other):
+        if isinstance(other, SSHKeyEncryption):
+            return (self._cipher_name, self._salt, self._rounds) == (other._cipher_name, other._salt, other._rounds)
+        return False
+
+    def __hash__(self):
+        return hash((self._cipher_name, self._salt, self._rounds))
+
+    @property
+    def cipher_name(self) -> str:
+        return self._cipher_name
+
+    @property
+    def kdf_name(self) -> str:
+        return bcrypt_kdf
+
+    @property
+    def salt(self) -> bytes:
+        return self._salt
+
+    @property
+    def rounds(self) -> int:
+        return self._rounds
+
+    @property
+    def kdf_options(self) -> bytes:
+        buf = SSHWriteBuffer()
+        buf.write_chunk(self._salt)
+        buf.write_int(self._rounds)
+        return buf.data
+
+    @property
+    def block_size(self) -> int:
+        return _ciphers[self._cipher_name].block_size
+
+    @property
+    def tag_length(self) -> int:
+        return _ciphers[self._cipher_name].tag_length
+
+    def encrypt(self, password: bytes | str, data: bytes) -> tuple[bytes, bytes]:
+        """
+        Encrypts a padded private section.
+
+        :return: The encrypted section, and the tag, which is empty for
+            ciphers without one.
+        """
+        cipher = _ciphers[self._cipher_name]
+        key, iv = self._derive(password)
+        if cipher.tag_length:
+            sealed = AESGCM(key).encrypt(iv, data, None)
+            return sealed[:-cipher.tag_length], sealed[-cipher.tag_length:]
+        encryptor = Cipher(algorithms.AES(key), modes.CTR(iv)).encryptor()
+        return encryptor.update(data) + encryptor.finalize(), b""
+
+    def decrypt(self, password: bytes | str, data: bytes | memoryview, tag: bytes = b"") -> bytes:
+        """
+        Decrypts a private section.
+
+        :raises ValueError: If the section isn't a whole number of blocks, or
+            the tag doesn't match, meaning the password is incorrect. Ciphers
+            without a tag can't detect an incorrect password, which is left to
+            the check numbers of the decrypted section.
+        """
+        cipher = _ciphers[self._cipher_name]
+        if len(data) % cipher.block_size != 0:
+            raise ValueError("OpenSSH private key: Encrypted data is not a multiple of the block size")
+        if len(tag) != cipher.tag_length:
+            raise ValueError("OpenSSH private key: Invalid authentication tag")
+        key, iv = self._derive(password)
+        if cipher.tag_length:
+            try:
+                return AESGCM(key).decrypt(iv, bytes(data) + tag, None)
+            except InvalidTag:
+                raise ValueError(incorrect_password) from None
+        decryptor = Cipher(algorithms.AES(key), modes.CTR(iv)).decryptor()
+        return decryptor.update(data) + decryptor.finalize()
+
+    def _derive(self, password: bytes | str) -> tuple[bytes, bytes]:
+        # The key and the IV come from one KDF run, key first.
+        cipher = _ciphers[self._cipher_name]
+        if isinstance(password, str):
+            password = password.encode()
+        if not password:
+            raise ValueError("OpenSSH private key: Empty password")
+        derived = bcrypt.kdf(password, self._salt, cipher.key_length + cipher.iv_length, self._rounds, ignore_few_rounds=True)
+        return derived[:cipher.key_length], derived[cipher.key_length:]
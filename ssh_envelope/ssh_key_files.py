@@ -0,0 +1,262 @@
+import base64
+import binascii
+import functools
+import hashlib
+import hmac
+import mmap
+import re
+from typing import Callable, Generic, Iterable, Iterator, NamedTuple, TypeVar
+
+from ssh_envelope.keyring import Keyring
+from ssh_envelope.ssh_key_type import SSHKeyType
+from ssh_envelope.ssh_public_key import SSHPublicKey
+from ssh_envelope.ssh_public_key_data import SSHPublicKeyData
+
+# Streaming parsers for the OpenSSH files that list public keys:
+#
+#   authorized_keys:  [options] keytype base64 [comment]
+#   known_hosts:      [@marker] hostpatterns keytype base64 [comment]
+#   allowed_signers:  principals [options] keytype base64 [comment]
+#
+# See sshd(8) and ssh-keygen(1). Parsers are generators, so a file is never
+# held in memory as a list of entries, and `read_*` memory-maps the file.
+# Lines that are blank, comments, malformed, or use key types we don't
+# support (such as certificates) are skipped, as sshd does.
+
+known_host_markers = ("@cert-authority", "@revoked")
+
+class AuthorizedKey(NamedTuple):
+    line: int
+    options: tuple[str, ...]
+    public_key: SSHPublicKey
+    comment: str
+
+class KnownHost(NamedTuple):
+    line: int
+    # `@cert-authority`, `@revoked`, or None.
+    marker: str | None
+    # Host patterns, possibly hashed (`|1|salt|hash`).
+    hosts: tuple[str, ...]
+    public_key: SSHPublicKey
+    comment: str
+
+    def matches(self, hostname: str, port: int = 22) -> bool:
+        """
+        Whether the entry's host patterns match the host, including hashed
+        names and `!` negations.
+        """
+        name = hostname if port == 22 else f"[{hostname}]:{port}"
+        matched = False
+        for pattern in self.hosts:
+            if pattern.startswith("|1|"):
+                if _matches_hashed(pattern, name.lower()):
+                    matched = True
+            elif pattern.startswith("!"):
+                if _host_pattern(pattern[1:]).fullmatch(name.lower()):
+                    return False
+            elif _host_pattern(pattern).fullmatch(name.lower()):
+                matched = True
+        return matched
+
+class AllowedSigner(NamedTuple):
+    line: int
+    principals: tuple[str, ...]
+    options: tuple[str, ...]
+    public_key: SSHPublicKey
+    comment: str
+
+    @property
+    def namespaces(self) -> tuple[str, ...] | None:
+        """
+        The namespaces the key may sign in, or None if it isn't restricted.
+        """
+        value = _option_value(self.options, "namespaces")
+        return None if value is None else tuple(value.split(","))
+
+    @property
+    def is_cert_authority(self) -> bool:
+        return "cert-authority" in (option.lower() for option in self.options)
+
+    def allows_namespace(self, namespace: str) -> bool:
+        namespaces = self.namespaces
+        return namespaces is None or any(_wildcard_pattern(pattern).fullmatch(namespace) for pattern in namespaces)
+
+def read_lines(path: str) -> Iterator[str]:
+    """
+    Yields the lines of a file, memory-mapped so large files aren't read into
+    memory at once.
+    """
+    with open(path, "rb") as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped.
+            return
+        with mapped:
+            start = 0
+            size = len(mapped)
+            while start < size:
+                end = mapped.find(b"\n", start)
+                if end < 0:
+                    end = size
+                yield mapped[start:end].decode("utf-8", errors="replace")
+                start = end + 1
+
+def parse_authorized_keys(lines: Iterable[str]) -> Iterator[AuthorizedKey]:
+    for number, prefix, public_key, comment in _parse_lines(lines, (0, 1)):
+        options = _split_options(prefix[0]) if prefix else ()
+        yield AuthorizedKey(number, options, public_key, comment)
+
+def parse_known_hosts(lines: Iterable[str]) -> Iterator[KnownHost]:
+    for number, prefix, public_key, comment in _parse_lines(lines, (1, 2)):
+        marker = None
+        if len(prefix) == 2:
+            marker = prefix[0].lower()
+            if marker not in known_host_markers:
+                continue
+        elif prefix[0].startswith("@"):
+            continue
+        yield KnownHost(number, marker, tuple(prefix[-1].split(",")), public_key, comment)
+
+def parse_allowed_signers(lines: Iterable[str]) -> Iterator[AllowedSigner]:
+    for number, prefix, public_key, comment in _parse_lines(lines, (1, 2)):
+        principals = tuple(_unquote(prefix[0]).split(","))
+        options = _split_options(prefix[1]) if len(prefix) == 2 else ()
+        yield AllowedSigner(number, principals, options, public_key, comment)
+
+def read_authorized_keys(path: str) -> Iterator[AuthorizedKey]:
+    return parse_authorized_keys(read_lines(path))
+
+def read_known_hosts(path: str) -> Iterator[KnownHost]:
+    return parse_known_hosts(read_lines(path))
+
+def read_allowed_signers(path: str) -> Iterator[AllowedSigner]:
+    return parse_allowed_signers(read_lines(path))
+
+
+Entry = TypeVar("Entry", AuthorizedKey, KnownHost, AllowedSigner)
+
+class KeyFileIndex(Generic[Entry]):
+    """
+    The entries of a key file, indexed by key blob, so the entries for a key
+    are found with one lookup.
+    """
+    def __init__(self, entries: Iterable[Entry]):
+        self._by_blob: dict[bytes, list[Entry]] = {}
+        self._count = 0
+        for entry in entries:
+            self._by_blob.setdefault(entry.public_key.key_data.hash_image, []).append(entry)
+            self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Entry]:
+        for entries in self._by_blob.values():
+            yield from entries
+
+    def __contains__(self, key: SSHPublicKey | SSHPublicKeyData) -> bool:
+        return bool(self.find(key))
+
+    def find(self, key: SSHPublicKey | SSHPublicKeyData) -> list[Entry]:
+        """
+        Returns the entries for the key, in file order.
+        """
+        key_data = key.key_data if isinstance(key, SSHPublicKey) else key
+        return self._by_blob.get(key_data.hash_image, [])
+
+    def keyring(self, include: Callable[[Entry], bool] | None = None) -> Keyring:
+        """
+        Returns a keyring of the keys with at least one included entry.
+
+        :param include: Selects entries. Defaults to all entries.
+        """
+        return Keyring(entry.public_key for entry in self if include is None or include(entry))
+
+
+_whitespace = re.compile(r"\s")
+_key_types = frozenset(str(key_type) for key_type in SSHKeyType.all())
+
+def _parse_lines(lines: Iterable[str], prefix_lengths: tuple[int, ...]) -> Iterator[tuple[int, list[str], SSHPublicKey, str]]:
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fields, ends = _split_fields(line)
+        # The key type is the first field that names one, so options and
+        # patterns before it are skipped without being interpreted.
+        index = next((i for i, field in enumerate(fields) if field in _key_types), None)
+        if index is None or index not in prefix_lengths or index + 1 >= len(fields):
+            continue
+        try:
+            key_data = _decode_key(fields[index], fields[index + 1])
+        except ValueError:
+            continue
+        comment = _rest(line, index + 2, ends)
+        # Comments with whitespace aren't allowed on SSHPublicKey.
+        public_key = SSHPublicKey(key_data, comment if not _whitespace.search(comment) else "")
+        yield number, fields[:index], public_key, comment
+
+def _decode_key(type_string: str, base64_string: str) -> SSHPublicKeyData:
+    try:
+        blob = base64.b64decode(base64_string, validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid key data: {e}") from e
+    return SSHPublicKeyData.from_blob(blob, SSHKeyType.from_string(type_string))
+
+# A field is whitespace-free text and double-quoted strings, which may
+# contain whitespace and commas, e.g. `command="echo a, b",no-pty`.
+_field = re.compile(r'(?:"(?:[^"\\]|\\.)*"|[^\s"]+)+')
+_option = re.compile(r'(?:"(?:[^"\\]|\\.)*"|[^,"]+)+')
+
+def _split_fields(line: str) -> tuple[list[str], list[int] | None]:
+    # Returns the fields, and the offset just past each one if the line has
+    # quotes. Most lines don't, and take the fast path.
+    if '"' not in line:
+        return line.split(), None
+    matches = list(_field.finditer(line))
+    return [match.group() for match in matches], [match.end() for match in matches]
+
+def _rest(line: str, count: int, ends: list[int] | None) -> str:
+    # The text after the first `count` fields.
+    if ends is not None:
+        return line[ends[count - 1]:].strip() if len(ends) >= count else ""
+    parts = line.split(None, count)
+    return parts[count] if len(parts) > count else ""
+
+def _split_options(options: str) -> tuple[str, ...]:
+    return tuple(match.group() for match in _option.finditer(options))
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+def _option_value(options: tuple[str, ...], name: str) -> str | None:
+    prefix = name + "="
+    for option in options:
+        if option.lower().startswith(prefix):
+            return _unquote(option[len(prefix):])
+    return None
+
+@functools.lru_cache(maxsize=1024)
+def _wildcard_pattern(pattern: str) -> re.Pattern:
+    # `*` and `?` are wildcards; everything else, including the brackets of
+    # `[host]:port`, is literal. Case-sensitive, as namespaces are.
+    return re.compile("".join(".*" if c == "*" else "." if c == "?" else re.escape(c) for c in pattern))
+
+def _host_pattern(pattern: str) -> re.Pattern:
+    # Host names match case-insensitively; match against a lowercased name.
+    return _wildcard_pattern(pattern.lower())
+
+def _matches_hashed(pattern: str, name: str) -> bool:
+    parts = pattern.split("|")
+    if len(parts) != 4:
+        return False
+    try:
+        salt = base64.b64decode(parts[2], validate=True)
+        expected = base64.b64decode(parts[3], validate=True)
+    except binascii.Error:
+        return False
+    digest = hmac.new(salt, name.encode(), hashlib.sha1).digest()
+    return hmac.compare_digest(digest, expected)
@@ -21,41 +21,84 @@ class ECDSAType(Enum):
         return cls(s)
 
 
-class SSHKeyType(Enum):
-    RSA = "ssh-rsa"
-    DSA = "ssh-dss"
-    ED25519 = "ssh-ed25519"
-    ECDSA = "ecdsa"
+class SSHKeyType:
+    """
+    An SSH key algorithm, e.g. `ssh-ed25519` or `ecdsa-sha2-nistp384`.
 
-    def __init__(self, value):
-        self._value_ = value
-        self._subtype = None
+    There is exactly one instance per algorithm, so key types compare and hash
+    by identity and can be used as registry keys. Instances are immutable and
+    safe to share between threads.
+    """
+    __slots__ = ("_string", "_name", "_subtype")
+
+    RSA: "SSHKeyType"
+    DSA: "SSHKeyType"
+    ED25519: "SSHKeyType"
+    ECDSA_NISTP256: "SSHKeyType"
+    ECDSA_NISTP384: "SSHKeyType"
+    ECDSA_NISTP521: "SSHKeyType"
+
+    _registry: dict[str, "SSHKeyType"] = {}
+
+    def __init__(self, string: str, name: str, subtype: ECDSAType | None = None):
+        if string in SSHKeyType._registry:
+            raise ValueError(f"Duplicate key type: {string}")
+        object.__setattr__(self, "_string", string)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_subtype", subtype)
+        SSHKeyType._registry[string] = self
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SSHKeyType is immutable")
 
     def __str__(self):
-        if self == SSHKeyType.ECDSA:
-            return f"ecdsa-sha2-{self._subtype}"
-        return self.value
+        return self._string
+
+    def __repr__(self):
+        return f"SSHKeyType({self._string!r})"
 
-    def __eq__(self, other):
-        if isinstance(other, SSHKeyType):
-            return self._value_ == other._value_ and self._subtype == other._subtype
-        return False
+    def __reduce__(self):
+        # Unpickle to the interned instance.
+        return (SSHKeyType.from_string, (self._string,))
+
+    @property
+    def name(self) -> str:
+        """
+        The name of the algorithm family, e.g. `ECDSA` for every curve.
+        """
+        return self._name
 
     @property
     def hash_name(self):
-        return self.name
+        return self._name
+
+    @property
+    def is_ecdsa(self) -> bool:
+        return self._subtype is not None
 
     @property
     def subtype(self) -> ECDSAType:
-        assert self == self.ECDSA and self._subtype is not None
+        assert self._subtype is not None
         return self._subtype
 
     @classmethod
-    def from_string(cls, s):
-        if s.startswith("ecdsa-sha2-"):
-            subtype = ECDSAType.from_string(s.replace("ecdsa-sha2-", ""))
-            key_type = cls.ECDSA
-            key_type._subtype = subtype
-            return key_type
+    def from_string(cls, s: str) -> "SSHKeyType":
+        """
+        :raises ValueError: If the algorithm is not supported.
+        """
+        key_type = cls._registry.get(s)
+        if key_type is None:
+            raise ValueError(f"Unknown key type: {s}")
+        return key_type
 
-        return cls(s)
+    @classmethod
+    def all(cls) -> list["SSHKeyType"]:
+        return list(cls._registry.values())
+
+
+SSHKeyType.RSA = SSHKeyType("ssh-rsa", "RSA")
+SSHKeyType.DSA = SSHKeyType("ssh-dss", "DSA")
+SSHKeyType.ED25519 = SSHKeyType("ssh-ed25519", "ED25519")
+SSHKeyType.ECDSA_NISTP256 = SSHKeyType(f"ecdsa-sha2-{ECDSAType.NISTP256}", "ECDSA", ECDSAType.NISTP256)
+SSHKeyType.ECDSA_NISTP384 = SSHKeyType(f"ecdsa-sha2-{ECDSAType.NISTP384}", "ECDSA", ECDSAType.NISTP384)
+SSHKeyType.ECDSA_NISTP521 = SSHKeyType(f"ecdsa-sha2-{ECDSAType.NISTP521}", "ECDSA", ECDSAType.NISTP521)
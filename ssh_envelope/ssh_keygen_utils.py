@@ -1,69 +1,152 @@
+import asyncio
 import os
+import sys
 import tempfile
 
 from ssh_envelope.file_utils import secure_delete
-from ssh_envelope.run_command import run_command
+from ssh_envelope.run_command import run_command, run_command_async
 from ssh_envelope.ssh_private_key import SSHPrivateKey
 from ssh_envelope.ssh_public_key import SSHPublicKey
 from ssh_envelope.ssh_signature import SSHSignature
 
-def sign_message(message: bytes, private_key: SSHPrivateKey, namespace: str) -> SSHSignature:
-    with tempfile.TemporaryDirectory() as tmpdir:
-        private_key_file = None
+# On Linux, the key, signature and allowed_signers material is handed to
+# ssh-keygen as anonymous in-memory files (memfd_create), opened by the child
+# through /dev/fd/N. Nothing touches the disk, so there is nothing to
+# overwrite or unlink afterwards. Elsewhere, temporary files are used.
+use_memfd = sys.platform.startswith("linux") and hasattr(os, "memfd_create")
+
+class _KeygenFiles:
+    """
+    The files passed to one ssh-keygen invocation. Paths returned by `add` are
+    only valid until the context exits, and the command must be run with
+    `pass_fds`.
+    """
+    def __init__(self):
+        self._fds: list[int] = []
+        self._paths: list[str] = []
+        self._tmpdir: tempfile.TemporaryDirectory | None = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        for fd in self._fds:
+            os.close(fd)
+        for path in self._paths:
+            # Securely delete the temporary file
+            secure_delete(path)
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+
+    @property
+    def pass_fds(self) -> tuple[int, ...]:
+        return tuple(self._fds)
+
+    def add(self, name: str, content: str) -> str:
+        """
+        Returns the path of a new file, readable only by the current user, with
+        the given content.
+        """
+        if use_memfd:
+            try:
+                fd = os.memfd_create(name, os.MFD_CLOEXEC)
+            except OSError:
+                # Unavailable at run time, e.g. under seccomp or on an old
+                # kernel: fall back to a temporary file.
+                pass
+            else:
+                self._fds.append(fd)
+                # ssh-keygen refuses private keys readable by others.
+                os.fchmod(fd, 0o600)
+                # Writes to the duplicate land in the memfd, and the file
+                # object retries short writes until everything is written.
+                with os.fdopen(os.dup(fd), "wb") as f:
+                    f.write(content.encode())
+                return f"/dev/fd/{fd}"
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self._tmpdir.name, name)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        self._paths.append(path)
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        return path
+
+def _sign_command(files: _KeygenFiles, private_key: SSHPrivateKey, namespace: str) -> list[str]:
+    private_key_file = files.add("id", private_key.pem_string)
+    return ["ssh-keygen", "-Y", "sign", "-f", private_key_file, "-n", namespace]
+
+def _verify_command(files: _KeygenFiles, signature: SSHSignature, public_key: SSHPublicKey) -> list[str]:
+    signature_file = files.add("signature.sig", signature.pem_string)
+
+    # Extract the key type and base64-encoded key
+    key_type = public_key.type
+    key_base64 = public_key.base64_string
+    identity = public_key.comment or "identity"
+    namespace = signature.namespace
+
+    # The public key in the allowed_signers format
+    allowed_signers_file = files.add("allowed_signers", f"{identity} {key_type} {key_base64}\n")
+
+    return ["ssh-keygen", "-Y", "verify", "-f", allowed_signers_file, "-n", namespace, "-s", signature_file, "-I", identity]
 
+def sign_message(message: bytes, private_key: SSHPrivateKey, namespace: str) -> SSHSignature:
+    with _KeygenFiles() as files:
         try:
-            # Write the private key to a temporary file
-            private_key_file = os.path.join(tmpdir, "id")
-            with open(private_key_file, "w") as f:
-                f.write(private_key.pem_string)
-
-            # Set appropriate permissions on the private key file
-            os.chmod(private_key_file, 0o600)
-
             # Run ssh-keygen to sign the message, passing the message via stdin
-            signature = run_command(["ssh-keygen", "-Y", "sign", "-f", private_key_file, "-n", namespace], stdin=message)
+            command = _sign_command(files, private_key, namespace)
+            signature = run_command(command, stdin=message, pass_fds=files.pass_fds)
             return SSHSignature.from_pem_string(signature.decode())
 
         except Exception as e:
             raise Exception(f"Failed to sign data: {str(e)}") from e
 
-        finally:
-            # Securely delete the temporary private key file
-            secure_delete(private_key_file)
+async def sign_message_async(message: bytes, private_key: SSHPrivateKey, namespace: str) -> SSHSignature:
+    """
+    Like `sign_message`, but runs `ssh-keygen` without blocking the event loop.
+    The key file is written and deleted on a worker thread.
+    """
+    files = _KeygenFiles()
+    try:
+        command = await asyncio.to_thread(_sign_command, files, private_key, namespace)
+        signature = await run_command_async(command, stdin=message, pass_fds=files.pass_fds)
+        return SSHSignature.from_pem_string(signature.decode())
+
+    except Exception as e:
+        raise Exception(f"Failed to sign data: {str(e)}") from e
+    finally:
+        await asyncio.to_thread(files.close)
 
 def verify_message(message: bytes, signature: SSHSignature, public_key: SSHPublicKey) -> bool:
-    with tempfile.TemporaryDirectory() as tmpdir:
-        signature_file = None
-        allowed_signers_file = None
+    with _KeygenFiles() as files:
+        command = _verify_command(files, signature, public_key)
 
+        # Run ssh-keygen to verify the signature, passing the message via stdin
         try:
-            # Write the signature to a temporary file
-            signature_file = os.path.join(tmpdir, "signature.sig")
-            with open(signature_file, "w") as f:
-                f.write(signature.pem_string)
-
-            # Extract the key type and base64-encoded key
-            key_type = public_key.type
-            key_base64 = public_key.base64_string
-            identity = public_key.comment or "identity"
-            namespace = signature.namespace
-
-            # Write the public key to a temporary file in the allowed_signers format
-            allowed_signers_file = os.path.join(tmpdir, "allowed_signers")
-            with open(allowed_signers_file, "w") as f:
-                f.write(f"{identity} {key_type} {key_base64}\n")
-
-            # Run ssh-keygen to verify the signature, passing the message via stdin
-            try:
-                run_command(["ssh-keygen", "-Y", "verify", "-f", allowed_signers_file, "-n", namespace, "-s", signature_file, "-I", identity], stdin=message)
-                return True
-            except:
-                return False
-
-        finally:
-            # Securely delete the temporary files
-            secure_delete(signature_file)
-            secure_delete(allowed_signers_file)
+            run_command(command, stdin=message, pass_fds=files.pass_fds)
+            return True
+        except:
+            return False
+
+async def verify_message_async(message: bytes, signature: SSHSignature, public_key: SSHPublicKey) -> bool:
+    """
+    Like `verify_message`, but runs `ssh-keygen` without blocking the event
+    loop. The signature and allowed_signers files are written and deleted on
+    a worker thread.
+    """
+    files = _KeygenFiles()
+    try:
+        command = await asyncio.to_thread(_verify_command, files, signature, public_key)
+        try:
+            await run_command_async(command, stdin=message, pass_fds=files.pass_fds)
+            return True
+        except Exception:
+            return False
+    finally:
+        await asyncio.to_thread(files.close)
 
 def extract_comment(object: str) -> str | None:
     object_file = None
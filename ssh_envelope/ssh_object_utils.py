@@ -1,91 +1,129 @@
+import binascii
 import logging
+from enum import Enum
 from getpass import getpass
 
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.serialization import load_ssh_private_key
-from cryptography.hazmat.primitives.serialization.ssh import SSHPrivateKeyTypes, SSHPublicKeyTypes;
+from cryptography.hazmat.primitives.serialization.ssh import SSHPublicKeyTypes
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
 
+from ssh_envelope.key_cache import DecryptedKeyCache, shared_cache
+from ssh_envelope.ssh_buffer import SSHReadBuffer
+from ssh_envelope.ssh_key_encryption import incorrect_password
+from ssh_envelope.ssh_key_type import SSHKeyType
 from ssh_envelope.ssh_keygen_utils import extract_comment
 from ssh_envelope.ssh_private_key import SSHPrivateKey
+from ssh_envelope.ssh_private_key import magic as private_key_magic, none as private_key_none, pem_header as private_key_pem_header, password_required as private_key_password_required
 from ssh_envelope.ssh_public_key import SSHPublicKey
 from ssh_envelope.ssh_signature import SSHSignature
+from ssh_envelope.ssh_signature import pem_header as signature_pem_header
 
 from . import logconfig
 __all__ = ['logconfig']
 
 logger = logging.getLogger(__name__)
 
-def import_ssh_object(string: str) -> SSHPrivateKey | SSHPublicKey | SSHSignature:
-    import_functions = [import_signature, import_public_key]
-
-    for import_func in import_functions:
-        try:
-            object = import_func(string)
-            return object
-        except Exception:
-            pass
+class SSHObjectKind(Enum):
+    SIGNATURE = "signature"
+    PUBLIC_KEY = "public-key"
+    PRIVATE_KEY = "private-key"
+    ENCRYPTED_PRIVATE_KEY = "encrypted-private-key"
+
+def classify_ssh_object(string: str) -> SSHObjectKind:
+    """
+    Determines what kind of SSH object a string holds from its PEM header or
+    key type prefix, without parsing it.
+
+    :raises ValueError: If the string is not a supported SSH object.
+    """
+    text = string.lstrip()
+    if text.startswith("-----BEGIN "):
+        end = text.find("-----", 11)
+        header = text[11:end] if end >= 0 else ""
+        if header == signature_pem_header:
+            return SSHObjectKind.SIGNATURE
+        if header == private_key_pem_header:
+            if _private_key_cipher(text, end + 5) in (None, private_key_none):
+                return SSHObjectKind.PRIVATE_KEY
+            return SSHObjectKind.ENCRYPTED_PRIVATE_KEY
+        raise ValueError(f"Unsupported PEM type: {header}")
+    type_string = text.split(None, 1)[0] if text else ""
+    try:
+        SSHKeyType.from_string(type_string)
+    except ValueError:
+        raise ValueError("Unrecognized SSH object") from None
+    return SSHObjectKind.PUBLIC_KEY
+
+def _private_key_cipher(text: str, body_start: int) -> str | None:
+    # The cipher name follows the magic at the start of the key, so decoding
+    # the first few lines of the body is enough. Returns None if the body
+    # can't be read this way, leaving the error to the full parse.
+    head = "".join(text[body_start:body_start + 128].split())
+    head = head[:head.find("-")] if "-" in head else head
+    head = head[:len(head) // 4 * 4]
+    try:
+        buf = SSHReadBuffer(binascii.a2b_base64(head))
+        if buf.read_null_terminated_string() != private_key_magic:
+            return None
+        return buf.read_length_prefixed_string()
+    except (binascii.Error, ValueError):
+        return None
 
-    object = import_private_key(string)
-    return object
-    # raise ValueError("Failed to import SSH object")
+def import_ssh_object(string: str) -> SSHPrivateKey | SSHPublicKey | SSHSignature:
+    """
+    Imports a signature, public key or private key, routing it straight to
+    the one parser for its kind. Comments embedded in keys are kept.
+
+    Encrypted private keys are decrypted once per process while the shared
+    key cache is enabled (see `key_cache`).
+
+    :raises ValueError: If the string is not a supported or valid SSH object.
+    """
+    kind = classify_ssh_object(string)
+    if kind == SSHObjectKind.SIGNATURE:
+        return import_signature(string)
+    elif kind == SSHObjectKind.PUBLIC_KEY:
+        return import_public_key(string)
+    elif kind == SSHObjectKind.PRIVATE_KEY:
+        return SSHPrivateKey.from_pem_string(string)
+    else:
+        cache = shared_cache()
+        if cache is not None:
+            return cache.get_or_decrypt(DecryptedKeyCache.key_id(string), lambda: import_private_key(string))
+        return import_private_key(string)
 
 def import_signature(string: str) -> SSHSignature:
     return SSHSignature.from_pem_string(string)
 
 def import_public_key(string: str) -> SSHPublicKey:
-    public_key = serialization.load_ssh_public_key(string.encode(), backend=default_backend())
-    # return SSHPublicKey.from_string(serialize_public_key(public_key))
     return SSHPublicKey.from_string(string)
 
 def import_private_key(string: str) -> SSHPrivateKey:
-    input_data = string.encode()
     max_attempts = 3
+    try:
+        logger.info("Attempting to load SSH key without password")
+        private_key = SSHPrivateKey.from_pem_string(string)
+        logger.info("SSH key loaded successfully without password")
+        return private_key
+    except ValueError as e:
+        if str(e) != private_key_password_required:
+            raise
+        logger.info("SSH key is password-protected, prompting for password")
     for attempt in range(1, max_attempts + 1):
+        logger.info(f"Attempt {attempt}/{max_attempts}: Prompting for password")
+        password = getpass("Enter the password for the SSH key: ")
         try:
-            if attempt == 1:
-                logger.info("Attempting to load SSH key without password")
-                private_key = load_private_key(input_data)
-                logger.info("SSH key loaded successfully without password")
-                return SSHPrivateKey.from_pem_string(string)
-            else:
-                logger.info(f"Attempt {attempt}/{max_attempts}: Prompting for password")
-                password = getpass("Enter the password for the SSH key: ").encode()
-                private_key = load_private_key(input_data, password=password)
-                logger.info("SSH key loaded successfully with password")
-                return SSHPrivateKey.from_pem_string(serialize_private_key(private_key))
+            private_key = SSHPrivateKey.from_pem_string(string, password)
+            logger.info("SSH key loaded successfully with password")
+            return private_key
         except ValueError as e:
-            if "SSH key is password-protected." in str(e):
-                logger.info("SSH key is password-protected, prompting for password")
-            elif "Incorrect password provided for the SSH key." in str(e):
-                logger.error(f"Incorrect password provided for the SSH key (attempt {attempt}/{max_attempts})")
-                if attempt == max_attempts:
-                    logger.error("Maximum password attempts reached.")
-                    raise ValueError("Failed to load SSH key: maximum password attempts reached.")
-            else:
+            if str(e) != incorrect_password:
                 raise
-    raise ValueError("Failed to load SSH key.")
-
-def load_private_key(private_key_data: bytes, password: bytes | None = None) -> SSHPrivateKeyTypes:
-    try:
-        private_key = load_ssh_private_key(private_key_data, password=password, backend=default_backend())
-        return private_key
-    except ValueError as e:
-        if 'key is password-protected' in str(e).lower():
-            raise ValueError("SSH key is password-protected.")
-        elif 'corrupt data: broken checksum' in str(e).lower():
-            raise ValueError("Incorrect password provided for the SSH key.")
-        else:
-            raise ValueError(f"Failed to decrypt the SSH key or unsupported key format: {str(e)}")
-
-def serialize_private_key(private_key: SSHPrivateKeyTypes) -> str:
-    pem = private_key.private_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PrivateFormat.OpenSSH,
-        encryption_algorithm=serialization.NoEncryption()
-    )
-    return pem.decode()
+            logger.error(f"Incorrect password provided for the SSH key (attempt {attempt}/{max_attempts})")
+    logger.error("Maximum password attempts reached.")
+    raise ValueError("Failed to load SSH key: maximum password attempts reached.")
 
 def serialize_public_key(public_key: SSHPublicKeyTypes) -> str:
     pem = public_key.public_bytes(
@@ -1,5 +1,6 @@
 from ssh_envelope.ssh_buffer import SSHReadBuffer, SSHWriteBuffer
 from ssh_envelope.pem import PEM
+from ssh_envelope.ssh_key_encryption import SSHKeyEncryption, incorrect_password
 from ssh_envelope.ssh_key_type import SSHKeyType
 from ssh_envelope.ssh_private_key_data import SSHPrivateKeyData
 from ssh_envelope.ssh_public_key import SSHPublicKey
@@ -10,8 +11,20 @@ from ssh_envelope.string_utils import compact_joined_key_values
 magic = "openssh-key-v1"
 none = "none"
 pem_header = "OPENSSH PRIVATE KEY"
+password_required = "OpenSSH private key: Password required"
 
 class SSHPrivateKey:
+    """
+    An OpenSSH private key, held decrypted.
+
+    The key material is fixed at construction; only the comment can change.
+    The PEM encoding and the public key are computed on first use and cached,
+    and the comment setter discards them. `pem` is always unencrypted; a key
+    read from an encrypted PEM keeps its encryption parameters and original
+    encrypted PEM for `encrypted_pem`.
+    """
+    __slots__ = ("_public_key_data", "_check_num", "_private_key_data", "_comment", "_type", "_pem", "_public_key", "_encryption", "_encrypted_pem")
+
     def __init__(self,
                  public_key_data: SSHPublicKeyData,
                  check_num: bytes,
@@ -23,9 +36,23 @@ class SSHPrivateKey:
         self._private_key_data = private_key_data
         self._comment = comment
         self._type = self._public_key_data.type
+        self._pem: PEM | None = None
+        self._public_key: SSHPublicKey | None = None
+        # Set when the key is read from an encrypted PEM.
+        self._encryption: SSHKeyEncryption | None = None
+        self._encrypted_pem: PEM | None = None
 
     @classmethod
-    def from_pem_string(cls, pem_string: str) -> "SSHPrivateKey":
+    def from_pem_string(cls, pem_string: str, password: bytes | str | None = None) -> "SSHPrivateKey":
+        """
+        Reads an OpenSSH private key, decrypting it if it is encrypted with a
+        supported cipher and the bcrypt KDF.
+
+        :param password: The password of an encrypted key. Ignored if the key
+            isn't encrypted.
+        :raises ValueError: If the key is invalid or unsupported, or is
+            encrypted and the password is missing or incorrect.
+        """
         pem = PEM.from_pem_string(pem_string)
         if not pem.header == pem_header:
             raise ValueError("Not an OpenSSH private key")
@@ -33,30 +60,49 @@ class SSHPrivateKey:
         if not buf.read_null_terminated_string() == magic:
             raise ValueError("OpenSSH private key: magic value mismatch")
         cipher_name = buf.read_length_prefixed_string()
-        if not cipher_name == none:
-            raise ValueError("OpenSSH private key: Unsupported cipher")
         kdf_name = buf.read_length_prefixed_string()
-        if not kdf_name == none:
-            raise ValueError("OpenSSH private key: Unsupported KDF")
-        kdf = buf.read_chunk()
-        if not kdf == b"":
-            raise ValueError("OpenSSH private key: Unsupported KDF")
+        kdf = buf.read_chunk_view()
+        encryption: SSHKeyEncryption | None = None
+        if cipher_name == none:
+            if not kdf_name == none or not len(kdf) == 0:
+                raise ValueError("OpenSSH private key: Unsupported KDF")
+        else:
+            encryption = SSHKeyEncryption.from_kdf(cipher_name, kdf_name, kdf)
         num_keys = buf.read_int()
         if num_keys != 1:
             raise ValueError("OpenSSH private key: Expected one key")
 
-        public_key_chunk = buf.read_chunk()
+        public_key_chunk = buf.read_chunk_view()
         pub_buf = SSHReadBuffer(public_key_chunk)
         public_key_data = parse_public_key_data(pub_buf)
         if not pub_buf.is_at_end:
             raise ValueError("OpenSSH private key: Extra data after public key")
 
-        private_key_chunk = buf.read_chunk()
+        private_key_chunk = buf.read_chunk_view()
+        if encryption is not None:
+            tag = buf.read(encryption.tag_length)
         if not buf.is_at_end:
             raise ValueError("OpenSSH private key: Extra data after private key")
+
+        if encryption is None:
+            return cls._from_private_section(private_key_chunk, public_key_data, 8)
+        if password is None:
+            raise ValueError(password_required)
+        decrypted = encryption.decrypt(password, private_key_chunk, tag)
+        try:
+            key = cls._from_private_section(memoryview(decrypted), public_key_data, encryption.block_size)
+        except ValueError as e:
+            # Without a tag, a wrong password only shows as garbage.
+            raise ValueError(incorrect_password) from e
+        key._encryption = encryption
+        key._encrypted_pem = pem
+        return key
+
+    @classmethod
+    def _from_private_section(cls, private_key_chunk: memoryview, public_key_data: SSHPublicKeyData, block_size: int) -> "SSHPrivateKey":
         priv_buf = SSHReadBuffer(private_key_chunk)
         check_num = priv_buf.read(4)
-        check_num_2 = priv_buf.read(4)
+        check_num_2 = priv_buf.read_view(4)
         if check_num != check_num_2:
             raise ValueError("OpenSSH private key: Check numbers do not match")
 
@@ -64,7 +110,7 @@ class SSHPrivateKey:
 
         comment = priv_buf.read_length_prefixed_string()
 
-        priv_buf.expect_padding()
+        priv_buf.expect_padding(block_size)
         if not priv_buf.is_at_end:
             raise ValueError("OpenSSH private key: Extra data after padding")
 
@@ -84,43 +130,92 @@ class SSHPrivateKey:
 
     def __eq__(self, other):
         if isinstance(other, SSHPrivateKey):
-            return self.pem == other.pem
+            return self is other or self.pem == other.pem
         return False
 
     def __hash__(self):
-        return hash(self.pem)
+        # Derived from the public key blob, so it is cheap and survives
+        # comment changes. Equal keys have equal public keys.
+        return hash(self.public_key_data.hash_image)
 
     @property
     def pem(self) -> PEM:
+        if self._pem is None:
+            self._pem = self._encode_pem()
+        return self._pem
+
+    def _encode_pem(self) -> PEM:
+        return self._encode(None, None)
+
+    def encrypted_pem(self, password: bytes | str | None = None, encryption: SSHKeyEncryption | None = None) -> PEM:
+        """
+        The key as an encrypted OpenSSH private key.
+
+        Without a password, this is the encrypted PEM the key was read from,
+        so re-exporting a decrypted key runs neither the KDF nor the cipher.
+        It is kept until the comment changes.
+
+        :param password: Encrypts the key with this password.
+        :param encryption: The cipher, salt and KDF rounds to encrypt with.
+            Defaults to the key's cipher and rounds, or `aes256-ctr` with 16
+            rounds, and always a fresh salt: reusing a salt with the same
+            password would reuse the cipher's key and IV.
+        :raises ValueError: If there is no password and the original
+            encrypted PEM is not available.
+        """
+        if password is None:
+            if self._encrypted_pem is None:
+                raise ValueError("A password is needed to encrypt the private key")
+            return self._encrypted_pem
+        if encryption is None:
+            if self._encryption is not None:
+                encryption = SSHKeyEncryption.generate(self._encryption.cipher_name, self._encryption.rounds)
+            else:
+                encryption = SSHKeyEncryption.generate()
+        return self._encode(encryption, password)
+
+    def _encode(self, encryption: SSHKeyEncryption | None, password: bytes | str | None) -> PEM:
         buf = SSHWriteBuffer()
         buf.write_null_terminated_string(magic)
-        buf.write_length_prefixed_string(none) # cipher_name
-        buf.write_length_prefixed_string(none) # kdf_name
-        buf.write_empty_chunk() # kdf
+        if encryption is None:
+            buf.write_length_prefixed_string(none) # cipher_name
+            buf.write_length_prefixed_string(none) # kdf_name
+            buf.write_empty_chunk() # kdf
+        else:
+            buf.write_length_prefixed_string(encryption.cipher_name)
+            buf.write_length_prefixed_string(encryption.kdf_name)
+            buf.write_chunk(encryption.kdf_options)
         buf.write_int(1) # num_keys
 
-        pub_buf = SSHWriteBuffer()
-        pub_buf.write_length_prefixed_string(str(self.type))
-        pub_buf.write_chunks(self.public_key_data.chunks)
-        buf.write_chunk(pub_buf.data)
-
-        priv_buf = SSHWriteBuffer()
-        priv_buf.write(self.check_num)
-        priv_buf.write(self.check_num)
-        priv_buf.write_length_prefixed_string(str(self.type))
-        if self.type in [SSHKeyType.DSA, SSHKeyType.ECDSA, SSHKeyType.ED25519]:
-            priv_buf.write_chunks(self.public_key_data.chunks)
-        elif self.type == SSHKeyType.RSA:
-            pass
+        with buf.nested_chunk():
+            buf.write_length_prefixed_string(str(self.type))
+            buf.write_chunks(self.public_key_data.chunks)
+
+        if encryption is None:
+            with buf.nested_chunk() as start:
+                self._write_private_section(buf)
+                buf.write_padding(start)
         else:
-            raise ValueError("Invalid key type")
-        priv_buf.write_chunks(self.private_key_data.chunks)
-        priv_buf.write_length_prefixed_string(self.comment or "")
-        priv_buf.write_padding()
-        buf.write_chunk(priv_buf.data)
+            assert password is not None
+            private_buf = SSHWriteBuffer()
+            self._write_private_section(private_buf)
+            private_buf.write_padding(block_size=encryption.block_size)
+            encrypted, tag = encryption.encrypt(password, private_buf.data)
+            buf.write_chunk(encrypted)
+            buf.write(tag)
 
         return PEM.from_header_and_data(pem_header, buf.data)
 
+    def _write_private_section(self, buf: SSHWriteBuffer):
+        buf.write(self.check_num)
+        buf.write(self.check_num)
+        buf.write_length_prefixed_string(str(self.type))
+        if self.type is not SSHKeyType.RSA:
+            # The RSA private part carries its own copy of the public values.
+            buf.write_chunks(self.public_key_data.chunks)
+        buf.write_chunks(self.private_key_data.chunks)
+        buf.write_length_prefixed_string(self.comment or "")
+
     @property
     def pem_string(self) -> str:
         return self.pem.pem_string
@@ -131,12 +226,25 @@ class SSHPrivateKey:
 
     @property
     def public_key(self) -> SSHPublicKey:
-        return SSHPublicKey(self.public_key_data, self.comment)
+        if self._public_key is None:
+            self._public_key = SSHPublicKey(self.public_key_data, self.comment)
+        return self._public_key
 
     @property
     def public_key_data(self) -> SSHPublicKeyData:
         return self._public_key_data
 
+    @property
+    def encryption(self) -> SSHKeyEncryption | None:
+        """
+        How the key was encrypted, if it was read from an encrypted PEM.
+        """
+        return self._encryption
+
+    @property
+    def is_encrypted(self) -> bool:
+        return self._encryption is not None
+
     @property
     def check_num(self) -> bytes:
         return self._check_num
@@ -160,6 +268,9 @@ class SSHPrivateKey:
     @comment.setter
     def comment(self, value: str):
         self._comment = value
+        self._pem = None
+        self._public_key = None
+        self._encrypted_pem = None
 
     @property
     def type_name(self) -> str:
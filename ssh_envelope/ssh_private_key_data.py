@@ -1,73 +1,120 @@
-from typing import List
+from typing import Callable, List, NamedTuple
 from ssh_envelope.ssh_buffer import SSHReadBuffer
-from ssh_envelope.ssh_key_type import ECDSAType, SSHKeyType
+from ssh_envelope.ssh_key_type import SSHKeyType
 from ssh_envelope.ssh_utils import parse_public_key_data
 from ssh_envelope.ssh_public_key_data import SSHPublicKeyData
 
 class SSHPrivateKeyData:
+    __slots__ = ("type", "data")
+
     def __init__(self, buf: SSHReadBuffer, key_type: SSHKeyType, public_key_data: SSHPublicKeyData):
-        self.type = key_type
-        if key_type == SSHKeyType.RSA:
-            type_string = buf.read_length_prefixed_string()
-            if type_string != str(key_type):
-                raise ValueError("Invalid key type")
-            modulus = buf.read_chunk()
-            public_exponent = buf.read_chunk()
-            private_exponent = buf.read_chunk()
-            prime1 = buf.read_chunk()
-            prime2 = buf.read_chunk()
-            coefficient = buf.read_chunk()
-            self.data = [modulus, public_exponent, private_exponent, prime1, prime2, coefficient]
-        elif key_type == SSHKeyType.DSA:
-            public_key_data_2 = parse_public_key_data(buf, key_type)
-            if public_key_data != public_key_data_2:
-                raise ValueError("OpenSSH private key: Public key mismatch")
-            x = buf.read_chunk()
-            self.data = [x]
-        elif key_type == SSHKeyType.ECDSA:
-            public_key_data_2 = parse_public_key_data(buf, key_type)
-            if public_key_data != public_key_data_2:
-                raise ValueError("OpenSSH private key: Public key mismatch")
-            data = buf.read_chunk()
-            self.data = [data]
-        elif key_type == SSHKeyType.ED25519:
-            public_key_data_2 = parse_public_key_data(buf, key_type)
-            if public_key_data != public_key_data_2:
-                raise ValueError("OpenSSH private key: Public key mismatch")
-            data = buf.read_chunk()
-            if len(data) != 64:
-                raise ValueError("Invalid key length")
-            private_key = data[:32]
-            public_key = data[32:]
-            self.data = [private_key, public_key]
-        else:
+        format = _formats.get(key_type)
+        if format is None:
             raise ValueError("Invalid key type")
+        self.type = key_type
+        self.data = format.read(buf, key_type, public_key_data)
 
     @property
     def chunks(self) -> List[bytes]:
-        if self.type in [SSHKeyType.RSA, SSHKeyType.DSA]:
-            return self.data
-        elif self.type == SSHKeyType.ED25519:
-            return [self.data[0] + self.data[1]]
-        elif self.type == SSHKeyType.ECDSA:
-            return self.data
-        else:
-            raise ValueError("Invalid key type")
+        return _formats[self.type].chunks(self)
 
     def __str__(self) -> str:
-        if self.type == SSHKeyType.RSA:
-            modulus, public_exponent, private_exponent, prime1, prime2, coefficient = self.data
-            return f"(modulus: {modulus.hex()}, public_exponent: {public_exponent.hex()}, private_exponent: {private_exponent.hex()}, prime1: {prime1.hex()}, prime2: {prime2.hex()}, coefficient: {coefficient.hex()})"
-        elif self.type == SSHKeyType.DSA:
-            return self.data[0].hex()
-        elif self.type == SSHKeyType.ECDSA:
-            return self.data[0].hex()
-        elif self.type == SSHKeyType.ED25519:
-            return (self.data[0] + self.data[1]).hex()
-        else:
-            raise ValueError("Invalid key type")
+        return _formats[self.type].describe(self)
 
     def __eq__(self, other):
         if isinstance(other, SSHPrivateKeyData):
-            return self.type == other.type and self.data == other.data
+            return self.type is other.type and self.data == other.data
         return False
+
+
+# The private key values of each algorithm, in wire order.
+
+class RSAPrivateFields(NamedTuple):
+    modulus: bytes
+    public_exponent: bytes
+    private_exponent: bytes
+    # OpenSSH stores the CRT coefficient before the primes.
+    iqmp: bytes
+    p: bytes
+    q: bytes
+
+class DSAPrivateFields(NamedTuple):
+    x: bytes
+
+class ECDSAPrivateFields(NamedTuple):
+    d: bytes
+
+class Ed25519PrivateFields(NamedTuple):
+    private_key: bytes
+    public_key: bytes
+
+
+class _Format:
+    """
+    How the private part of one key type is laid out in an OpenSSH private
+    key.
+    """
+    def __init__(self,
+                 read: Callable[[SSHReadBuffer, SSHKeyType, SSHPublicKeyData], tuple],
+                 chunks: Callable[[SSHPrivateKeyData], List[bytes]],
+                 describe: Callable[[SSHPrivateKeyData], str],
+                 ):
+        self.read = read
+        self.chunks = chunks
+        self.describe = describe
+
+def _check_public_key(buf: SSHReadBuffer, key_type: SSHKeyType, public_key_data: SSHPublicKeyData):
+    if public_key_data != parse_public_key_data(buf, key_type):
+        raise ValueError("OpenSSH private key: Public key mismatch")
+
+def _read_rsa(buf: SSHReadBuffer, key_type: SSHKeyType, _: SSHPublicKeyData) -> RSAPrivateFields:
+    type_string = buf.read_length_prefixed_string()
+    if type_string != str(key_type):
+        raise ValueError("Invalid key type")
+    return RSAPrivateFields(*(buf.read_chunk() for _ in range(len(RSAPrivateFields._fields))))
+
+def _read_scalar(fields: type[tuple]) -> Callable[[SSHReadBuffer, SSHKeyType, SSHPublicKeyData], tuple]:
+    def read(buf: SSHReadBuffer, key_type: SSHKeyType, public_key_data: SSHPublicKeyData) -> tuple:
+        _check_public_key(buf, key_type, public_key_data)
+        return fields(buf.read_chunk())
+    return read
+
+def _read_ed25519(buf: SSHReadBuffer, key_type: SSHKeyType, public_key_data: SSHPublicKeyData) -> Ed25519PrivateFields:
+    _check_public_key(buf, key_type, public_key_data)
+    data = buf.read_chunk_view()
+    if len(data) != 64:
+        raise ValueError("Invalid key length")
+    private_key = bytes(data[:32])
+    public_key = bytes(data[32:])
+    return Ed25519PrivateFields(private_key, public_key)
+
+def _describe_rsa(key: SSHPrivateKeyData) -> str:
+    data: RSAPrivateFields = key.data
+    return f"(modulus: {data.modulus.hex()}, public_exponent: {data.public_exponent.hex()}, private_exponent: {data.private_exponent.hex()}, iqmp: {data.iqmp.hex()}, p: {data.p.hex()}, q: {data.q.hex()})"
+
+def _scalar_format(fields: type[tuple]) -> _Format:
+    return _Format(
+        _read_scalar(fields),
+        lambda key: list(key.data),
+        lambda key: key.data[0].hex(),
+    )
+
+_ecdsa_format = _scalar_format(ECDSAPrivateFields)
+
+# Dispatch table, one entry per concrete key type.
+_formats: dict[SSHKeyType, _Format] = {
+    SSHKeyType.RSA: _Format(
+        _read_rsa,
+        lambda key: list(key.data),
+        _describe_rsa,
+    ),
+    SSHKeyType.DSA: _scalar_format(DSAPrivateFields),
+    SSHKeyType.ED25519: _Format(
+        _read_ed25519,
+        lambda key: [key.data.private_key + key.data.public_key],
+        lambda key: (key.data.private_key + key.data.public_key).hex(),
+    ),
+    SSHKeyType.ECDSA_NISTP256: _ecdsa_format,
+    SSHKeyType.ECDSA_NISTP384: _ecdsa_format,
+    SSHKeyType.ECDSA_NISTP521: _ecdsa_format,
+}
@@ -1,6 +1,6 @@
 import base64
 from typing import List
-from ssh_envelope.ssh_buffer import SSHReadBuffer, SSHWriteBuffer
+from ssh_envelope.ssh_buffer import SSHReadBuffer
 from ssh_envelope.ssh_hash import SSHHash
 from ssh_envelope.ssh_key_type import SSHKeyType
 from ssh_envelope.ssh_public_key_data import SSHPublicKeyData
@@ -8,6 +8,15 @@ from ssh_envelope.ssh_utils import check_comment, parse_public_key_data
 from ssh_envelope.string_utils import compact_joined, compact_joined_key_values
 
 class SSHPublicKey:
+    """
+    An OpenSSH public key.
+
+    The key data is fixed at construction; only the comment can change.
+    Derived values are computed on first use and cached, and the comment
+    setter discards those that depend on the comment.
+    """
+    __slots__ = ("_key_data", "_comment", "_base64_string", "_fingerprint", "_key_size", "_string")
+
     def __init__(self,
                  key_data: SSHPublicKeyData,
                  comment: str
@@ -15,6 +24,10 @@ class SSHPublicKey:
         check_comment(comment)
         self._key_data = key_data
         self._comment = comment
+        self._base64_string: str | None = None
+        self._fingerprint: str | None = None
+        self._key_size: int | None = None
+        self._string: str | None = None
 
     @classmethod
     def from_string(cls, value: str) -> "SSHPublicKey":
@@ -46,7 +59,9 @@ class SSHPublicKey:
         return False
 
     def __hash__(self):
-        return hash(repr(self))
+        # Keys that differ only by comment share a hash, which is consistent
+        # with equality and avoids hashing the comment.
+        return hash(self.key_data.hash_image)
 
     def hash(self, algorithm: SSHHash.Algorithm = SSHHash.Algorithm.SHA256) -> SSHHash:
         return self.key_data.hash(algorithm)
@@ -65,24 +80,32 @@ class SSHPublicKey:
 
     @property
     def base64_string(self):
-        data = SSHWriteBuffer.chunks_to_data(self.chunks)
-        return base64.b64encode(data).decode()
+        if self._base64_string is None:
+            # The wire format of the chunks is the key blob.
+            self._base64_string = base64.b64encode(self.key_data.hash_image).decode()
+        return self._base64_string
 
     @property
     def string(self):
-        return compact_joined([
-            str(self.type),
-            self.base64_string,
-            self.comment
-        ], separator=' ')
+        if self._string is None:
+            self._string = compact_joined([
+                str(self.type),
+                self.base64_string,
+                self.comment
+            ], separator=' ')
+        return self._string
 
     @property
     def key_size(self) -> int:
-        return self.key_data.key_size
+        if self._key_size is None:
+            self._key_size = self.key_data.key_size
+        return self._key_size
 
     @property
     def fingerprint(self) -> str:
-        return str(self.hash())
+        if self._fingerprint is None:
+            self._fingerprint = str(self.hash())
+        return self._fingerprint
 
     @property
     def comment(self) -> str:
@@ -91,6 +114,7 @@ class SSHPublicKey:
     @comment.setter
     def comment(self, value: str):
         self._comment = value
+        self._string = None
 
     @property
     def type_name(self) -> str:
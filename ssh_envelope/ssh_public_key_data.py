@@ -1,91 +1,158 @@
-from typing import List
+from typing import Callable, List, NamedTuple
 from ssh_envelope.ssh_buffer import SSHReadBuffer, SSHWriteBuffer
 from ssh_envelope.ssh_hash import SSHHash
-from ssh_envelope.ssh_key_type import ECDSAType, SSHKeyType
+from ssh_envelope.ssh_key_type import SSHKeyType
 
 class SSHPublicKeyData:
+    __slots__ = ("type", "data", "_hash_image")
+
     def __init__(self,
                  buf: SSHReadBuffer,
                  key_type: SSHKeyType
                  ):
+        format = _formats.get(key_type)
+        if format is None:
+            raise ValueError("Invalid key type")
         self.type = key_type
-        if key_type == SSHKeyType.RSA:
-            public_exponent = buf.read_chunk()
-            modulus = buf.read_chunk()
-            self.data = [public_exponent, modulus]
-        elif key_type == SSHKeyType.DSA:
-            p = buf.read_chunk()
-            q = buf.read_chunk()
-            g = buf.read_chunk()
-            y = buf.read_chunk()
-            self.data = [p, q, g, y]
-        elif key_type == SSHKeyType.ECDSA:
-            type_string = buf.read_length_prefixed_string()
-            subtype = ECDSAType.from_string(type_string)
-            if not subtype or subtype != key_type.subtype:
-                raise ValueError("Invalid ECDSA type")
-            data = buf.read_chunk()
-            self.data = [data]
-        elif key_type == SSHKeyType.ED25519:
-            data = buf.read_chunk()
-            self.data = [data]
-        else:
+        self._hash_image: bytes | None = None
+        self.data = format.read(buf, key_type)
+
+    @classmethod
+    def from_blob(cls, blob: bytes, check_type: SSHKeyType | None = None) -> "SSHPublicKeyData":
+        """
+        Parses a public key blob in SSH wire format. The blob is kept as the
+        key's `hash_image`, so it isn't encoded again.
+
+        :raises ValueError: If the blob is malformed or not of `check_type`.
+        """
+        buf = SSHReadBuffer(blob)
+        key_type = SSHKeyType.from_string(buf.read_length_prefixed_string())
+        if check_type is not None and key_type is not check_type:
             raise ValueError("Invalid key type")
+        key_data = cls(buf, key_type)
+        if not buf.is_at_end:
+            raise ValueError("Extra data after public key")
+        key_data._hash_image = bytes(blob)
+        return key_data
 
     @property
     def chunks(self) -> List[bytes]:
-        if self.type in [SSHKeyType.RSA, SSHKeyType.DSA, SSHKeyType.ED25519]:
-            return self.data
-        elif self.type == SSHKeyType.ECDSA:
-            return [str(self.type.subtype).encode(), self.data[0]]
-            # return self.data
-        else:
-            raise ValueError("Invalid key type")
+        return _formats[self.type].chunks(self)
 
     def __eq__(self, other):
         if isinstance(other, SSHPublicKeyData):
-            return self.type == other.type and self.data == other.data
+            return self.type is other.type and self.data == other.data
         return False
 
+    def __hash__(self):
+        return hash(self.hash_image)
+
     def __str__(self) -> str:
-        if self.type == SSHKeyType.RSA:
-            public_exponent, modulus = self.data
-            return f"(public_exponent: {public_exponent.hex()}, modulus: {modulus.hex()})"
-        elif self.type == SSHKeyType.DSA:
-            p, q, g, y = self.data
-            return f"(p: {p.hex()}, q: {q.hex()}, g: {g.hex()}, y: {y.hex()})"
-        elif self.type in [SSHKeyType.ECDSA, SSHKeyType.ED25519]:
-            return self.data[0].hex()
-        else:
-            raise ValueError("Invalid key type")
+        return _formats[self.type].describe(self)
 
     @property
     def hash_image(self) -> bytes:
-        buf = SSHWriteBuffer()
-        buf.write_length_prefixed_string(str(self.type))
-        if self.type in [SSHKeyType.RSA, SSHKeyType.DSA, SSHKeyType.ED25519]:
-            buf.write_chunks(self.data)
-        elif self.type == SSHKeyType.ECDSA:
-            buf.write_length_prefixed_string(str(self.type.subtype))
-            buf.write_chunks(self.data)
-        return buf.data
+        """
+        The public key blob in SSH wire format. Computed once.
+        """
+        if self._hash_image is None:
+            buf = SSHWriteBuffer()
+            buf.write_length_prefixed_string(str(self.type))
+            buf.write_chunks(self.chunks)
+            self._hash_image = buf.data
+        return self._hash_image
 
     def hash(self, algorithm = SSHHash.Algorithm.SHA256) -> SSHHash:
         return SSHHash.from_hash_image(self.hash_image, algorithm)
 
     @property
     def key_size(self) -> int:
-        if self.type == SSHKeyType.RSA:
-            modulus = self.data[1]
-            count = len(modulus) if len(modulus) % 2 == 0 else len(modulus) - 1
-            return count * 8
-        elif self.type == SSHKeyType.DSA:
-            p = self.data[0]
-            count = len(p) if len(p) % 2 == 0 else len(p) - 1
-            return count * 8
-        elif self.type == SSHKeyType.ED25519:
-            return 32 * 8
-        elif self.type == SSHKeyType.ECDSA:
-            return self.type.subtype.key_size
-        else:
-            raise ValueError("Invalid key type")
+        return _formats[self.type].key_size(self)
+
+
+# The public key values of each algorithm, in wire order.
+
+class RSAPublicFields(NamedTuple):
+    public_exponent: bytes
+    modulus: bytes
+
+class DSAPublicFields(NamedTuple):
+    p: bytes
+    q: bytes
+    g: bytes
+    y: bytes
+
+class ECDSAPublicFields(NamedTuple):
+    q: bytes
+
+class Ed25519PublicFields(NamedTuple):
+    public_key: bytes
+
+
+class _Format:
+    """
+    How the public key of one key type is laid out in SSH wire format.
+    """
+    def __init__(self,
+                 read: Callable[[SSHReadBuffer, SSHKeyType], tuple],
+                 chunks: Callable[[SSHPublicKeyData], List[bytes]],
+                 describe: Callable[[SSHPublicKeyData], str],
+                 key_size: Callable[[SSHPublicKeyData], int],
+                 ):
+        self.read = read
+        self.chunks = chunks
+        self.describe = describe
+        self.key_size = key_size
+
+def _read_fields(fields: type[tuple]) -> Callable[[SSHReadBuffer, SSHKeyType], tuple]:
+    count = len(fields._fields) # type: ignore
+    return lambda buf, _: fields(*(buf.read_chunk() for _ in range(count)))
+
+def _read_ecdsa(buf: SSHReadBuffer, key_type: SSHKeyType) -> "ECDSAPublicFields":
+    if buf.read_length_prefixed_string() != str(key_type.subtype):
+        raise ValueError("Invalid ECDSA type")
+    return ECDSAPublicFields(buf.read_chunk())
+
+def _integer_size(value: bytes) -> int:
+    count = len(value) if len(value) % 2 == 0 else len(value) - 1
+    return count * 8
+
+def _describe_rsa(key: SSHPublicKeyData) -> str:
+    data: RSAPublicFields = key.data
+    return f"(public_exponent: {data.public_exponent.hex()}, modulus: {data.modulus.hex()})"
+
+def _describe_dsa(key: SSHPublicKeyData) -> str:
+    data: DSAPublicFields = key.data
+    return f"(p: {data.p.hex()}, q: {data.q.hex()}, g: {data.g.hex()}, y: {data.y.hex()})"
+
+_ecdsa_format = _Format(
+    _read_ecdsa,
+    lambda key: [str(key.type.subtype).encode(), key.data.q],
+    lambda key: key.data.q.hex(),
+    lambda key: key.type.subtype.key_size,
+)
+
+# Dispatch table, one entry per concrete key type.
+_formats: dict[SSHKeyType, _Format] = {
+    SSHKeyType.RSA: _Format(
+        _read_fields(RSAPublicFields),
+        lambda key: list(key.data),
+        _describe_rsa,
+        lambda key: _integer_size(key.data.modulus),
+    ),
+    SSHKeyType.DSA: _Format(
+        _read_fields(DSAPublicFields),
+        lambda key: list(key.data),
+        _describe_dsa,
+        lambda key: _integer_size(key.data.p),
+    ),
+    SSHKeyType.ED25519: _Format(
+        _read_fields(Ed25519PublicFields),
+        lambda key: list(key.data),
+        lambda key: key.data.public_key.hex(),
+        lambda _: 32 * 8,
+    ),
+    SSHKeyType.ECDSA_NISTP256: _ecdsa_format,
+    SSHKeyType.ECDSA_NISTP384: _ecdsa_format,
+    SSHKeyType.ECDSA_NISTP521: _ecdsa_format,
+}
@@ -7,18 +7,24 @@ from ssh_envelope.ssh_utils import parse_public_key_data
 
 pem_header = "SSH SIGNATURE"
 magic = "SSHSIG".encode()
+rsa_signature_types = ["rsa-sha2-512", "rsa-sha2-256", "ssh-rsa"]
 
 class SSHSignature:
+    __slots__ = ("_public_key_data", "_namespace", "_hash_algorithm", "_data", "_signature_type", "_pem")
+
     def __init__(self,
                  public_key_data: SSHPublicKeyData,
                  namespace: str,
                  hash_algorithm: SSHHash.Algorithm,
                  data: bytes,
+                 signature_type: str | None = None,
                  ):
         self._public_key_data = public_key_data
         self._namespace = namespace
         self._hash_algorithm = hash_algorithm
         self._data = data
+        self._signature_type = signature_type or str(public_key_data.type)
+        self._pem: PEM | None = None
 
     @classmethod
     def from_pem_string(cls, value: str) -> "SSHSignature":
@@ -26,46 +32,49 @@ class SSHSignature:
         if not pem.header == pem_header:
             raise ValueError("Not an OpenSSH signature")
         buf = SSHReadBuffer(pem.data)
-        if not buf.read(len(magic)) == magic:
+        if not buf.read_view(len(magic)) == magic:
             raise ValueError("OpenSSH signature: magic value mismatch")
         version = buf.read_int()
         if version != 1:
             raise ValueError("OpenSSH signature: Unsupported version")
-        public_key_chunk = buf.read_chunk()
+        public_key_chunk = buf.read_chunk_view()
         pub_buf = SSHReadBuffer(public_key_chunk)
         public_key_data = parse_public_key_data(pub_buf)
         if not pub_buf.is_at_end:
             raise ValueError("OpenSSH signature: Extra data after public key")
         namespace = buf.read_length_prefixed_string()
-        reserved = buf.read_chunk()
+        reserved = buf.read_chunk_view()
         if not len(reserved) == 0:
             raise ValueError("OpenSSH signature: Reserved field not empty")
 
         hash_algorithm_string = buf.read_length_prefixed_string()
         hash_algorithm = SSHHash.Algorithm.from_string(hash_algorithm_string)
 
-        sig_chunk = buf.read_chunk()
+        sig_chunk = buf.read_chunk_view()
         sig_buf = SSHReadBuffer(sig_chunk)
-        sig_key_type_string = sig_buf.read_length_prefixed_string()
-        sig_key_type = SSHKeyType.from_string(sig_key_type_string)
-        if sig_key_type != public_key_data.type:
+        signature_type = sig_buf.read_length_prefixed_string()
+        if public_key_data.type is SSHKeyType.RSA:
+            if signature_type not in rsa_signature_types:
+                raise ValueError("OpenSSH signature: Signature key type mismatch")
+        elif signature_type != str(public_key_data.type):
             raise ValueError("OpenSSH signature: Signature key type mismatch")
         data = sig_buf.read_chunk()
         if not sig_buf.is_at_end:
             raise ValueError("OpenSSH signature: Extra data after signature")
 
-        return cls(public_key_data, namespace, hash_algorithm, data)
+        return cls(public_key_data, namespace, hash_algorithm, data, signature_type)
 
     def __repr__(self):
         return self.pem_string
 
     def __eq__(self, other):
         if isinstance(other, SSHSignature):
-            return self.pem == other.pem
+            return self is other or self.pem == other.pem
         return False
 
     def __hash__(self):
-        return hash(self.pem)
+        # The signature blob alone; equal signatures have equal blobs.
+        return hash(self.data)
 
     @property
     def public_key_data(self) -> SSHPublicKeyData:
@@ -87,17 +96,28 @@ class SSHSignature:
     def data(self) -> bytes:
         return self._data
 
+    @property
+    def signature_type(self) -> str:
+        """
+        The signature algorithm name, e.g. `ssh-ed25519` or `rsa-sha2-512`.
+        """
+        return self._signature_type
+
     @property
     def pem(self) -> PEM:
+        if self._pem is None:
+            self._pem = self._encode_pem()
+        return self._pem
+
+    def _encode_pem(self) -> PEM:
         buf = SSHWriteBuffer()
         buf.write(magic)
 
         buf.write_int(1) # version
 
-        pub_buf = SSHWriteBuffer()
-        pub_buf.write_length_prefixed_string(str(self.public_key_data.type))
-        pub_buf.write_chunks(self.public_key_data.chunks)
-        buf.write_chunk(pub_buf.data)
+        with buf.nested_chunk():
+            buf.write_length_prefixed_string(str(self.public_key_data.type))
+            buf.write_chunks(self.public_key_data.chunks)
 
         buf.write_length_prefixed_string(self.namespace)
 
@@ -105,10 +125,9 @@ class SSHSignature:
 
         buf.write_length_prefixed_string(str(self.hash_algorithm).lower())
 
-        sig_buf = SSHWriteBuffer()
-        sig_buf.write_length_prefixed_string(str(self.public_key_data.type))
-        sig_buf.write_chunk(self.data)
-        buf.write_chunk(sig_buf.data)
+        with buf.nested_chunk():
+            buf.write_length_prefixed_string(self.signature_type)
+            buf.write_chunk(self.data)
 
         return PEM.from_header_and_data(pem_header, buf.data)
 
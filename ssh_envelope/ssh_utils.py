@@ -1,3 +1,4 @@
+import re
 
 from ssh_envelope.ssh_buffer import SSHReadBuffer
 from ssh_envelope.ssh_key_type import SSHKeyType
@@ -12,6 +13,8 @@ def parse_public_key_data(buf: SSHReadBuffer, check_type: SSHKeyType | None = No
     key_type = SSHKeyType.from_string(type_string)
     return SSHPublicKeyData(buf, key_type)
 
+_whitespace = re.compile(r"\s")
+
 def check_comment(comment: str):
-    if any([c.isspace() for c in comment]):
+    if _whitespace.search(comment):
             raise ValueError("Comment may not contain whitespace.")
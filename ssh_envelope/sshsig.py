@@ -0,0 +1,141 @@
+from hashlib import sha256, sha512
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, padding, rsa
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature, encode_dss_signature
+from cryptography.hazmat.primitives.serialization import load_ssh_private_key, load_ssh_public_key
+
+from ssh_envelope.ssh_buffer import SSHReadBuffer, SSHWriteBuffer
+from ssh_envelope.ssh_hash import SSHHash
+from ssh_envelope.ssh_key_type import ECDSAType, SSHKeyType
+from ssh_envelope.ssh_private_key import SSHPrivateKey
+from ssh_envelope.ssh_public_key import SSHPublicKey
+from ssh_envelope.ssh_signature import SSHSignature, magic
+
+# In-process implementation of the OpenSSH SSHSIG signature format, as
+# produced and consumed by `ssh-keygen -Y sign` and `ssh-keygen -Y verify`.
+# See PROTOCOL.sshsig in the OpenSSH sources.
+
+default_rsa_signature_type = "rsa-sha2-512"
+
+rsa_signature_hashes = {
+    "rsa-sha2-256": hashes.SHA256,
+    "rsa-sha2-512": hashes.SHA512,
+}
+
+# Keyed by curve name, giving the SSH signature type and its hash.
+ecdsa_signature_types = {
+    ec.SECP256R1.name: (f"ecdsa-sha2-{ECDSAType.NISTP256}", hashes.SHA256),
+    ec.SECP384R1.name: (f"ecdsa-sha2-{ECDSAType.NISTP384}", hashes.SHA384),
+    ec.SECP521R1.name: (f"ecdsa-sha2-{ECDSAType.NISTP521}", hashes.SHA512),
+}
+
+def signed_data(message: bytes, namespace: str, hash_algorithm: SSHHash.Algorithm = SSHHash.Algorithm.SHA512) -> bytes:
+    """
+    Returns the to-be-signed SSHSIG blob for the message.
+    """
+    if hash_algorithm == SSHHash.Algorithm.SHA256:
+        message_hash = sha256(message).digest()
+    elif hash_algorithm == SSHHash.Algorithm.SHA512:
+        message_hash = sha512(message).digest()
+    else:
+        raise ValueError("Unsupported SSHSIG hash algorithm")
+    buf = SSHWriteBuffer()
+    buf.write(magic)
+    buf.write_length_prefixed_string(namespace)
+    buf.write_empty_chunk() # reserved
+    buf.write_length_prefixed_string(str(hash_algorithm).lower())
+    buf.write_chunk(message_hash)
+    return buf.data
+
+def sign_message(message: bytes,
+                 private_key: SSHPrivateKey,
+                 namespace: str,
+                 hash_algorithm: SSHHash.Algorithm = SSHHash.Algorithm.SHA512,
+                 ) -> SSHSignature:
+    """
+    Signs the message with the private key, without invoking `ssh-keygen`.
+
+    Supports Ed25519, ECDSA (nistp256, nistp384, nistp521), and RSA keys. RSA
+    signatures use `rsa-sha2-512`, as `ssh-keygen` does.
+
+    :raises ValueError: If the key type is not supported.
+    """
+    data = signed_data(message, namespace, hash_algorithm)
+    signature_type, signature_data = sign_data(data, private_key)
+    return SSHSignature(private_key.public_key_data, namespace, hash_algorithm, signature_data, signature_type)
+
+def sign_data(data: bytes, private_key: SSHPrivateKey, rsa_signature_type: str = default_rsa_signature_type) -> tuple[str, bytes]:
+    """
+    Signs raw data with the private key.
+
+    Returns a tuple of the SSH signature type and the signature blob in SSH
+    wire format.
+
+    :param rsa_signature_type: The signature type to use for RSA keys.
+    :raises ValueError: If the key type or RSA signature type is not supported.
+    """
+    key = load_ssh_private_key(private_key.pem_string.encode(), password=None)
+    if isinstance(key, ed25519.Ed25519PrivateKey):
+        return str(SSHKeyType.ED25519), key.sign(data)
+    elif isinstance(key, ec.EllipticCurvePrivateKey):
+        signature_type, hash_type = ecdsa_signature_types[key.curve.name]
+        r, s = decode_dss_signature(key.sign(data, ec.ECDSA(hash_type())))
+        buf = SSHWriteBuffer()
+        buf.write_mpint(r)
+        buf.write_mpint(s)
+        return signature_type, buf.data
+    elif isinstance(key, rsa.RSAPrivateKey):
+        if rsa_signature_type not in rsa_signature_hashes:
+            raise ValueError("Unsupported RSA signature type")
+        hash_type = rsa_signature_hashes[rsa_signature_type]
+        return rsa_signature_type, key.sign(data, padding.PKCS1v15(), hash_type())
+    else:
+        raise ValueError("Unsupported key type for SSHSIG")
+
+def verify_message(message: bytes, signature: SSHSignature, public_key: SSHPublicKey) -> bool:
+    """
+    Verifies an SSHSIG signature over the message, without invoking
+    `ssh-keygen`.
+
+    The signature's embedded public key must be the given public key, and the
+    signature is checked in the signature's own namespace.
+    """
+    if signature.public_key_data != public_key.key_data:
+        return False
+    try:
+        data = signed_data(message, signature.namespace, signature.hash_algorithm)
+    except ValueError:
+        return False
+    return verify_data(data, signature.signature_type, signature.data, public_key)
+
+def verify_data(data: bytes, signature_type: str, signature_data: bytes, public_key: SSHPublicKey) -> bool:
+    """
+    Verifies a signature blob in SSH wire format over raw data.
+    """
+    key = load_ssh_public_key(f"{public_key.type} {public_key.base64_string}".encode())
+    try:
+        if isinstance(key, ed25519.Ed25519PublicKey):
+            if signature_type != str(SSHKeyType.ED25519):
+                return False
+            key.verify(signature_data, data)
+        elif isinstance(key, ec.EllipticCurvePublicKey):
+            expected_signature_type, hash_type = ecdsa_signature_types[key.curve.name]
+            if signature_type != expected_signature_type:
+                return False
+            buf = SSHReadBuffer(signature_data)
+            r = buf.read_mpint()
+            s = buf.read_mpint()
+            if not buf.is_at_end:
+                return False
+            key.verify(encode_dss_signature(r, s), data, ec.ECDSA(hash_type()))
+        elif isinstance(key, rsa.RSAPublicKey):
+            if signature_type not in rsa_signature_hashes:
+                return False
+            key.verify(signature_data, data, padding.PKCS1v15(), rsa_signature_hashes[signature_type]())
+        else:
+            return False
+    except (InvalidSignature, ValueError):
+        return False
+    return True
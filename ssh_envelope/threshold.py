@@ -0,0 +1,69 @@
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from ssh_envelope.keyring import Keyring
+from ssh_envelope.ssh_public_key import SSHPublicKey
+from ssh_envelope.ssh_signature import SSHSignature
+from ssh_envelope.sshsig import verify_message
+
+def verify_threshold(message: bytes,
+                     signatures: list[SSHSignature],
+                     keyring: Keyring,
+                     threshold: int,
+                     max_workers: int | None = None,
+                     ) -> list[SSHPublicKey]:
+    """
+    Checks whether at least `threshold` distinct keys on the keyring have
+    validly signed the message.
+
+    Each signature is paired with its signer on the keyring, and the checks
+    run concurrently. As soon as the threshold is reached, or can no longer be
+    reached with the checks still outstanding, the remaining checks are
+    cancelled.
+
+    :param message: The signed message.
+    :param signatures: The candidate signatures.
+    :param keyring: The trusted signers.
+    :param threshold: The number of distinct signers required.
+    :param max_workers: The maximum number of concurrent checks.
+    :return: The signers found to be valid. The threshold is met if and only
+        if at least `threshold` signers are returned.
+    :raises ValueError: If the threshold is less than 1.
+    """
+    if threshold < 1:
+        raise ValueError("Threshold must be at least 1")
+
+    # Group the signatures by signer, ignoring those not on the keyring.
+    candidates: dict[bytes, tuple[SSHPublicKey, list[SSHSignature]]] = {}
+    for signature in signatures:
+        signer = keyring.signer_of(signature)
+        if signer is not None:
+            candidates.setdefault(signer.key_data.hash_image, (signer, []))[1].append(signature)
+    if len(candidates) < threshold:
+        return []
+
+    verified: list[SSHPublicKey] = []
+    # The number of outstanding checks for each signer not yet verified.
+    pending = {blob: len(signer_signatures) for blob, (_, signer_signatures) in candidates.items()}
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures: dict[Future, bytes] = {}
+        for blob, (signer, signer_signatures) in candidates.items():
+            for signature in signer_signatures:
+                futures[executor.submit(verify_message, message, signature, signer)] = blob
+        for future in as_completed(futures):
+            blob = futures[future]
+            if blob not in pending:
+                continue
+            pending[blob] -= 1
+            if future.result():
+                del pending[blob]
+                verified.append(candidates[blob][0])
+                if len(verified) >= threshold:
+                    break
+            elif pending[blob] == 0:
+                del pending[blob]
+            if len(verified) + len(pending) < threshold:
+                break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return verified
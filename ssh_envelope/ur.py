@@ -0,0 +1,27 @@
+from ssh_envelope import bytewords
+
+def encode_ur(ur_type: str, cbor: bytes) -> str:
+    """
+    Encodes untagged CBOR as a single-part UR of the given type.
+    """
+    return f"ur:{ur_type}/{bytewords.encode(cbor, bytewords.Style.MINIMAL)}"
+
+def decode_ur(ur: str, ur_type: str | None = None) -> tuple[str, bytes]:
+    """
+    Decodes a single-part UR.
+
+    Returns a tuple of the UR type and the untagged CBOR payload.
+
+    :raises ValueError: If the string is not a valid UR, is not of the expected
+        type, or its checksum does not match.
+    """
+    ur = ur.strip().lower()
+    if not ur.startswith("ur:"):
+        raise ValueError("Invalid UR: missing scheme")
+    components = ur[3:].split("/")
+    if len(components) != 2:
+        raise ValueError("Invalid UR: multi-part URs are not supported")
+    decoded_type, body = components
+    if ur_type is not None and decoded_type != ur_type:
+        raise ValueError(f"Invalid UR: expected type {ur_type}")
+    return decoded_type, bytewords.decode(body, bytewords.Style.MINIMAL)
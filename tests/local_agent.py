@@ -0,0 +1,86 @@
+import os
+import socket
+import tempfile
+import threading
+
+from ssh_envelope.ssh_agent import (
+    agent_failure, agent_identities_answer, agent_rsa_sha2_256, agent_rsa_sha2_512, agent_sign_response,
+    agentc_request_identities, agentc_sign_request, read_agent_message, write_agent_message,
+)
+from ssh_envelope.ssh_buffer import SSHReadBuffer, SSHWriteBuffer
+from ssh_envelope.ssh_private_key import SSHPrivateKey
+from ssh_envelope.sshsig import sign_data
+
+class LocalAgent:
+    """
+    A minimal in-process ssh-agent for tests. It answers identity listings
+    and sign requests for the keys it was given, and refuses everything else.
+    """
+    def __init__(self, private_keys: list[SSHPrivateKey]):
+        self._keys = {key.public_key_data.hash_image: key for key in private_keys}
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmpdir.name, "agent")
+        self.sign_requests = 0
+        # Label RSA signatures as SHA-1 `ssh-rsa` whatever the flags ask for,
+        # as agents that ignore them do. The signature itself isn't SHA-1,
+        # since sshsig refuses to make one.
+        self.ignore_rsa_flags = False
+
+    def __enter__(self):
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.path)
+        self._listener.listen()
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def __exit__(self, *_):
+        self._listener.close()
+        self._tmpdir.cleanup()
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection: socket.socket):
+        with connection:
+            while True:
+                try:
+                    message_type, payload = read_agent_message(connection)
+                except ValueError:
+                    return
+                response_type, response = self._handle(message_type, payload)
+                write_agent_message(connection, response_type, response)
+
+    def _handle(self, message_type: int, payload: bytes) -> tuple[int, bytes]:
+        if message_type == agentc_request_identities:
+            buf = SSHWriteBuffer()
+            buf.write_int(len(self._keys))
+            for blob, key in self._keys.items():
+                buf.write_chunk(blob)
+                buf.write_length_prefixed_string(key.comment)
+            return agent_identities_answer, buf.data
+        elif message_type == agentc_sign_request:
+            buf = SSHReadBuffer(payload)
+            key = self._keys.get(buf.read_chunk())
+            data = buf.read_chunk()
+            flags = buf.read_int()
+            if key is None:
+                return agent_failure, b""
+            rsa_signature_type = "rsa-sha2-256" if flags & agent_rsa_sha2_256 else "rsa-sha2-512" if flags & agent_rsa_sha2_512 else "ssh-rsa"
+            try:
+                signature_type, signature_data = sign_data(data, key, rsa_signature_type)
+            except ValueError:
+                return agent_failure, b""
+            if self.ignore_rsa_flags and signature_type.startswith("rsa-"):
+                signature_type = "ssh-rsa"
+            self.sign_requests += 1
+            buf = SSHWriteBuffer()
+            with buf.nested_chunk():
+                buf.write_length_prefixed_string(signature_type)
+                buf.write_chunk(signature_data)
+            return agent_sign_response, buf.data
+        return agent_failure, b""
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from ssh_envelope.async_envelope import AsyncEnvelope, Backend, ConcurrencyLimiter
+from ssh_envelope.envelope import Envelope
+from ssh_envelope.keyring import Keyring
+from ssh_envelope.ssh_object_utils import derive_public_key, generate_ed25519_private
+
+@pytest.mark.parametrize("backend", list(Backend))
+def test_async_sign_and_verify(backend: Backend):
+    ssh_private_keys = [generate_ed25519_private() for _ in range(3)]
+    public_keys = [derive_public_key(key) for key in ssh_private_keys]
+    private_keys = [Envelope.from_ssh_private_key(key) for key in ssh_private_keys]
+
+    async def run():
+        limiter = ConcurrencyLimiter(2)
+        envelope = AsyncEnvelope(Envelope.from_string("Hello, world!").wrapped(), limiter, backend)
+        signed = await envelope.add_signatures(private_keys[:2], namespace="test")
+        assert limiter.in_flight == 0 and limiter.waiting == 0
+        assert await signed.verify_signature(Envelope.from_ssh_public_key(public_keys[0]))
+        assert not await signed.verify_signature(Envelope.from_ssh_public_key(public_keys[2]))
+        assert set(await signed.verified_signers(Keyring(public_keys))) == set(public_keys[:2])
+        return signed
+
+    signed = asyncio.run(run())
+    assert signed.envelope.verify_signature(Envelope.from_ssh_public_key(public_keys[1]))
+
+def test_concurrency_limiter():
+    async def run():
+        limiter = ConcurrencyLimiter(2)
+        peak = 0
+
+        async def operation():
+            nonlocal peak
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(limiter.run(operation) for _ in range(10)))
+        return peak
+
+    assert asyncio.run(run()) == 2
+    with pytest.raises(ValueError):
+        ConcurrencyLimiter(0)
+
+# test_async_sign_and_verify(Backend.SSH_KEYGEN)
+# test_concurrency_limiter()
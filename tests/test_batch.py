@@ -0,0 +1,104 @@
+import io
+import json
+import os
+import sys
+import tempfile
+from contextlib import redirect_stderr, redirect_stdout
+
+import pytest
+
+from ssh_envelope.batch import read_records, run_batch
+from ssh_envelope.envelope import Envelope
+from ssh_envelope.main import _main
+from ssh_envelope.ssh_object_utils import derive_public_key, generate_ed25519_private
+
+def run_main(args: list[str], stdin: str | None = None) -> tuple[list[dict], bool]:
+    stdout = io.StringIO()
+    failed = False
+    old_stdin = sys.stdin
+    try:
+        if stdin is not None:
+            sys.stdin = io.StringIO(stdin)
+        with redirect_stdout(stdout), redirect_stderr(io.StringIO()):
+            _main(args)
+    except SystemExit:
+        failed = True
+    finally:
+        sys.stdin = old_stdin
+    return [json.loads(line) for line in stdout.getvalue().splitlines()], failed
+
+def test_read_records():
+    records = list(read_records(io.StringIO('ur:envelope/abc\n\n"line 1\\nline 2"\n')))
+    assert records == ["ur:envelope/abc", "line 1\nline 2"]
+
+def test_malformed_json_record():
+    records = list(read_records(io.StringIO('a\n"unterminated\n"[1]\nb\n')))
+    assert records[0] == "a" and records[3] == "b"
+    assert isinstance(records[1], ValueError) and isinstance(records[2], ValueError)
+    output = io.StringIO()
+    failures = run_batch(records, str.upper, output)
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert failures == 2
+    assert [result["status"] for result in results] == ["ok", "error", "error", "ok"]
+    assert results[3] == {"index": 3, "status": "ok", "result": "B"}
+
+def test_run_batch_order():
+    output = io.StringIO()
+    def process(record: str) -> str:
+        if record == "bad":
+            raise ValueError("bad record")
+        return record.upper()
+    failures = run_batch(["a", "bad", "c"] * 5, process, output, jobs=4)
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert failures == 5
+    assert [result["index"] for result in results] == list(range(15))
+    assert results[0] == {"index": 0, "status": "ok", "result": "A"}
+    assert results[1] == {"index": 1, "status": "error", "error": "bad record"}
+
+def test_batch_sign_and_verify():
+    ssh_private_key = generate_ed25519_private()
+    private_key = Envelope.from_ssh_private_key(ssh_private_key)
+    public_key = Envelope.from_ssh_public_key(derive_public_key(ssh_private_key))
+    envelopes = [Envelope.from_string(f"Message {i}").wrapped() for i in range(8)]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        batch_path = os.path.join(tmpdir, "batch")
+        with open(batch_path, "w") as f:
+            f.write("\n".join(envelope.ur for envelope in envelopes) + "\n")
+        results, failed = run_main(["add-signature", "--key", private_key.ur, "--batch", batch_path, "--jobs", "4"])
+    assert not failed
+    signed = [Envelope(result["result"]) for result in results]
+    assert [envelope.subject for envelope in signed] == [envelope.subject for envelope in envelopes]
+
+    records = [envelope.ur for envelope in signed] + [envelopes[0].ur]
+    results, failed = run_main(["verify-signature", "--key", public_key.ur, "--batch", "--jobs", "3"], "\n".join(records))
+    assert failed
+    assert [result["status"] for result in results] == ["ok"] * 8 + ["error"]
+
+def test_batch_import_export_public():
+    ssh_private_key = generate_ed25519_private()
+    private_key = Envelope.from_ssh_private_key(ssh_private_key)
+    ssh_public_key = derive_public_key(ssh_private_key)
+
+    results, failed = run_main(["export", "--batch"], private_key.ur)
+    assert not failed
+    pem = results[0]["result"]
+    results, failed = run_main(["import", "--batch"], f"{json.dumps(pem)}\n{ssh_public_key.string}\n")
+    assert not failed
+    assert Envelope(results[0]["result"]).to_ssh_private_key().public_key_data == ssh_private_key.public_key_data
+    assert Envelope(results[1]["result"]).to_ssh_public_key() == ssh_public_key
+
+    results, failed = run_main(["public", "--batch"], private_key.ur)
+    assert not failed
+    assert Envelope(results[0]["result"]).to_ssh_public_key() == ssh_public_key
+
+def test_batch_requires_key_option():
+    with pytest.raises(ValueError):
+        run_main(["add-signature", "--batch"], "")
+
+# test_read_records()
+# test_malformed_json_record()
+# test_run_batch_order()
+# test_batch_sign_and_verify()
+# test_batch_import_export_public()
+# test_batch_requires_key_option()
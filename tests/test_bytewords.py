@@ -0,0 +1,41 @@
+import pytest
+
+from ssh_envelope import bytewords
+from ssh_envelope.envelope import Envelope
+from ssh_envelope.ur import decode_ur, encode_ur
+
+def test_bytewords_styles():
+    data = bytes.fromhex("d9012ca20150c7098580125e2ab0981253468b2dbc5202d8641947da")
+    for style in bytewords.Style:
+        assert bytewords.decode(bytewords.encode(data, style), style) == data
+    assert bytewords.encode(b"\x00\xff", bytewords.Style.STANDARD).startswith("able zoom ")
+    assert bytewords.encode(b"\x00\xff", bytewords.Style.URI).startswith("able-zoom-")
+    assert bytewords.encode(b"\x00\xff", bytewords.Style.MINIMAL).startswith("aezm")
+
+def test_bytewords_rejects_corruption():
+    encoded = bytewords.encode(b"Hello, world!")
+    with pytest.raises(ValueError):
+        bytewords.decode(encoded[:-2] + ("ae" if not encoded.endswith("ae") else "ad"))
+    with pytest.raises(ValueError):
+        bytewords.decode(encoded[:-1])
+    with pytest.raises(ValueError):
+        bytewords.decode("qqqq" + encoded)
+
+def test_ur_round_trip():
+    ur = encode_ur("envelope", bytes.fromhex("d8186548656c6c6f"))
+    assert decode_ur(ur) == ("envelope", bytes.fromhex("d8186548656c6c6f"))
+    assert decode_ur(ur.upper(), "envelope")[1] == bytes.fromhex("d8186548656c6c6f")
+    with pytest.raises(ValueError):
+        decode_ur(ur, "crypto-seed")
+
+def test_envelope_rejects_corrupt_ur():
+    envelope = Envelope.from_string("Hello!")
+    assert Envelope(envelope.ur + "\n") == envelope
+    assert Envelope.from_cbor(envelope.cbor) == envelope
+    with pytest.raises(ValueError):
+        Envelope(envelope.ur[:-2] + ("ae" if not envelope.ur.endswith("ae") else "ad"))
+
+# test_bytewords_styles()
+# test_bytewords_rejects_corruption()
+# test_ur_round_trip()
+# test_envelope_rejects_corrupt_ur()
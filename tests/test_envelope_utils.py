@@ -1,6 +1,8 @@
-from ssh_envelope.envelope import Envelope
+from ssh_envelope.envelope import Envelope, EnvelopeBuilder
 import inspect
 
+from tests.test_ssh_keygen_utils import example_private_key_envelope
+
 def test_string_envelope():
     string = "Hello!"
     envelope = Envelope.from_string(string)
@@ -41,9 +43,67 @@ def test_assertion_envelope_2():
     'verifiedBy': "Signature"
     ''')
 
+def test_leaf_digest():
+    # Known digest of the envelope `"Hello."`
+    assert Envelope.from_string("Hello.").digest.hex() == "8cc96cdb771176e835114a0f8936690b41cfed0df22d014eedd64edaea945d59"
+
+def test_round_trip():
+    envelope = Envelope(example_private_key_envelope)
+    assert Envelope.from_node(envelope.node).ur == example_private_key_envelope
+    assert envelope.subject == envelope
+
+def test_assertion_order():
+    e1 = Envelope.from_string("Alice").add_string_string_assertion("knows", "Bob").add_string_int_assertion("age", 42)
+    e2 = Envelope.from_string("Alice").add_string_int_assertion("age", 42).add_string_string_assertion("knows", "Bob")
+    assert e1 == e2
+    assert e1.add_string_int_assertion("age", 42) == e1
+    assert e1.subject == Envelope.from_string("Alice")
+    assert e1.format == inspect.cleandoc('''
+    "Alice" [
+        "age": 42
+        "knows": "Bob"
+    ]
+    ''')
+
+def test_assertion_extraction():
+    assertion = Envelope.from_assertion_pred_obj("string", "knows", "string", "Bob")
+    assert assertion.predicate == Envelope.from_string("knows")
+    assert assertion.object == Envelope.from_string("Bob")
+
+def test_memoized_envelope():
+    envelope = Envelope.from_string("Alice").add_string_string_assertion("knows", "Bob")
+    parsed = Envelope(envelope.ur)
+    assert parsed._node is None
+    assert parsed.subject is parsed.subject
+    assert parsed.format is parsed.format
+    assert parsed.digest == envelope.digest
+    # Derived envelopes share the subtree, including its cached digest
+    assert parsed.subject.node is parsed.node.subject
+    assert parsed.subject.cbor == Envelope.from_string("Alice").cbor
+
+def test_builder():
+    chained = Envelope.from_string("Alice")\
+        .add_string_string_assertion("knows", "Bob")\
+        .add_string_int_assertion("age", 42)\
+        .add_assertion(Envelope.from_known_value("isA"), Envelope.from_string("Person"))
+    built = EnvelopeBuilder(Envelope.from_string("Alice"))\
+        .add_string_int_assertion("age", 42)\
+        .add_known_value_assertion("isA", Envelope.from_string("Person"))\
+        .add_string_string_assertion("knows", "Bob")\
+        .build()
+    assert built == chained
+    assert built.digest == chained.digest
+    assert EnvelopeBuilder(Envelope.from_string("Alice")).build() == Envelope.from_string("Alice")
+
 # test_string_envelope()
 # test_wrap_envelope()
 # test_tagged_string_envelope()
 # test_known_value_envelope()
 # test_assertion_envelope_1()
 # test_assertion_envelope_2()
+# test_leaf_digest()
+# test_round_trip()
+# test_assertion_order()
+# test_assertion_extraction()
+# test_memoized_envelope()
+# test_builder()
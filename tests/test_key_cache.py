@@ -0,0 +1,176 @@
+import argparse
+import threading
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from ssh_envelope import key_cache, ssh_object_utils
+from ssh_envelope.key_cache import DecryptedKeyCache, disable_shared_cache, enable_shared_cache
+from ssh_envelope.main import configure_key_cache
+from ssh_envelope.ssh_object_utils import import_ssh_object
+from ssh_envelope.ssh_private_key import SSHPrivateKey
+from tests.test_data import ed25519_private_key, rsa_private_key
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def encrypted_key(password: bytes) -> str:
+    return Ed25519PrivateKey.generate().private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.OpenSSH,
+        encryption_algorithm=serialization.BestAvailableEncryption(password),
+    ).decode()
+
+def test_key_cache_ttl():
+    clock = FakeClock()
+    cache = DecryptedKeyCache(ttl=10, clock=clock)
+    key_id = DecryptedKeyCache.key_id(ed25519_private_key)
+    assert cache.get(key_id) is None
+    cache.put(key_id, SSHPrivateKey.from_pem_string(ed25519_private_key))
+    assert len(cache) == 1
+    clock.now = 9
+    cached = cache.get(key_id)
+    assert cached is not None
+    assert cached.pem_string == ed25519_private_key
+    clock.now = 10
+    assert cache.get(key_id) is None
+    assert len(cache) == 0
+    with pytest.raises(ValueError):
+        DecryptedKeyCache(ttl=0)
+
+def test_key_cache_evict_zeroizes():
+    cache = DecryptedKeyCache()
+    key_id = DecryptedKeyCache.key_id(ed25519_private_key)
+    cache.put(key_id, SSHPrivateKey.from_pem_string(ed25519_private_key))
+    buffer = cache._entries[key_id][1]
+    assert cache.evict(key_id)
+    assert not cache.evict(key_id)
+    assert buffer == bytes(len(buffer))
+
+    other_id = DecryptedKeyCache.key_id(rsa_private_key)
+    cache.put(key_id, SSHPrivateKey.from_pem_string(ed25519_private_key))
+    cache.put(other_id, SSHPrivateKey.from_pem_string(rsa_private_key))
+    buffers = [pem for _, pem in cache._entries.values()]
+    cache.clear()
+    assert len(cache) == 0
+    assert all(pem == bytes(len(pem)) for pem in buffers)
+
+def test_key_cache_get_or_decrypt():
+    cache = DecryptedKeyCache()
+    key_id = DecryptedKeyCache.key_id(ed25519_private_key)
+    calls = []
+    def decrypt():
+        calls.append(1)
+        return SSHPrivateKey.from_pem_string(ed25519_private_key)
+    first = cache.get_or_decrypt(key_id, decrypt)
+    second = cache.get_or_decrypt(key_id, decrypt)
+    assert len(calls) == 1
+    assert first.pem_string == second.pem_string
+    assert first is not second
+
+    def fail():
+        raise ValueError("Failed to load SSH key: maximum password attempts reached.")
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            cache.get_or_decrypt(DecryptedKeyCache.key_id(rsa_private_key), fail)
+    assert cache._decrypting == {}
+
+def test_key_cache_get_or_decrypt_after_failure():
+    cache = DecryptedKeyCache()
+    key_id = DecryptedKeyCache.key_id(ed25519_private_key)
+    started = threading.Event()
+    release = threading.Event()
+    def fail():
+        started.set()
+        release.wait()
+        raise ValueError("Failed to load SSH key: maximum password attempts reached.")
+    calls = []
+    def decrypt():
+        calls.append(1)
+        return SSHPrivateKey.from_pem_string(ed25519_private_key)
+    errors = []
+    results = []
+    def first():
+        try:
+            cache.get_or_decrypt(key_id, fail)
+        except ValueError as e:
+            errors.append(e)
+    def other():
+        results.append(cache.get_or_decrypt(key_id, decrypt))
+
+    threads = [threading.Thread(target=first)]
+    threads[0].start()
+    assert started.wait(5)
+    threads += [threading.Thread(target=other) for _ in range(2)]
+    for thread in threads[1:]:
+        thread.start()
+    # Both wait on the failing caller's lock before it fails.
+    deadline = time.monotonic() + 5
+    while cache._decrypting[key_id][1] < 3:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(errors) == 1
+    assert len(results) == 2
+    assert len(calls) == 1
+    assert results[0].pem_string == results[1].pem_string == ed25519_private_key
+    assert cache._decrypting == {}
+
+def test_shared_key_cache_import(monkeypatch):
+    password = b"password"
+    prompts = []
+    def getpass(prompt):
+        prompts.append(prompt)
+        return password.decode()
+    monkeypatch.setattr(ssh_object_utils, "getpass", getpass)
+    encrypted = encrypted_key(password)
+    try:
+        first = import_ssh_object(encrypted)
+        assert len(prompts) == 1
+        assert key_cache.shared_cache() is None
+
+        cache = enable_shared_cache(60)
+        assert key_cache.shared_cache() is cache
+        second = import_ssh_object(encrypted)
+        third = import_ssh_object(encrypted)
+        assert len(prompts) == 2
+        assert isinstance(third, SSHPrivateKey)
+        assert first.fingerprint == second.fingerprint == third.fingerprint
+
+        assert cache.evict(DecryptedKeyCache.key_id(encrypted))
+        import_ssh_object(encrypted)
+        assert len(prompts) == 3
+    finally:
+        disable_shared_cache()
+    assert key_cache.shared_cache() is None
+
+def test_configure_key_cache(monkeypatch):
+    monkeypatch.delenv("SSH_ENVELOPE_KEY_CACHE_TTL", raising=False)
+    try:
+        cache = enable_shared_cache(60)
+        configure_key_cache(argparse.Namespace(key_cache_ttl=None))
+        assert key_cache.shared_cache() is cache
+
+        monkeypatch.setenv("SSH_ENVELOPE_KEY_CACHE_TTL", "30")
+        configure_key_cache(argparse.Namespace(key_cache_ttl=None))
+        assert key_cache.shared_cache().ttl == 30
+
+        configure_key_cache(argparse.Namespace(key_cache_ttl=0))
+        assert key_cache.shared_cache() is None
+    finally:
+        disable_shared_cache()
+
+# test_key_cache_ttl()
+# test_key_cache_evict_zeroizes()
+# test_key_cache_get_or_decrypt()
+# test_key_cache_get_or_decrypt_after_failure()
+# test_shared_key_cache_import(...)
+# test_configure_key_cache(...)
@@ -0,0 +1,92 @@
+import io
+import os
+import sys
+import tempfile
+from contextlib import redirect_stderr, redirect_stdout
+
+import pytest
+
+from ssh_envelope.envelope import Envelope
+from ssh_envelope.key_store import KeyStore
+from ssh_envelope.main import _main
+from ssh_envelope.ssh_object_utils import derive_public_key, generate_ed25519_private
+from ssh_envelope.ssh_public_key import SSHPublicKey
+from tests.test_data import rsa_public_key
+
+def run_main(args: list[str], stdin: str | None = None) -> tuple[str, bool]:
+    stdout = io.StringIO()
+    old_stdin = sys.stdin
+    try:
+        if stdin is not None:
+            sys.stdin = io.StringIO(stdin)
+        with redirect_stdout(stdout), redirect_stderr(io.StringIO()):
+            _main(args)
+    except SystemExit:
+        return stdout.getvalue(), False
+    finally:
+        sys.stdin = old_stdin
+    return stdout.getvalue(), True
+
+def test_key_store():
+    private_key = generate_ed25519_private()
+    private_key.comment = "alice@example.com"
+    rsa_key = SSHPublicKey.from_string(rsa_public_key)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "store", "keys.db")
+        with KeyStore(path) as store:
+            fingerprints = store.add_all([Envelope.from_ssh_private_key(private_key), Envelope.from_ssh_public_key(rsa_key)])
+            assert fingerprints == [private_key.fingerprint, rsa_key.fingerprint]
+            with pytest.raises(ValueError):
+                store.add(Envelope.from_string("Hello"))
+        assert os.stat(path).st_mode & 0o777 == 0o600
+
+        with KeyStore(path) as store:
+            assert len(store.all()) == 3 and len(store.all(private=True)) == 1
+            public = store.get(private_key.fingerprint)
+            assert public is not None and not public.is_private
+            assert public.to_envelope().to_ssh_public_key() == private_key.public_key
+            assert public.type == "ED25519" and public.key_size == 256 and public.comment == "alice@example.com"
+            private = store.get(private_key.fingerprint, private=True)
+            assert private is not None and private.to_envelope().to_ssh_private_key() == private_key
+            assert store.get(rsa_key.fingerprint, private=True) is None
+            assert [key.fingerprint for key in store.find("alice")] == [private_key.fingerprint] * 2
+            assert [key.fingerprint for key in store.find(rsa_key.fingerprint[7:17])] == [rsa_key.fingerprint]
+            assert [key.fingerprint for key in store.find(type="rsa")] == [rsa_key.fingerprint]
+            assert store.find("%") == []
+            assert store.find_by_blob(rsa_key.key_data.hash_image) is not None
+            with pytest.raises(ValueError):
+                store.private_keys([rsa_key.fingerprint])
+
+def test_store_commands(monkeypatch):
+    private_keys = [generate_ed25519_private() for _ in range(2)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "keys.db")
+        urs = "\n".join(Envelope.from_ssh_private_key(key).ur for key in private_keys)
+        output, ok = run_main(["store", "add", "--store", path], stdin=urs)
+        assert ok and output.split() == [key.fingerprint for key in private_keys]
+        fingerprint = private_keys[0].fingerprint
+
+        output, ok = run_main(["store", "get", "-s", path, fingerprint])
+        assert ok and Envelope(output.strip()).to_ssh_public_key() == derive_public_key(private_keys[0])
+        _, ok = run_main(["store", "get", "-s", path, "SHA256:missing"])
+        assert not ok
+        output, ok = run_main(["store", "list", "-s", path, "--private"])
+        assert ok and len(output.splitlines()) == 2
+        output, ok = run_main(["store", "find", "-s", path, fingerprint[7:20]])
+        assert ok and output.splitlines()[0].startswith(f"{fingerprint} public ED25519 256")
+
+        subject = Envelope.from_string("Hello, world!").wrapped()
+        signed, ok = run_main(["add-signature", "--store", path, "--fingerprint", fingerprint, "--envelope", subject.ur])
+        assert ok
+        closed = []
+        close = KeyStore.close
+        monkeypatch.setattr(KeyStore, "close", lambda store: closed.append(store) or close(store))
+        _, ok = run_main(["verify-signature", "--store", path, "--envelope", signed.strip(), "--silent"])
+        assert ok and len(closed) == 1
+        _, ok = run_main(["verify-signature", "--store", path, "-f", private_keys[1].fingerprint, "--envelope", signed.strip(), "--silent"])
+        assert not ok
+        _, ok = run_main(["verify-signature", "--store", path, "--envelope", subject.ur, "--silent"])
+        assert not ok
+
+# test_key_store()
+# test_store_commands(...)
@@ -0,0 +1,71 @@
+import io
+import os
+import tempfile
+from contextlib import redirect_stderr, redirect_stdout
+
+import pytest
+
+from ssh_envelope.envelope import Envelope
+from ssh_envelope.keyring import Keyring
+from ssh_envelope.main import _main
+from ssh_envelope.ssh_object_utils import derive_public_key, generate_ed25519_private
+
+def test_keyring_lookup():
+    private_keys = [generate_ed25519_private() for _ in range(3)]
+    public_keys = [derive_public_key(key) for key in private_keys]
+    keyring = Keyring(public_keys[:2])
+    assert len(keyring) == 2
+    assert public_keys[0] in keyring
+    assert public_keys[2] not in keyring
+    assert keyring.find_by_fingerprint(public_keys[1].fingerprint) == public_keys[1]
+    assert keyring.find_by_key_data(public_keys[2].key_data) is None
+    keyring.add(public_keys[0])
+    assert len(keyring) == 2
+
+def test_verified_signers():
+    private_keys = [generate_ed25519_private() for _ in range(3)]
+    public_keys = [derive_public_key(key) for key in private_keys]
+    envelope = Envelope.from_string("Hello, world!").wrapped()
+    for private_key in private_keys[:2]:
+        envelope = envelope.add_signature(Envelope.from_ssh_private_key(private_key), namespace="test")
+    assert set(envelope.verified_signers(Keyring(public_keys))) == set(public_keys[:2])
+    assert envelope.verified_signers(Keyring(public_keys[1:])) == public_keys[1:2]
+    assert envelope.verified_signers(Keyring(public_keys[2:])) == []
+
+def test_verify_signature_keyring_command():
+    private_keys = [generate_ed25519_private() for _ in range(2)]
+    public_keys = [derive_public_key(key) for key in private_keys]
+    envelope = Envelope.from_string("Hello, world!").wrapped()\
+        .add_signature(Envelope.from_ssh_private_key(private_keys[0]), namespace="envelope")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        keyring_path = os.path.join(tmpdir, "keyring")
+        with open(keyring_path, "w") as f:
+            f.write("\n".join(Envelope.from_ssh_public_key(key).ur for key in public_keys) + "\n")
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            _main(["verify-signature", "--keyring", keyring_path, "--envelope", envelope.ur])
+        assert stdout.getvalue().strip() == envelope.ur
+        assert public_keys[0].fingerprint in stderr.getvalue()
+
+        with open(keyring_path, "w") as f:
+            f.write(Envelope.from_ssh_public_key(public_keys[1]).ur + "\n")
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()), pytest.raises(SystemExit):
+            _main(["verify-signature", "--keyring", keyring_path, "--envelope", envelope.ur])
+
+def test_add_signature_multiple_keys_command():
+    private_keys = [generate_ed25519_private() for _ in range(2)]
+    public_keys = [derive_public_key(key) for key in private_keys]
+    envelope = Envelope.from_string("Hello, world!").wrapped()
+    args = ["add-signature", "--envelope", envelope.ur]
+    for private_key in private_keys:
+        args += ["--key", Envelope.from_ssh_private_key(private_key).ur]
+    stdout = io.StringIO()
+    with redirect_stdout(stdout):
+        _main(args)
+    signed_envelope = Envelope(stdout.getvalue())
+    assert set(signed_envelope.verified_signers(Keyring(public_keys))) == set(public_keys)
+
+# test_keyring_lookup()
+# test_verified_signers()
+# test_verify_signature_keyring_command()
+# test_add_signature_multiple_keys_command()
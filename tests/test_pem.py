@@ -1,3 +1,5 @@
+import pytest
+
 from ssh_envelope.pem import PEM
 
 encrypted_private_key = """
@@ -30,5 +32,31 @@ def test_encode_pem():
     pem2 = PEM.from_pem_string(example)
     assert(pem == pem2)
 
+def test_pem_string_verbatim():
+    pem = PEM.from_pem_string(encrypted_private_key)
+    assert pem.pem_string == encrypted_private_key.lstrip()
+    assert PEM.from_header_and_data(pem.header, pem.data).pem_string == pem.pem_string
+
+    # Non-canonical line wrapping is re-encoded.
+    lines = encrypted_private_key.strip().split("\n")
+    rewrapped = "\n".join([lines[0], "".join(lines[1:-1]), lines[-1]])
+    pem = PEM.from_pem_string(rewrapped)
+    assert pem.pem_string == encrypted_private_key.lstrip()
+
+    # Non-zero padding bits decode to the same data but are not canonical.
+    pem = PEM.from_pem_string(example.replace("dGVzdA==", "dGVzdB=="))
+    assert pem.data == b"test"
+    assert pem.pem_string == example.lstrip()
+
+def test_invalid_pem():
+    with pytest.raises(ValueError):
+        PEM.from_pem_string("-----BEGIN EXAMPLE-----")
+    with pytest.raises(ValueError):
+        PEM.from_pem_string("-----BEGIN EXAMPLE-----\ndGVzdA==\n-----END OTHER-----")
+    with pytest.raises(ValueError):
+        PEM.from_pem_string("-----BEGIN EXAMPLE-----\ndGVzdA=\n-----END EXAMPLE-----").data
+
 # test_decode_pem()
 # test_encode_pem()
+# test_pem_string_verbatim()
+# test_invalid_pem()
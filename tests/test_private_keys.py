@@ -1,6 +1,8 @@
 import os
 import sys
 
+import pytest
+
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.serialization import load_ssh_private_key
 from cryptography.hazmat.primitives.serialization.ssh import SSHPrivateKeyTypes, SSHPublicKeyTypes;
@@ -11,6 +13,7 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
 
 from ssh_envelope.pem import PEM
+from ssh_envelope.ssh_key_encryption import SSHKeyEncryption
 from ssh_envelope.ssh_private_key import SSHPrivateKey
 from tests.test_data import ed25519_private_key, ed25519_public_key, rsa_private_key, rsa_public_key, dsa_private_key, dsa_public_key, ecdsa_private_key, ecdsa_public_key
 
@@ -39,9 +42,13 @@ def test_generate_key():
 
 def test_rsa_private_key():
     key = SSHPrivateKey.from_pem_string(rsa_private_key)
-    assert repr(key) == "SSHPrivateKey(type: ssh-rsa, public_key_data: (public_exponent: 010001, modulus: 00991cfbb8f5b5e6c56fb5b0f77e4c416ae3dbd25012bcb3c5c8918f638141484420d13d41e351e80a503e2bac33650c999816a22a8ef7028924aa3691677956216f8fb2a341b5b2bc4379982f3e9a1da30462f31a79a9ac2c1645fe7254e51b4e1275b15de88d01555a9ea3910aaea46c129038ff9d29d19101151dc3e9f813d87fcf269387d620975d840ab9292a65d95f6f3c2f08c8348ab9117115da0b03f41fd39dd96c0c21eb5fc7936061829f246cff7e0189a01012fd174e241d6346f48ac0b13fd4aaf2fb8c4496e95b170acbdc4013450d5cd7a7dc3ac68c9adb10799e0fe4a3b468b04be58d847f57024fcc52a95c7fd8b5e52fc6716ed148e952cf), check_num: 4cbff639, private_key_data: (modulus: 00991cfbb8f5b5e6c56fb5b0f77e4c416ae3dbd25012bcb3c5c8918f638141484420d13d41e351e80a503e2bac33650c999816a22a8ef7028924aa3691677956216f8fb2a341b5b2bc4379982f3e9a1da30462f31a79a9ac2c1645fe7254e51b4e1275b15de88d01555a9ea3910aaea46c129038ff9d29d19101151dc3e9f813d87fcf269387d620975d840ab9292a65d95f6f3c2f08c8348ab9117115da0b03f41fd39dd96c0c21eb5fc7936061829f246cff7e0189a01012fd174e241d6346f48ac0b13fd4aaf2fb8c4496e95b170acbdc4013450d5cd7a7dc3ac68c9adb10799e0fe4a3b468b04be58d847f57024fcc52a95c7fd8b5e52fc6716ed148e952cf, public_exponent: 010001, private_exponent: 21b37070889cae1bbcf7d7e8d1c2c50f5af1f27baf741b79a828e9cfb40e8372836aaaba0ae7e75405cf795b60c09822628870cf3f427d2b64879695309a536bee9b496d87b40f9042a5cbea723407dbeec63cce120357a3288fe56e92e30ebc8371a6458e3f2310ff6e35806242886c4535bb65ffd8c988ca1d34bcff8d9c084f0722a151fe9d1e0aae17e9f26cfbf347f9226153f9c8b7730463584b5ae15c0035b092026356c659d1e01e6ebd6558692a507a3cccd873cafd449cd446ec0515b6f05b67aa8ffb316c898edf5caead3353a210062272784947e2ecd32f1aa0b475e9ec041f9d53f46d03255e611069a432d7b42c02ed4720d14c4e5d3f0229, prime1: 00c7ad2afa19d06489d9fa7a475bae98ed739048630fe053bad238cf9f6b262c46a3f0f48936efb9e3ebd81a79bc8738e8b7a51d05e7fbf601224741157257a51a3e77e9fd45c5176b8d50d50305d0e4a0b74d8c48797ec5f109c9d1294404237688d2f02661cd671d250319a13c9c0137932b308748089722d7f3c9c0c101825e, prime2: 00c90b81e7ab422e31fd08fd5a49c59361dbf8894a9c23d87dd52de887098d076168e8fe58c472b7b9013ad89b896b765bff45ba8fad56db53a6396389d185952bf20e0a9990b417b680de36335d5a68f91b6f734e9e882fada40708c44114bd27d4493295c413e8ed666f6ffcc9ebd8619526328bdc5ea49e73e893bb4d638415, coefficient: 00c2f75d2daff6951fc255c5e720b8bda9a66af637506c1ff904b02647e29747f6de48e61af71e046c64307248eb66f745b69066d044f94e01fd35462858542afec85da4487460eb2ce23b52ee96708cd931fd848cb5f3c18096149c08736710268e15061af6d9d1dd7f8b445de4f20009d030faba66dfc645b7f7fc30a0ef8053), comment: wolf@Wolfs-MacBook-Pro.local)"
+    assert repr(key) == "SSHPrivateKey(type: ssh-rsa, public_key_data: (public_exponent: 010001, modulus: 00991cfbb8f5b5e6c56fb5b0f77e4c416ae3dbd25012bcb3c5c8918f638141484420d13d41e351e80a503e2bac33650c999816a22a8ef7028924aa3691677956216f8fb2a341b5b2bc4379982f3e9a1da30462f31a79a9ac2c1645fe7254e51b4e1275b15de88d01555a9ea3910aaea46c129038ff9d29d19101151dc3e9f813d87fcf269387d620975d840ab9292a65d95f6f3c2f08c8348ab9117115da0b03f41fd39dd96c0c21eb5fc7936061829f246cff7e0189a01012fd174e241d6346f48ac0b13fd4aaf2fb8c4496e95b170acbdc4013450d5cd7a7dc3ac68c9adb10799e0fe4a3b468b04be58d847f57024fcc52a95c7fd8b5e52fc6716ed148e952cf), check_num: 4cbff639, private_key_data: (modulus: 00991cfbb8f5b5e6c56fb5b0f77e4c416ae3dbd25012bcb3c5c8918f638141484420d13d41e351e80a503e2bac33650c999816a22a8ef7028924aa3691677956216f8fb2a341b5b2bc4379982f3e9a1da30462f31a79a9ac2c1645fe7254e51b4e1275b15de88d01555a9ea3910aaea46c129038ff9d29d19101151dc3e9f813d87fcf269387d620975d840ab9292a65d95f6f3c2f08c8348ab9117115da0b03f41fd39dd96c0c21eb5fc7936061829f246cff7e0189a01012fd174e241d6346f48ac0b13fd4aaf2fb8c4496e95b170acbdc4013450d5cd7a7dc3ac68c9adb10799e0fe4a3b468b04be58d847f57024fcc52a95c7fd8b5e52fc6716ed148e952cf, public_exponent: 010001, private_exponent: 21b37070889cae1bbcf7d7e8d1c2c50f5af1f27baf741b79a828e9cfb40e8372836aaaba0ae7e75405cf795b60c09822628870cf3f427d2b64879695309a536bee9b496d87b40f9042a5cbea723407dbeec63cce120357a3288fe56e92e30ebc8371a6458e3f2310ff6e35806242886c4535bb65ffd8c988ca1d34bcff8d9c084f0722a151fe9d1e0aae17e9f26cfbf347f9226153f9c8b7730463584b5ae15c0035b092026356c659d1e01e6ebd6558692a507a3cccd873cafd449cd446ec0515b6f05b67aa8ffb316c898edf5caead3353a210062272784947e2ecd32f1aa0b475e9ec041f9d53f46d03255e611069a432d7b42c02ed4720d14c4e5d3f0229, iqmp: 00c7ad2afa19d06489d9fa7a475bae98ed739048630fe053bad238cf9f6b262c46a3f0f48936efb9e3ebd81a79bc8738e8b7a51d05e7fbf601224741157257a51a3e77e9fd45c5176b8d50d50305d0e4a0b74d8c48797ec5f109c9d1294404237688d2f02661cd671d250319a13c9c0137932b308748089722d7f3c9c0c101825e, p: 00c90b81e7ab422e31fd08fd5a49c59361dbf8894a9c23d87dd52de887098d076168e8fe58c472b7b9013ad89b896b765bff45ba8fad56db53a6396389d185952bf20e0a9990b417b680de36335d5a68f91b6f734e9e882fada40708c44114bd27d4493295c413e8ed666f6ffcc9ebd8619526328bdc5ea49e73e893bb4d638415, q: 00c2f75d2daff6951fc255c5e720b8bda9a66af637506c1ff904b02647e29747f6de48e61af71e046c64307248eb66f745b69066d044f94e01fd35462858542afec85da4487460eb2ce23b52ee96708cd931fd848cb5f3c18096149c08736710268e15061af6d9d1dd7f8b445de4f20009d030faba66dfc645b7f7fc30a0ef8053), comment: wolf@Wolfs-MacBook-Pro.local)"
     assert key.pem_string == rsa_private_key
     assert key.public_key.string == rsa_public_key
+    fields = key.private_key_data.data
+    n, p, q, iqmp = (int.from_bytes(value, "big") for value in (fields.modulus, fields.p, fields.q, fields.iqmp))
+    assert p * q == n
+    assert iqmp * q % p == 1
 
 def test_dsa_private_key():
     key = SSHPrivateKey.from_pem_string(dsa_private_key)
@@ -54,9 +61,73 @@ def test_ecdsa_private_key():
     assert repr(key) == "SSHPrivateKey(type: ecdsa-sha2-nistp256, public_key_data: 048d9320a7acb219babd96b2ffd06cdadca99647ff39b1c7ba58c40b5493769767d59fd557b92f3b10be4f5179abc1d8882d1aa37693ea5c5bf91a582d0be3da20, check_num: 4f193f66, private_key_data: 00e461ff94992dd07a77da51be4732a84f5ae4b6391fb735f1f1804c1fc6686cee, comment: wolf@Wolfs-MacBook-Pro.local)"
     assert key.pem_string == ecdsa_private_key
 
+def test_private_key_comment_invalidates_cache():
+    key = SSHPrivateKey.from_pem_string(ecdsa_private_key)
+    assert key.pem_string == ecdsa_private_key
+    public_key = key.public_key
+    assert key.public_key is public_key
+    key.comment = "renamed"
+    assert key.pem_string != ecdsa_private_key
+    assert key.public_key.comment == "renamed"
+    assert SSHPrivateKey.from_pem_string(key.pem_string) == key
+    assert hash(SSHPrivateKey.from_pem_string(ecdsa_private_key)) == hash(key)
+
+def test_encrypted_private_key():
+    with open(os.path.join(project_root, "objects", "test_ed25519")) as f:
+        encrypted = f.read()
+    with open(os.path.join(project_root, "objects", "test_ed25519_unencrypted")) as f:
+        unencrypted = SSHPrivateKey.from_pem_string(f.read())
+    with pytest.raises(ValueError, match="Password required"):
+        SSHPrivateKey.from_pem_string(encrypted)
+    with pytest.raises(ValueError, match="Incorrect password"):
+        SSHPrivateKey.from_pem_string(encrypted, "wrong")
+    key = SSHPrivateKey.from_pem_string(encrypted, "test")
+    # The files were saved separately, so only their check numbers differ.
+    assert key.private_key_data == unencrypted.private_key_data
+    assert key.public_key_data == unencrypted.public_key_data
+    assert key.is_encrypted and not unencrypted.is_encrypted
+    assert key.encryption is not None
+    assert key.encryption.cipher_name == "aes256-ctr"
+    assert key.encryption.rounds == 24
+    assert len(key.encryption.salt) == 16
+    # Re-exporting returns the original without running the KDF.
+    assert key.encrypted_pem().pem_string == encrypted
+    with pytest.raises(ValueError):
+        unencrypted.encrypted_pem()
+
+    # Re-encrypting keeps the cipher and rounds, with a fresh salt.
+    reencrypted = key.encrypted_pem("new")
+    decrypted = SSHPrivateKey.from_pem_string(reencrypted.pem_string, b"new")
+    assert decrypted == key
+    assert decrypted.encryption is not None
+    assert decrypted.encryption.cipher_name == "aes256-ctr"
+    assert decrypted.encryption.salt != key.encryption.salt
+
+    key.comment = "changed"
+    with pytest.raises(ValueError):
+        key.encrypted_pem()
+
+def test_encrypted_private_key_gcm():
+    for pem_string in [ed25519_private_key, rsa_private_key, ecdsa_private_key]:
+        key = SSHPrivateKey.from_pem_string(pem_string)
+        encryption = SSHKeyEncryption.generate("aes256-gcm@openssh.com", rounds=2)
+        encrypted = key.encrypted_pem(b"password", encryption)
+        decrypted = SSHPrivateKey.from_pem_string(encrypted.pem_string, b"password")
+        assert decrypted == key
+        assert decrypted.encryption == encryption
+        with pytest.raises(ValueError, match="Incorrect password"):
+            SSHPrivateKey.from_pem_string(encrypted.pem_string, b"wrong")
+        # cryptography reads the keys we encrypt.
+        load_ssh_private_key(encrypted.pem_string.encode(), password=b"password")
+    with pytest.raises(ValueError):
+        SSHKeyEncryption.generate("aes128-cbc")
+
+# test_encrypted_private_key()
+# test_encrypted_private_key_gcm()
 # test_generate_key()
 # test_ed25519_private_key()
 # test_ed25519_private_key_2()
 # test_rsa_private_key()
 # test_dsa_private_key()
 # test_ecdsa_private_key()
+# test_private_key_comment_invalidates_cache()
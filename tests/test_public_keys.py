@@ -31,7 +31,28 @@ def test_ecdsa_public_key():
     assert key.string == ecdsa_public_key
     assert key.hash_string == "256 SHA256:auPD86cNL0AFoBVNqHE4kBv7zcMcgJ3vFcT1G6efZNo wolf@Wolfs-MacBook-Pro.local (ECDSA)"
 
+def test_public_key_comment_invalidates_cache():
+    key = SSHPublicKey.from_string(ed25519_public_key)
+    other = SSHPublicKey.from_string(ed25519_public_key)
+    fingerprint = key.fingerprint
+    assert key.string == ed25519_public_key
+    key.comment = "renamed"
+    assert key.string.endswith(" renamed")
+    assert key.fingerprint == fingerprint
+    assert key != other and hash(key) == hash(other)
+    assert len({key, other, SSHPublicKey.from_string(ed25519_public_key)}) == 2
+
+def test_public_key_fields():
+    key = SSHPublicKey.from_string(rsa_public_key)
+    assert not hasattr(key, "__dict__") and not hasattr(key.key_data, "__dict__")
+    assert key.key_data.data.public_exponent == b"\x01\x00\x01"
+    assert key.key_data.chunks == [key.key_data.data.public_exponent, key.key_data.data.modulus]
+    ecdsa_key = SSHPublicKey.from_string(ecdsa_public_key)
+    assert ecdsa_key.key_data.chunks == [b"nistp256", ecdsa_key.key_data.data.q]
+
 # test_ed25519_public_key()
 # test_rsa_public_key()
 # test_dsa_public_key()
 # test_ecdsa_public_key()
+# test_public_key_comment_invalidates_cache()
+# test_public_key_fields()
@@ -0,0 +1,111 @@
+import io
+import os
+import socket
+import stat
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+
+import pytest
+
+from ssh_envelope.client import EnvelopeClient
+from ssh_envelope.envelope import Envelope
+from ssh_envelope.main import _main
+from ssh_envelope.server import EnvelopeServer
+from ssh_envelope.ssh_object_utils import derive_public_key, generate_ed25519_private
+
+def is_listening(path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except OSError:
+            return False
+    return True
+
+class running_server:
+    def __init__(self, server: EnvelopeServer, path: str | None = None):
+        self._server = server
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.path = path or os.path.join(self._tmpdir.name, "socket")
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve, args=(self.path,))
+        self._thread.start()
+        while not is_listening(self.path):
+            time.sleep(0.01)
+        return self.path
+
+    def __exit__(self, *_):
+        self._server.shutdown()
+        self._thread.join()
+        self._tmpdir.cleanup()
+
+def test_server_sign_and_verify():
+    ssh_private_keys = [generate_ed25519_private() for _ in range(2)]
+    public_keys = [derive_public_key(key) for key in ssh_private_keys]
+    server = EnvelopeServer([Envelope.from_ssh_private_key(key) for key in ssh_private_keys])
+    envelope = Envelope.from_string("Hello, world!").wrapped()
+    with running_server(server) as path, EnvelopeClient(path) as client:
+        assert set(client.fingerprints()) == {key.fingerprint for key in public_keys}
+        signed = client.add_signature(envelope, fingerprints=[public_keys[0].fingerprint])
+        assert signed.verify_signature(Envelope.from_ssh_public_key(public_keys[0]))
+        assert client.verify_signature(signed) == (True, [public_keys[0].fingerprint])
+        assert client.verify_signature(signed, threshold=2)[0] is False
+        assert client.verify_signature(envelope, Envelope.from_ssh_public_key(public_keys[1])) == (False, [])
+        with pytest.raises(ValueError):
+            client.add_signature(envelope, fingerprints=["SHA256:unknown"])
+
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            _main(["add-signature", "--via-socket", path, "--envelope", envelope.ur])
+        signed = Envelope(stdout.getvalue())
+        assert len(signed.find_signatures()) == 2
+        with redirect_stdout(io.StringIO()):
+            _main(["verify-signature", "--via-socket", path, "--threshold", "2", "--envelope", signed.ur, "--silent"])
+
+def test_server_coalesces_requests():
+    release = threading.Event()
+    calls = 0
+
+    class SlowServer(EnvelopeServer):
+        def handle(self, request):
+            nonlocal calls
+            calls += 1
+            release.wait()
+            return {"status": "ok"}
+
+    server = SlowServer([], max_workers=2)
+    first = server.submit({"op": "keys"})
+    second = server.submit({"op": "keys"})
+    other = server.submit({"op": "other"})
+    assert first is second
+    assert first is not other
+    release.set()
+    assert first.result() == {"status": "ok"}
+    other.result()
+    assert calls == 2
+    assert server.submit({"op": "keys"}) is not first
+
+def test_server_socket_in_use():
+    server = EnvelopeServer([Envelope.from_ssh_private_key(generate_ed25519_private())])
+    with running_server(server) as path:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        with pytest.raises(ValueError, match="already in use"):
+            EnvelopeServer([]).serve(path)
+        assert is_listening(path)
+    assert server.handle({"op": "sign"}) == {"status": "error", "error": "Missing field: envelope"}
+    assert server.handle({"op": "verify"}) == {"status": "error", "error": "Missing field: envelope"}
+
+    # A stale socket left by a server that died is replaced.
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "socket")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()
+        with running_server(EnvelopeServer([]), path) as serving_path:
+            assert is_listening(serving_path)
+
+# test_server_sign_and_verify()
+# test_server_socket_in_use()
+# test_server_coalesces_requests()
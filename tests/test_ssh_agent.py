@@ -0,0 +1,84 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+import pytest
+
+from ssh_envelope import ssh_keygen_utils
+from ssh_envelope.envelope import Envelope
+from ssh_envelope.keyring import Keyring
+from ssh_envelope.main import _main
+from ssh_envelope.ssh_agent import SSHAgent
+from ssh_envelope.ssh_object_utils import derive_public_key, generate_ed25519_private
+from tests.local_agent import LocalAgent
+from tests.test_sshsig import generate_private_key, key_generators
+
+@pytest.mark.parametrize("key_name", ["ed25519", "nistp256", "rsa"])
+def test_agent_sign(key_name):
+    private_key = generate_private_key(key_generators[key_name]())
+    public_key = derive_public_key(private_key)
+    message = b"hello"
+    with LocalAgent([private_key]) as local_agent, SSHAgent(local_agent.path) as agent:
+        assert [key.key_data for key in agent.identities()] == [public_key.key_data]
+        signature = agent.sign_message(message, public_key.key_data, "test")
+        assert ssh_keygen_utils.verify_message(message, signature, public_key)
+        other_key = derive_public_key(generate_ed25519_private())
+        with pytest.raises(ValueError):
+            agent.sign_message(message, other_key.key_data, "test")
+
+def test_agent_rejects_sha1_rsa():
+    private_key = generate_private_key(key_generators["rsa"]())
+    public_key = derive_public_key(private_key)
+    with LocalAgent([private_key]) as local_agent, SSHAgent(local_agent.path) as agent:
+        local_agent.ignore_rsa_flags = True
+        with pytest.raises(ValueError, match="ssh-rsa"):
+            agent.sign_message(b"hello", public_key.key_data, "test")
+
+def test_agent_envelope_and_command(monkeypatch):
+    private_keys = [generate_ed25519_private() for _ in range(2)]
+    public_keys = [derive_public_key(key) for key in private_keys]
+    envelope = Envelope.from_string("Hello, world!").wrapped()
+    with LocalAgent(private_keys) as local_agent:
+        with SSHAgent(local_agent.path) as agent:
+            signed = envelope.add_agent_signatures(agent, public_keys[:1], "envelope")
+        assert signed.verified_signers(Keyring(public_keys)) == public_keys[:1]
+
+        monkeypatch.setenv("SSH_AUTH_SOCK", local_agent.path)
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            _main(["add-signature", "--agent", "--envelope", envelope.ur])
+        signed = Envelope(stdout.getvalue())
+        assert set(signed.verified_signers(Keyring(public_keys))) == set(public_keys)
+        with pytest.raises(ValueError):
+            _main(["add-signature", "--agent", "--fingerprint", "SHA256:unknown", "--envelope", envelope.ur])
+
+@pytest.mark.skipif(shutil.which("ssh-agent") is None or shutil.which("ssh-add") is None, reason="OpenSSH agent not installed")
+def test_openssh_agent_sign():
+    private_key = generate_ed25519_private()
+    public_key = derive_public_key(private_key)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket_path = os.path.join(tmpdir, "agent")
+        key_path = os.path.join(tmpdir, "id")
+        with open(key_path, "w") as f:
+            f.write(private_key.pem_string)
+        os.chmod(key_path, 0o600)
+        process = subprocess.Popen(["ssh-agent", "-D", "-a", socket_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while not os.path.exists(socket_path):
+                time.sleep(0.01)
+            subprocess.run(["ssh-add", key_path], env={**os.environ, "SSH_AUTH_SOCK": socket_path}, check=True, capture_output=True)
+            with SSHAgent(socket_path) as agent:
+                signature = agent.sign_message(b"hello", public_key.key_data, "test")
+            assert ssh_keygen_utils.verify_message(b"hello", signature, public_key)
+        finally:
+            process.terminate()
+            process.wait()
+
+# test_agent_sign("ed25519")
+# test_agent_rejects_sha1_rsa()
+# test_agent_envelope_and_command()
+# test_openssh_agent_sign()
@@ -0,0 +1,76 @@
+import pytest
+
+from ssh_envelope.ssh_buffer import SSHReadBuffer, SSHWriteBuffer
+
+def test_read_buffer():
+    buf = SSHWriteBuffer()
+    buf.write_null_terminated_string("openssh-key-v1")
+    buf.write_int(0xdeadbeef)
+    buf.write_length_prefixed_string("ssh-ed25519")
+    buf.write_chunk(b"\x00\x01\x02")
+    buf.write_mpint(0x80)
+
+    read_buf = SSHReadBuffer(buf.data)
+    assert read_buf.read_null_terminated_string() == "openssh-key-v1"
+    assert read_buf.read_int() == 0xdeadbeef
+    assert read_buf.read_length_prefixed_string() == "ssh-ed25519"
+    chunk = read_buf.read_chunk()
+    assert isinstance(chunk, bytes) and chunk == b"\x00\x01\x02"
+    assert read_buf.read_mpint() == 0x80
+    assert read_buf.is_at_end
+    with pytest.raises(ValueError):
+        read_buf.read_int()
+
+def test_read_chunks_views():
+    data = SSHWriteBuffer.chunks_to_data([b"abc", b"", b"defg"])
+    chunks = SSHReadBuffer.read_chunks_from(data)
+    assert all(isinstance(chunk, memoryview) for chunk in chunks)
+    assert [bytes(chunk) for chunk in chunks] == [b"abc", b"", b"defg"]
+
+    # Nested buffers over views parse without copying the outer data.
+    nested = SSHReadBuffer(SSHReadBuffer(SSHWriteBuffer.chunks_to_data([b"xyz\x00rest"])).read_chunk_view())
+    assert nested.read_null_terminated_string() == "xyz"
+    assert nested.read(4) == b"rest"
+
+def test_nested_chunk():
+    buf = SSHWriteBuffer()
+    buf.write_int(7)
+    with buf.nested_chunk() as start:
+        buf.write_length_prefixed_string("ssh-ed25519")
+        with buf.nested_chunk():
+            buf.write(b"inner")
+        buf.write_padding(start)
+    assert start == 8
+
+    inner = SSHWriteBuffer()
+    inner.write_length_prefixed_string("ssh-ed25519")
+    inner.write_chunk(b"inner")
+    inner.write_padding()
+    expected = SSHWriteBuffer()
+    expected.write_int(7)
+    expected.write_chunk(inner.data)
+    assert buf.data == expected.data
+    assert len(inner.data) % 8 == 0
+
+def test_write_padding():
+    buf = SSHWriteBuffer()
+    buf.write(b"12345678")
+    buf.write_padding()
+    assert buf.data == b"12345678"
+    buf.write(b"abc")
+    buf.write_padding()
+    assert buf.data == b"12345678abc\x01\x02\x03\x04\x05"
+    buf.write_padding(block_size=16)
+    assert buf.data == b"12345678abc\x01\x02\x03\x04\x05"
+
+def test_read_buffer_underflow():
+    with pytest.raises(ValueError):
+        SSHReadBuffer(b"\x00\x00\x00\x05abc").read_chunk()
+    with pytest.raises(ValueError):
+        SSHReadBuffer(b"no terminator").read_null_terminated_string()
+
+# test_read_buffer()
+# test_read_chunks_views()
+# test_nested_chunk()
+# test_write_padding()
+# test_read_buffer_underflow()
@@ -0,0 +1,109 @@
+import base64
+import hashlib
+import hmac
+import io
+import os
+import tempfile
+from contextlib import redirect_stderr, redirect_stdout
+
+from ssh_envelope.envelope import Envelope
+from ssh_envelope.main import _main
+from ssh_envelope.ssh_key_files import KeyFileIndex, parse_allowed_signers, parse_authorized_keys, parse_known_hosts, read_allowed_signers, read_lines
+from ssh_envelope.ssh_object_utils import derive_public_key, generate_ed25519_private
+from ssh_envelope.ssh_public_key import SSHPublicKey
+from tests.test_data import ecdsa_public_key, ed25519_public_key, rsa_public_key
+
+def key_part(public_key: str) -> str:
+    return " ".join(public_key.split(" ")[:2])
+
+def hashed_host(name: str) -> str:
+    salt = b"0123456789abcdefghij"
+    digest = hmac.new(salt, name.encode(), hashlib.sha1).digest()
+    return f"|1|{base64.b64encode(salt).decode()}|{base64.b64encode(digest).decode()}"
+
+def test_parse_authorized_keys():
+    lines = [
+        "# comment",
+        "",
+        ed25519_public_key,
+        f'command="echo a, b",no-pty,from="10.0.0.0/8" {key_part(rsa_public_key)} deploy key',
+        "ssh-ed25519-cert-v01@openssh.com AAAA cert",
+        "garbage",
+        f"no-pty {key_part(ed25519_public_key)}",
+    ]
+    entries = list(parse_authorized_keys(lines))
+    assert [entry.line for entry in entries] == [3, 4, 7]
+    assert entries[0].options == () and entries[0].public_key.string == ed25519_public_key
+    assert entries[1].options == ('command="echo a, b"', "no-pty", 'from="10.0.0.0/8"')
+    assert entries[1].comment == "deploy key" and entries[1].public_key.comment == ""
+    index = KeyFileIndex(entries)
+    assert len(index) == 3 and len(index.keyring()) == 2
+    assert [entry.line for entry in index.find(SSHPublicKey.from_string(ed25519_public_key))] == [3, 7]
+    assert SSHPublicKey.from_string(ecdsa_public_key) not in index
+
+def test_parse_known_hosts():
+    lines = [
+        f"example.com,*.example.org,!bad.example.org {key_part(ed25519_public_key)}",
+        f"{hashed_host('[secret.example.com]:2222')} {key_part(rsa_public_key)}",
+        f"@cert-authority *.example.net {key_part(ecdsa_public_key)}",
+        f"@bogus example.com {key_part(ecdsa_public_key)}",
+    ]
+    entries = list(parse_known_hosts(lines))
+    assert len(entries) == 3
+    assert entries[0].matches("example.com") and entries[0].matches("www.example.org")
+    assert not entries[0].matches("bad.example.org") and not entries[0].matches("example.com", 2222)
+    assert entries[1].matches("secret.example.com", 2222) and not entries[1].matches("secret.example.com")
+    assert entries[1].matches("Secret.Example.com", 2222) and entries[0].matches("WWW.Example.org")
+    assert entries[2].marker == "@cert-authority"
+
+def test_parse_allowed_signers():
+    lines = [
+        f'alice@example.com,bob@example.com namespaces="git,file" {key_part(ed25519_public_key)}',
+        f'"carol example" cert-authority {key_part(rsa_public_key)}',
+        f"dave@example.com {key_part(ecdsa_public_key)}",
+        f'erin@example.com namespaces="Envelope*" {key_part(ecdsa_public_key)}',
+    ]
+    entries = list(parse_allowed_signers(lines))
+    assert entries[0].principals == ("alice@example.com", "bob@example.com")
+    assert entries[0].namespaces == ("git", "file")
+    assert entries[0].allows_namespace("git") and not entries[0].allows_namespace("envelope")
+    assert entries[1].principals == ("carol example",) and entries[1].is_cert_authority
+    assert entries[2].namespaces is None and entries[2].allows_namespace("envelope")
+    assert entries[3].allows_namespace("Envelope-v2") and not entries[3].allows_namespace("envelope")
+
+def test_read_allowed_signers_file():
+    path = os.path.join(os.path.dirname(__file__), "..", "objects", "allowed_signers")
+    entries = list(read_allowed_signers(path))
+    assert len(entries) == 1
+    assert entries[0].principals == ("wolf@Wolfs-MacBook-Pro.local",)
+    with tempfile.NamedTemporaryFile() as file:
+        assert list(read_lines(file.name)) == []
+        file.write(b"a\nb")
+        file.flush()
+        assert list(read_lines(file.name)) == ["a", "b"]
+
+def test_verify_signature_allowed_signers_command():
+    private_key = generate_ed25519_private()
+    public_key = derive_public_key(private_key)
+    envelope = Envelope.from_string("Hello, world!").wrapped()\
+        .add_signature(Envelope.from_ssh_private_key(private_key), namespace="envelope")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "allowed_signers")
+        def verify(options: str) -> bool:
+            with open(path, "w") as file:
+                file.write(f"signer@example.com {options} {key_part(public_key.string)}\n")
+            try:
+                with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                    _main(["verify-signature", "--allowed-signers", path, "--envelope", envelope.ur])
+            except SystemExit:
+                return False
+            return True
+        assert verify('namespaces="envelope"')
+        assert not verify('namespaces="git"')
+        assert not verify("cert-authority")
+
+# test_parse_authorized_keys()
+# test_parse_known_hosts()
+# test_parse_allowed_signers()
+# test_read_allowed_signers_file()
+# test_verify_signature_allowed_signers_command()
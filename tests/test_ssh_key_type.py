@@ -0,0 +1,55 @@
+import os
+import pickle
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from ssh_envelope.ssh_key_type import ECDSAType, SSHKeyType
+from ssh_envelope.ssh_public_key import SSHPublicKey
+from tests.test_data import ecdsa_public_key
+
+def ecdsa_key_string(curve: ec.EllipticCurve) -> str:
+    public_key = ec.generate_private_key(curve).public_key()
+    return public_key.public_bytes(serialization.Encoding.OpenSSH, serialization.PublicFormat.OpenSSH).decode()
+
+def test_key_types_are_interned():
+    key_type = SSHKeyType.from_string("ecdsa-sha2-nistp384")
+    assert key_type is SSHKeyType.ECDSA_NISTP384
+    assert key_type.subtype is ECDSAType.NISTP384
+    assert key_type.name == "ECDSA" and key_type.is_ecdsa
+    assert not SSHKeyType.ED25519.is_ecdsa
+    assert pickle.loads(pickle.dumps(key_type)) is key_type
+    assert len(set(SSHKeyType.all())) == 6
+    with pytest.raises(AttributeError):
+        key_type._subtype = ECDSAType.NISTP256 # type: ignore
+    with pytest.raises(ValueError):
+        SSHKeyType.from_string("ecdsa-sha2-nistp999")
+
+def test_mixed_ecdsa_curves():
+    p256 = SSHPublicKey.from_string(ecdsa_public_key)
+    p384 = SSHPublicKey.from_string(ecdsa_key_string(ec.SECP384R1()))
+    p521 = SSHPublicKey.from_string(ecdsa_key_string(ec.SECP521R1()))
+    assert str(p256.type) == "ecdsa-sha2-nistp256"
+    assert p256.key_size == 256 and p384.key_size == 384 and p521.key_size == 521
+    assert p256.string == ecdsa_public_key
+
+def test_concurrent_ecdsa_parsing():
+    strings = [ecdsa_public_key, ecdsa_key_string(ec.SECP384R1()), ecdsa_key_string(ec.SECP521R1())] * 50
+    def parse(string):
+        key = SSHPublicKey.from_string(string)
+        return str(key.type), key.string
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(parse, strings))
+    for string, (type_string, key_string) in zip(strings, results):
+        assert string.startswith(type_string + " ")
+        assert key_string == string
+
+# test_key_types_are_interned()
+# test_mixed_ecdsa_curves()
+# test_concurrent_ecdsa_parsing()
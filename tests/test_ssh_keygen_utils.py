@@ -1,3 +1,8 @@
+import errno
+
+import pytest
+
+from ssh_envelope import ssh_keygen_utils
 from ssh_envelope.envelope import Envelope
 from ssh_envelope.ssh_keygen_utils import sign_message, verify_message
 from ssh_envelope.ssh_object_utils import derive_public_key, generate_ed25519_private, import_ssh_object
@@ -37,5 +42,39 @@ def test_wrap_and_sign_envelope():
     is_verified = signed_envelope.verify_signature(public_key)
     assert(is_verified)
 
+def test_add_signatures():
+    envelope = Envelope.from_string("Hello, world!").wrapped()
+    ssh_private_keys = [generate_ed25519_private() for _ in range(3)]
+    signed_envelope = envelope.add_signatures([Envelope.from_ssh_private_key(key) for key in ssh_private_keys], namespace="test")
+    assert len(signed_envelope.find_signatures()) == 3
+    for ssh_private_key in ssh_private_keys:
+        assert signed_envelope.verify_signature(Envelope.from_ssh_public_key(derive_public_key(ssh_private_key)))
+
+@pytest.mark.parametrize("use_memfd", [True, False])
+def test_keygen_material_files(monkeypatch, use_memfd):
+    if use_memfd:
+        if not ssh_keygen_utils.use_memfd:
+            pytest.skip("memfd_create is not available")
+        # Nothing should be written to disk.
+        monkeypatch.setattr(ssh_keygen_utils.tempfile, "TemporaryDirectory", None)
+    monkeypatch.setattr(ssh_keygen_utils, "use_memfd", use_memfd)
+    ssh_private_key = generate_ed25519_private()
+    ssh_public_key = derive_public_key(ssh_private_key)
+    signature = sign_message(b"hello", ssh_private_key, namespace="test")
+    assert verify_message(b"hello", signature, ssh_public_key)
+    assert not verify_message(b"wrong_message", signature, ssh_public_key)
+
+def test_keygen_memfd_unavailable(monkeypatch):
+    def memfd_create(*_):
+        raise OSError(errno.ENOSYS, "Function not implemented")
+    monkeypatch.setattr(ssh_keygen_utils, "use_memfd", True)
+    monkeypatch.setattr(ssh_keygen_utils.os, "memfd_create", memfd_create, raising=False)
+    ssh_private_key = generate_ed25519_private()
+    signature = sign_message(b"hello", ssh_private_key, namespace="test")
+    assert verify_message(b"hello", signature, derive_public_key(ssh_private_key))
+
 # test_sign()
 # test_wrap_and_sign_envelope()
+# test_add_signatures()
+# test_keygen_material_files(pytest.MonkeyPatch(), True)
+# test_keygen_memfd_unavailable(pytest.MonkeyPatch())
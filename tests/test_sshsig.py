@@ -0,0 +1,68 @@
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from ssh_envelope import ssh_keygen_utils, sshsig
+from ssh_envelope.ssh_hash import SSHHash
+from ssh_envelope.ssh_object_utils import derive_public_key
+from ssh_envelope.ssh_private_key import SSHPrivateKey
+from ssh_envelope.ssh_public_key import SSHPublicKey
+from ssh_envelope.ssh_signature import SSHSignature
+
+def generate_private_key(key) -> SSHPrivateKey:
+    pem_string = key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.OpenSSH,
+        encryption_algorithm=serialization.NoEncryption()
+    ).decode()
+    return SSHPrivateKey.from_pem_string(pem_string)
+
+key_generators = {
+    "ed25519": lambda: ed25519.Ed25519PrivateKey.generate(),
+    "nistp256": lambda: ec.generate_private_key(ec.SECP256R1()),
+    "nistp384": lambda: ec.generate_private_key(ec.SECP384R1()),
+    "nistp521": lambda: ec.generate_private_key(ec.SECP521R1()),
+    "rsa": lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+}
+
+@pytest.mark.parametrize("key_name", key_generators.keys())
+def test_native_sign_keygen_verify(key_name):
+    private_key = generate_private_key(key_generators[key_name]())
+    public_key = derive_public_key(private_key)
+    message = b"hello"
+    for hash_algorithm in [SSHHash.Algorithm.SHA256, SSHHash.Algorithm.SHA512]:
+        signature = sshsig.sign_message(message, private_key, "test", hash_algorithm)
+        assert SSHSignature.from_pem_string(signature.pem_string) == signature
+        assert sshsig.verify_message(message, signature, public_key)
+        assert not sshsig.verify_message(b"wrong_message", signature, public_key)
+        assert ssh_keygen_utils.verify_message(message, signature, public_key)
+
+@pytest.mark.parametrize("key_name", key_generators.keys())
+def test_keygen_sign_native_verify(key_name):
+    private_key = generate_private_key(key_generators[key_name]())
+    public_key = derive_public_key(private_key)
+    message = b"hello"
+    signature = ssh_keygen_utils.sign_message(message, private_key, "test")
+    assert sshsig.verify_message(message, signature, public_key)
+    assert not sshsig.verify_message(b"wrong_message", signature, public_key)
+
+def test_verify_with_wrong_key():
+    private_key = generate_private_key(key_generators["ed25519"]())
+    other_public_key = derive_public_key(generate_private_key(key_generators["ed25519"]()))
+    signature = sshsig.sign_message(b"hello", private_key, "test")
+    assert not sshsig.verify_message(b"hello", signature, other_public_key)
+
+def test_verify_example_file():
+    with open("objects/example_data.txt", "rb") as f:
+        message = f.read()
+    with open("objects/example_data.txt.sig") as f:
+        signature = SSHSignature.from_pem_string(f.read())
+    with open("objects/test_ed25519.pub") as f:
+        public_key = SSHPublicKey.from_string(f.read())
+    assert signature.namespace == "file"
+    assert sshsig.verify_message(message, signature, public_key)
+
+# test_native_sign_keygen_verify()
+# test_keygen_sign_native_verify()
+# test_verify_with_wrong_key()
+# test_verify_example_file()
@@ -0,0 +1,44 @@
+import pytest
+
+from ssh_envelope.envelope import Envelope
+from ssh_envelope.keyring import Keyring
+from ssh_envelope.ssh_object_utils import derive_public_key, generate_ed25519_private
+from ssh_envelope.threshold import verify_threshold
+
+def signed_envelope(private_keys) -> Envelope:
+    envelope = Envelope.from_string("Release artifact").wrapped()
+    for private_key in private_keys:
+        envelope = envelope.add_signature(Envelope.from_ssh_private_key(private_key), namespace="envelope")
+    return envelope
+
+def test_threshold():
+    private_keys = [generate_ed25519_private() for _ in range(5)]
+    keyring = Keyring(derive_public_key(key) for key in private_keys)
+    envelope = signed_envelope(private_keys[:3])
+    assert envelope.verify_threshold(keyring, 1)
+    assert envelope.verify_threshold(keyring, 3)
+    assert not envelope.verify_threshold(keyring, 4)
+    assert not envelope.verify_threshold(Keyring(derive_public_key(key) for key in private_keys[2:]), 2)
+    with pytest.raises(ValueError):
+        envelope.verify_threshold(keyring, 0)
+
+def test_threshold_counts_distinct_signers():
+    private_key = generate_ed25519_private()
+    keyring = Keyring([derive_public_key(private_key)])
+    envelope = signed_envelope([private_key])
+    envelope = envelope.add_signature(Envelope.from_ssh_private_key(private_key), namespace="other")
+    assert len(envelope.find_signatures()) == 2
+    assert envelope.verify_threshold(keyring, 1)
+    assert not envelope.verify_threshold(keyring, 2)
+
+def test_threshold_ignores_invalid_signatures():
+    private_keys = [generate_ed25519_private() for _ in range(3)]
+    keyring = Keyring(derive_public_key(key) for key in private_keys)
+    signatures = signed_envelope(private_keys).find_signatures()
+    message = Envelope.from_string("Release artifact").wrapped().digest
+    assert len(verify_threshold(message, signatures, keyring, 3, max_workers=2)) == 3
+    assert len(verify_threshold(b"tampered", signatures, keyring, 2)) < 2
+
+# test_threshold()
+# test_threshold_counts_distinct_signers()
+# test_threshold_ignores_invalid_signatures()